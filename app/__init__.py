@@ -1,13 +1,31 @@
 import os
+import click
 from flask import Flask
 from app.db import db, ma
 from flasgger import Swagger
 from flask_cors import CORS
-from flask_migrate import Migrate
+from app.services.cep import resolvedor_cep
+from app.services.viacep import cliente_viacep
+from app.services.geocodificacao import geocodificador
+from app.services.resultados import cache_resultados
+from app.services.perfil_sqlite import perfil_sqlite
+from app.services.metricas import metricas
+from app.services.perfilador import perfilador
+from app.services.especificacao import especificacao
+from app.services.esquema import esquema_atualizado
+from app import cli
+from app.services import colunar, recomendacoes
+from app.schema import codificador
 
-def create_app():
+def _registrar_migracoes(app, migrations_path):
+    # o flask_migrate importa o alembic inteiro (~150 ms no cold start)
+    from flask_migrate import Migrate
+    if 'migrate' not in app.extensions:
+        Migrate(app, db, directory=migrations_path, render_as_batch=True)
+
+def create_app(config=None):
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag', 'X-Cache', 'X-Query-Profile'])
     # Verifica se o diretorio instance para db esteja criado, pois tive problemas por esse diretório não esta criado. 
 
     instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../instance')
@@ -16,9 +34,32 @@ def create_app():
 
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{instance_path}/database.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    migrate = Migrate(app, db)
+    # permite sobrescrever qualquer configuração via variáveis FLASK_* ou pelo parâmetro config
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+    # produção: não recria o esquema quando o banco já está na última migração
+    app.config.setdefault('PRODUCTION_MODE', False)
+
+    migrations_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../migrations')
+    # em produção o Migrate só é registrado pela CLI do flask (flask db ...) ou
+    # quando há migração pendente
+    if not app.config['PRODUCTION_MODE'] or click.get_current_context(silent=True) is not None:
+        _registrar_migracoes(app, migrations_path)
+    perfil_sqlite.init_app(app)
     db.init_app(app)
+    perfil_sqlite.aplicar_pragmas(app)
+    metricas.init_app(app)
+    perfilador.init_app(app)
     ma.init_app(app)
+    codificador.init_app(app)
+    cliente_viacep.init_app(app)
+    geocodificador.init_app(app)
+    resolvedor_cep.init_app(app)
+    cache_resultados.init_app(app)
+    colunar.init_app(app)
+    recomendacoes.init_app(app)
+    cli.init_app(app)
 
     swagger_template = {
         "info": {
@@ -50,6 +91,14 @@ def create_app():
                 "name": "Pais",
                 "description": "Operações relacionadas a pais"
             },
+            {
+                "name": "Avaliações",
+                "description": "Avaliações das escolas feitas por pais"
+            },
+            {
+                "name": "Métricas",
+                "description": "Métricas de desempenho no formato do Prometheus"
+            },
         ],
     }
 
@@ -68,14 +117,24 @@ def create_app():
         "specs_route": "/apidocs/"
     }
 
-    Swagger(app, template=swagger_template, config=swagger_config)
+    swagger = Swagger(app, template=swagger_template, config=swagger_config)
+    especificacao.init_app(app, swagger)
 
     from app.routes.escola_routes import escola_routes
     from app.routes.pais_routes import pais_routes
+    from app.routes.avaliacao_routes import avaliacao_routes
+    from app.routes.metricas_routes import metricas_routes
     app.register_blueprint(escola_routes, url_prefix='/api')
     app.register_blueprint(pais_routes, url_prefix='/api')
+    app.register_blueprint(avaliacao_routes, url_prefix='/api')
+    app.register_blueprint(metricas_routes)
 
     with app.app_context():
-        db.create_all()
+        if not (app.config['PRODUCTION_MODE'] and esquema_atualizado(migrations_path)):
+            from flask_migrate import upgrade
+            _registrar_migracoes(app, migrations_path)
+            db.create_all()
+            # aplica as migrações pendentes (colunas novas em tabelas que o create_all não altera)
+            upgrade(directory=migrations_path)
 
     return app
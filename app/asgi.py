@@ -0,0 +1,198 @@
+import asyncio
+import io
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app.model.escola import Escola
+from app.model.pais import Pais
+from app.services.atualizacao import ceps_gravados
+from app.services.cep import normalizar_cep
+from app.services.cep_assincrono import ResolvedorCepAssincrono
+
+# cadastros e atualizações de escolas e pais: o CEP do corpo é resolvido antes
+# da view, no event loop. Num PUT ou PATCH só entra o CEP que difere do gravado,
+# de um registro que existe, como em antecipar_cep; um PATCH sem cep não consulta nada
+ROTAS_COM_CEP = re.compile(r'^/api/(?P<tabela>escolas|pais)(?:/(?P<id>\d+))?/?$')
+MODELOS = {'escolas': Escola, 'pais': Pais}
+METODOS_COM_CEP = {'POST', 'PUT', 'PATCH'}
+# corpos maiores que isso seguem direto para a view, sem pré-resolver o CEP
+TAMANHO_MAXIMO_CORPO = 1024 * 1024
+
+
+class _Entrada(io.RawIOBase):
+    # wsgi.input alimentado pelas mensagens ASGI, lido da thread da requisição
+    def __init__(self, receive, loop, inicial=b'', mais=True):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = inicial
+        self._mais = mais
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while not self._buffer and self._mais:
+            mensagem = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if mensagem['type'] == 'http.disconnect':
+                self._mais = False
+                break
+            self._buffer = mensagem.get('body', b'')
+            self._mais = mensagem.get('more_body', False)
+        tamanho = min(len(destino), len(self._buffer))
+        destino[:tamanho] = self._buffer[:tamanho]
+        self._buffer = self._buffer[tamanho:]
+        return tamanho
+
+
+def _itens(corpo):
+    # objetos do corpo (um só ou uma lista) que trazem um cep em texto
+    try:
+        dados = json.loads(corpo)
+    except ValueError:
+        return []
+    itens = dados if isinstance(dados, list) else [dados]
+    return [item for item in itens if isinstance(item, dict) and isinstance(item.get('cep'), str)]
+
+
+def _id_inteiro(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _environ(scope, entrada):
+    servidor = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': entrada,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for nome, valor in scope['headers']:
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        chave = nome if nome in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{nome}'
+        valor = valor.decode('latin-1')
+        environ[chave] = f'{environ[chave]},{valor}' if chave in environ else valor
+    return environ
+
+
+class AplicacaoAsgi:
+    # Serve o app Flask por ASGI (ex.: uvicorn asgi:app). As views continuam
+    # síncronas e rodam em um pool com ASGI_THREADS threads; o que muda é a
+    # espera pelo ViaCEP: nos cadastros e atualizações o CEP é resolvido no
+    # event loop antes de a requisição ocupar uma thread, então centenas de
+    # requisições podem aguardar o ViaCEP ao mesmo tempo em um único processo.
+
+    def __init__(self, app):
+        app.config.setdefault('ASGI_THREADS', 32)
+        app.config.setdefault('ASGI_CEP_ASSINCRONO', True)
+        app.config.setdefault('ASGI_VIACEP_CONEXOES', 100)
+        self.app = app
+        self.executor = ThreadPoolExecutor(int(app.config['ASGI_THREADS']), thread_name_prefix='asgi')
+        self.cep = ResolvedorCepAssincrono(app, self.executor) if app.config['ASGI_CEP_ASSINCRONO'] else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        inicial, mais = b'', True
+        rota = ROTAS_COM_CEP.match(scope['path'])
+        if self.cep is not None and scope['method'] in METODOS_COM_CEP and rota:
+            inicial, mais = await self._ler_corpo(receive)
+            if not mais:
+                ceps = await loop.run_in_executor(self.executor, self._ceps_a_resolver, scope['method'], rota, inicial)
+                await asyncio.gather(*(self.cep.resolver(cep) for cep in ceps))
+
+        # a view e a iteração da resposta ficam na mesma thread: o contexto da
+        # requisição (stream_with_context) não pode trocar de thread no meio
+        entrada = io.BufferedReader(_Entrada(receive, loop, inicial, mais))
+        await loop.run_in_executor(self.executor, self._responder, _environ(scope, entrada), send, loop)
+
+    def _ceps_a_resolver(self, metodo, rota, corpo):
+        # no executor: a leitura dos CEPs gravados é síncrona e a conexão volta
+        # ao pool quando o contexto da aplicação termina, antes da espera pelo ViaCEP
+        itens = _itens(corpo)
+        if metodo == 'POST':
+            return {item['cep'] for item in itens} if rota['id'] is None else set()
+        if rota['id'] is not None:
+            itens = [dict(item, id=int(rota['id'])) for item in itens[:1]]
+        elif metodo != 'PATCH':
+            # só o PATCH tem versão em lote
+            return set()
+        pares = [
+            (item['id'], normalizar_cep(item['cep']))
+            for item in itens if _id_inteiro(item.get('id')) and normalizar_cep(item['cep']) is not None
+        ]
+        if not pares:
+            return set()
+        with self.app.app_context():
+            gravados = ceps_gravados(MODELOS[rota['tabela']], {id_ for id_, _ in pares})
+        return {cep for id_, cep in pares if id_ in gravados and cep != gravados[id_]}
+
+    async def _ler_corpo(self, receive):
+        partes, tamanho = [], 0
+        while tamanho <= TAMANHO_MAXIMO_CORPO:
+            mensagem = await receive()
+            if mensagem['type'] == 'http.disconnect':
+                break
+            partes.append(mensagem.get('body', b''))
+            tamanho += len(partes[-1])
+            if not mensagem.get('more_body', False):
+                return b''.join(partes), False
+        return b''.join(partes), True
+
+    def _responder(self, environ, send, loop):
+        inicio = {}
+
+        def enviar(mensagem):
+            asyncio.run_coroutine_threadsafe(send(mensagem), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and inicio.get('enviado'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            inicio['status'] = int(status.split(' ', 1)[0])
+            inicio['headers'] = [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in headers]
+
+        def iniciar():
+            if not inicio.get('enviado'):
+                enviar({'type': 'http.response.start', 'status': inicio['status'], 'headers': inicio['headers']})
+                inicio['enviado'] = True
+
+        iteravel = self.app(environ, start_response)
+        try:
+            for parte in iteravel:
+                if parte:
+                    iniciar()
+                    enviar({'type': 'http.response.body', 'body': parte, 'more_body': True})
+            iniciar()
+            enviar({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(iteravel, 'close'):
+                iteravel.close()
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                if self.cep is not None:
+                    await self.cep.fechar()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
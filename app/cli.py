@@ -0,0 +1,68 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.model.escola import Escola
+from app.model.pais import Pais
+from app.services.especificacao import especificacao
+from app.services.indice_cep import construir_indice
+from app.services.importacao import PARALELISMO, TAMANHO_LOTE, detectar_formato, importar, ler_registros
+
+importar_cli = AppGroup('importar', help='Importa escolas ou pais em massa a partir de CSV ou NDJSON.')
+openapi_cli = AppGroup('openapi', help='Especificação OpenAPI servida em /apispec_1.json.')
+cep_cli = AppGroup('cep', help='Índice local de CEPs consultado antes do ViaCEP.')
+
+
+def _comando_importacao(nome, modelo):
+    @importar_cli.command(nome, help=f'Importa {nome} de um arquivo CSV ou NDJSON.')
+    @click.argument('arquivo', type=click.File('rb'))
+    @click.option('--formato', type=click.Choice(['csv', 'ndjson']), help='Padrão: deduzido pela extensão do arquivo.')
+    @click.option('--lote', default=TAMANHO_LOTE, show_default=True, help='Linhas por transação.')
+    @click.option('--paralelismo', default=PARALELISMO, show_default=True, help='Consultas de CEP simultâneas.')
+    def comando(arquivo, formato, lote, paralelismo):
+        formato = detectar_formato(arquivo.name, formato)
+        if formato is None:
+            raise click.UsageError('Não foi possível deduzir o formato; use --formato csv ou --formato ndjson')
+        relatorio = importar(modelo, ler_registros(arquivo, formato), lote, paralelismo)
+        for erro in relatorio['erros']:
+            click.echo(f"linha {erro['linha']}: {erro['error']}", err=True)
+        resumo = {chave: valor for chave, valor in relatorio.items() if chave != 'erros'}
+        click.echo(json.dumps(resumo, ensure_ascii=False))
+
+    return comando
+
+
+_comando_importacao('escolas', Escola)
+_comando_importacao('pais', Pais)
+
+
+@openapi_cli.command('gerar', help='Gera a especificação em um arquivo JSON (padrão: OPENAPI_SPEC_FILE).')
+@click.option('--saida', type=click.Path(dir_okay=False), help='Arquivo de destino.')
+def gerar_especificacao(saida):
+    destino, tamanho = especificacao.gerar(saida)
+    click.echo(f'{destino} ({tamanho} bytes)')
+
+
+@cep_cli.command('indexar', help='Gera o índice de CEPs (padrão: CEP_INDEX_FILE) a partir de um CSV ou NDJSON com '
+                                  'cep, logradouro, bairro, localidade, uf e, opcionalmente, latitude e longitude.')
+@click.argument('arquivo', type=click.File('rb'))
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), help='Padrão: deduzido pela extensão do arquivo.')
+@click.option('--saida', type=click.Path(dir_okay=False), help='Arquivo de destino.')
+def indexar_ceps(arquivo, formato, saida):
+    formato = detectar_formato(arquivo.name, formato)
+    if formato is None:
+        raise click.UsageError('Não foi possível deduzir o formato; use --formato csv ou --formato ndjson')
+    destino = saida or current_app.config['CEP_INDEX_FILE']
+    relatorio = construir_indice(ler_registros(arquivo, formato), destino)
+    for erro in relatorio['erros']:
+        click.echo(f"linha {erro['linha']}: {erro['error']}", err=True)
+    resumo = {chave: valor for chave, valor in relatorio.items() if chave != 'erros'}
+    click.echo(json.dumps(dict(resumo, arquivo=destino), ensure_ascii=False))
+
+
+def init_app(app):
+    app.cli.add_command(importar_cli)
+    app.cli.add_command(openapi_cli)
+    app.cli.add_command(cep_cli)
@@ -1,6 +1,25 @@
 #criei o arquivo db separado pois tive problema com ele de importação circular, removi onde ele era chamdo e deixei so no arquivo separdo visto que uso o db em   "packs" diferentes
+from flask import current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_marshmallow import Marshmallow
 
-db = SQLAlchemy()
+
+class SessaoRoteada(Session):
+    # Em requisições GET/HEAD as leituras vão para o pool somente leitura, quando
+    # ele está ativo (SQLITE_READ_ONLY_POOL); escritas e flush ficam no principal.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and has_request_context()
+            and request.method in ('GET', 'HEAD')
+            and current_app.extensions.get('perfil_sqlite', {}).get('leitura')
+        ):
+            return self._db.engines['leitura']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 ma = Marshmallow()
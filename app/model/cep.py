@@ -0,0 +1,10 @@
+from app.db import db
+
+class CepCache(db.Model):
+    __tablename__ = 'cep_cache'
+    cep = db.Column(db.String(8), primary_key=True)
+    endereco = db.Column(db.Text, nullable=False)
+    encontrado = db.Column(db.Boolean, nullable=False)
+    expira_em = db.Column(db.Float, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.Float, nullable=False)
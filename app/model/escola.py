@@ -1,12 +1,23 @@
+import unicodedata
+from sqlalchemy import DDL, column, event, table
+from sqlalchemy.orm import validates
 from app.db import db
 
+def normalizar_texto(texto):
+    # minúsculas e sem acentos: "Método Montessori" -> "metodo montessori"
+    decomposto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+def _metodologia_normalizada(context):
+    return normalizar_texto(context.get_current_parameters().get('metodologia'))
+
 class Avaliacao(db.Model):  
     __tablename__ = 'avaliacao'
     id = db.Column(db.Integer, primary_key=True)
     nota = db.Column(db.Float, nullable=False)
     nome_avaliador = db.Column(db.String(100), nullable=False)
     comentario = db.Column(db.String(200))
-    escola_id = db.Column(db.Integer, db.ForeignKey('escola.id'), nullable=False)
+    escola_id = db.Column(db.Integer, db.ForeignKey('escola.id'), nullable=False, index=True)
 
 class Escola(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,6 +32,73 @@ class Escola(db.Model):
     mensalidade = db.Column(db.Float, nullable=False)
     quantidade_alunos = db.Column(db.Integer, nullable=False)
     metodologia = db.Column(db.String(100), nullable=False)
+    metodologia_normalizada = db.Column(db.String(100), nullable=False, default=_metodologia_normalizada, server_default='')
     email = db.Column(db.String(100), nullable=False)
     avaliacao = db.Column(db.Float)
-    imagem_url = db.Column(db.String(255))
\ No newline at end of file
+    # agregados das avaliações, atualizados a cada inserção/remoção; avaliacao = soma / total
+    avaliacoes_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_soma = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    imagem_url = db.Column(db.String(255))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    avaliacoes = db.relationship('Avaliacao', backref='escola', lazy='dynamic')
+
+    __table_args__ = (
+        db.Index('ix_escola_mensalidade', 'mensalidade'),
+        db.Index('ix_escola_avaliacao', 'avaliacao'),
+        db.Index('ix_escola_metodologia_mensalidade', 'metodologia_normalizada', 'mensalidade'),
+        db.Index('ix_escola_cidade_estado', 'cidade', 'estado'),
+    )
+
+    @validates('metodologia')
+    def _normalizar_metodologia(self, key, metodologia):
+        self.metodologia_normalizada = normalizar_texto(metodologia)
+        return metodologia
+
+# Índice espacial: tabela virtual R*Tree com um ponto (caixa degenerada) por escola,
+# mantida pelos triggers abaixo sempre que latitude/longitude mudam.
+escola_geo = table('escola_geo', column('id'), column('min_lat'), column('max_lat'), column('min_lon'), column('max_lon'))
+
+ESCOLA_GEO_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS escola_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """CREATE TRIGGER IF NOT EXISTS escola_geo_ai AFTER INSERT ON escola
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL BEGIN
+        INSERT INTO escola_geo VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS escola_geo_au AFTER UPDATE OF latitude, longitude ON escola BEGIN
+        DELETE FROM escola_geo WHERE id = OLD.id;
+        INSERT INTO escola_geo SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS escola_geo_ad AFTER DELETE ON escola BEGIN
+        DELETE FROM escola_geo WHERE id = OLD.id;
+    END""",
+]
+
+# Busca textual: índice FTS5 de conteúdo externo (os textos ficam só em escola),
+# com tokenizador que ignora acentos; os triggers o mantêm em sincronia.
+escola_fts = table('escola_fts', column('rowid'), column('nome'), column('metodologia'), column('bairro'), column('cidade'))
+
+ESCOLA_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS escola_fts USING fts5(
+        nome, metodologia, bairro, cidade,
+        content='escola', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS escola_fts_ai AFTER INSERT ON escola BEGIN
+        INSERT INTO escola_fts(rowid, nome, metodologia, bairro, cidade)
+        VALUES (NEW.id, NEW.nome, NEW.metodologia, NEW.bairro, NEW.cidade);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS escola_fts_au AFTER UPDATE OF nome, metodologia, bairro, cidade ON escola BEGIN
+        INSERT INTO escola_fts(escola_fts, rowid, nome, metodologia, bairro, cidade)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.metodologia, OLD.bairro, OLD.cidade);
+        INSERT INTO escola_fts(rowid, nome, metodologia, bairro, cidade)
+        VALUES (NEW.id, NEW.nome, NEW.metodologia, NEW.bairro, NEW.cidade);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS escola_fts_ad AFTER DELETE ON escola BEGIN
+        INSERT INTO escola_fts(escola_fts, rowid, nome, metodologia, bairro, cidade)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.metodologia, OLD.bairro, OLD.cidade);
+    END""",
+]
+
+for comando in ESCOLA_GEO_DDL + ESCOLA_FTS_DDL:
+    event.listen(Escola.__table__, 'after_create', DDL(comando).execute_if(dialect='sqlite'))
@@ -14,3 +14,5 @@ class Pais(db.Model):
     idade_crianca = db.Column(db.Integer, nullable=False)
     necessidades_especiais = db.Column(db.Boolean, nullable=False)
     email = db.Column(db.String(100), nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
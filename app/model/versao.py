@@ -0,0 +1,8 @@
+from app.db import db
+
+class VersaoTabela(db.Model):
+    __tablename__ = 'versao_tabela'
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    # epoch em segundos da última alteração; vira o Last-Modified das respostas
+    atualizado_em = db.Column(db.Float, nullable=False)
@@ -0,0 +1,216 @@
+from flask import Blueprint, request, jsonify
+from app.model.escola import Escola, Avaliacao
+from app.schema.escola_schema import serializador_avaliacao
+from app.db import db
+from flasgger import swag_from
+from app.services.avaliacoes import LOTE_MAXIMO, adicionar_avaliacoes, remover_avaliacao, validar_avaliacao
+from app.services.paginacao import ParametroInvalido
+from app.services.versoes import condicional
+from app.services.transmissao import responder_listagem
+
+avaliacao_routes = Blueprint('avaliacao_routes', __name__)
+
+AVALIACAO_PROPRIEDADES = {
+    'id': {'type': 'integer'},
+    'escola_id': {'type': 'integer'},
+    'nota': {'type': 'number'},
+    'nome_avaliador': {'type': 'string'},
+    'comentario': {'type': 'string'}
+}
+
+@avaliacao_routes.route('/escolas/<int:id>/avaliacoes', methods=['POST'])
+@swag_from({
+    'tags': ['Avaliações'],
+    'description': 'Registra uma avaliação para a escola e atualiza a média da escola',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da escola'
+        },
+        {
+            'name': 'avaliacao',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'nota': {'type': 'number', 'description': 'Nota de 0 a 5'},
+                    'nome_avaliador': {'type': 'string'},
+                    'comentario': {'type': 'string'}
+                },
+                'example': {
+                    'nota': 4.5,
+                    'nome_avaliador': 'Maria Souza',
+                    'comentario': 'Ótimos professores'
+                }
+            }
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Avaliação registrada',
+            'schema': {'type': 'object', 'properties': AVALIACAO_PROPRIEDADES}
+        },
+        400: {
+            'description': 'Avaliação inválida'
+        },
+        404: {
+            'description': 'Escola não encontrada'
+        }
+    }
+})
+def create_avaliacao(id):
+    Escola.query.get_or_404(id)
+    avaliacao, erro = validar_avaliacao(request.json)
+    if erro:
+        return jsonify({"error": erro}), 400
+
+    criada, = adicionar_avaliacoes(id, [avaliacao])
+    db.session.commit()
+    return jsonify(criada), 201
+
+@avaliacao_routes.route('/escolas/<int:id>/avaliacoes/lote', methods=['POST'])
+@swag_from({
+    'tags': ['Avaliações'],
+    'description': 'Registra várias avaliações da escola em uma única transação. Se alguma for inválida nenhuma é gravada',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da escola'
+        },
+        {
+            'name': 'avaliacoes',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'nota': {'type': 'number'},
+                        'nome_avaliador': {'type': 'string'},
+                        'comentario': {'type': 'string'}
+                    }
+                }
+            }
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Avaliações registradas',
+            'schema': {'type': 'array', 'items': {'type': 'object', 'properties': AVALIACAO_PROPRIEDADES}}
+        },
+        400: {
+            'description': 'Lote inválido; a resposta lista o erro de cada item'
+        },
+        404: {
+            'description': 'Escola não encontrada'
+        }
+    }
+})
+def create_avaliacoes_lote(id):
+    Escola.query.get_or_404(id)
+    data = request.json
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Envie uma lista de avaliações"}), 400
+    if len(data) > LOTE_MAXIMO:
+        return jsonify({"error": f"O lote aceita até {LOTE_MAXIMO} avaliações"}), 400
+
+    avaliacoes, erros = [], []
+    for indice, item in enumerate(data):
+        avaliacao, erro = validar_avaliacao(item)
+        if erro:
+            erros.append({"indice": indice, "error": erro})
+        avaliacoes.append(avaliacao)
+    if erros:
+        return jsonify({"error": "Avaliações inválidas", "itens": erros}), 400
+
+    criadas = adicionar_avaliacoes(id, avaliacoes)
+    db.session.commit()
+    return jsonify(criadas), 201
+
+@avaliacao_routes.route('/escolas/<int:id>/avaliacoes', methods=['GET'])
+@swag_from({
+    'tags': ['Avaliações'],
+    'description': 'Lista as avaliações da escola, paginadas por cursor',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da escola'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Quantidade máxima por página (padrão 50, máximo 500)'
+        },
+        {
+            'name': 'after',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Cursor devolvido no cabeçalho X-Next-Cursor da página anterior'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Avaliações da escola',
+            'schema': {'type': 'array', 'items': {'type': 'object', 'properties': AVALIACAO_PROPRIEDADES}}
+        },
+        404: {
+            'description': 'Escola não encontrada'
+        }
+    }
+})
+@condicional('avaliacao', 'escola')
+def get_avaliacoes(id):
+    Escola.query.get_or_404(id)
+    try:
+        return responder_listagem(serializador_avaliacao, [Avaliacao.escola_id == id], limite_padrao=50)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+
+@avaliacao_routes.route('/escolas/<int:id>/avaliacoes/<int:avaliacao_id>', methods=['DELETE'])
+@swag_from({
+    'tags': ['Avaliações'],
+    'description': 'Remove uma avaliação e atualiza a média da escola',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da escola'
+        },
+        {
+            'name': 'avaliacao_id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da avaliação'
+        }
+    ],
+    'responses': {
+        204: {
+            'description': 'Avaliação removida'
+        },
+        404: {
+            'description': 'Avaliação não encontrada'
+        }
+    }
+})
+def delete_avaliacao(id, avaliacao_id):
+    avaliacao = Avaliacao.query.filter_by(id=avaliacao_id, escola_id=id).first_or_404()
+    remover_avaliacao(avaliacao)
+    db.session.commit()
+    return '', 204
@@ -1,19 +1,39 @@
 from flask import Blueprint, request, jsonify
-from app.model.escola import Escola
+from app.model.escola import Escola, Avaliacao
+from app.schema.escola_schema import serializador_escola
 from app.db import db
 from flasgger import swag_from
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import and_
-import requests
+from app.services.atualizacao import LOTE_MAXIMO, antecipar_cep, atualizar, atualizar_lote
+from app.services.cep import buscar_endereco_por_cep, normalizar_cep
+from app.services.busca import buscar_escolas
+from app.services.facetas import calcular_facetas
+from app.services.por_ids import buscar_por_ids, ler_ids_da_url, ler_ids_do_corpo
+from app.services.importacao import importar_da_requisicao
+from app.services.geo import RAIO_MAXIMO_KM, RAIO_PADRAO_KM, escolas_mais_proximas, escolas_no_raio
+from app.services.paginacao import ParametroInvalido, ler_campos, ler_limite
+from app.services.resultados import cache_resultados
+from app.services.versoes import condicional
+from app.services.transmissao import responder_listagem, transmitir, transmitir_ids
+from app.services.pesquisa import ids_por_texto, pesquisar_escolas
+from app.services import colunar
 
 escola_routes = Blueprint('escola_routes', __name__)
 
-def buscar_endereco_por_cep(cep):
-    url = f"https://viacep.com.br/ws/{cep}/json/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return None
+CAMPOS_ALTERAVEIS = {
+    'nome': {'type': 'string'},
+    'telefone': {'type': 'string'},
+    'cep': {'type': 'string', 'description': 'Rua, bairro, cidade, estado e coordenadas vêm do CEP quando ele muda'},
+    'numero': {'type': 'string'},
+    'mensalidade': {'type': 'number'},
+    'quantidade_alunos': {'type': 'integer'},
+    'metodologia': {'type': 'string'},
+    'email': {'type': 'string'},
+    'imagem_url': {'type': 'string'},
+    'latitude': {'type': 'number'},
+    'longitude': {'type': 'number'}
+}
 
 @escola_routes.route('/escolas', methods=['POST'])
 @swag_from({
@@ -35,7 +55,9 @@ def buscar_endereco_por_cep(cep):
                     'quantidade_alunos': {'type': 'integer'},
                     'metodologia': {'type': 'string'},
                     'email': {'type': 'string'},
-                    'imagem_url': {'type': 'string'}
+                    'imagem_url': {'type': 'string'},
+                    'latitude': {'type': 'number', 'description': 'Opcional; se ausente vem da geocodificação do CEP'},
+                    'longitude': {'type': 'number', 'description': 'Opcional; se ausente vem da geocodificação do CEP'}
                 },
                 'example': {
                     'nome': 'Escola Exemplo',
@@ -80,7 +102,9 @@ def create_escola():
         quantidade_alunos=data['quantidade_alunos'],
         metodologia=data['metodologia'],
         email=data['email'],
-        imagem_url=data.get('imagem_url')  
+        imagem_url=data.get('imagem_url'),
+        latitude=data.get('latitude', cep_info.get('latitude')),
+        longitude=data.get('longitude', cep_info.get('longitude'))
     )
     db.session.add(new_escola)
     db.session.commit()
@@ -89,7 +113,38 @@ def create_escola():
 @escola_routes.route('/escolas', methods=['GET'])
 @swag_from({
     'tags': ['Escolas'],
+    'produces': ['application/json', 'application/x-ndjson'],
     'description': 'Lista todas as escolas',
+    'parameters': [
+        {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Quantidade máxima de registros por página (até 500). Sem limit a lista vem completa'
+        },
+        {
+            'name': 'after',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Cursor devolvido no cabeçalho X-Next-Cursor da página anterior'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Campos a retornar, separados por vírgula (ex.: id,nome,mensalidade,avaliacao)'
+        },
+        {
+            'name': 'ids',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Ids separados por vírgula (até 100). A resposta vira {"escolas": [...], "nao_encontrados": [...]}, na ordem pedida, e limit/after são ignorados'
+        }
+    ],
     'responses': {
         200: {
             'description': 'Uma lista de escolas',
@@ -112,7 +167,10 @@ def create_escola():
                         'metodologia': {'type': 'string'},
                         'email': {'type': 'string'},
                         'imagem_url': {'type': 'string'},
-                        'avaliacao': {'type': 'number'}
+                        'avaliacao': {'type': 'number'},
+                        'avaliacoes_total': {'type': 'integer'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'}
                     }
                 },
                 'example': [
@@ -138,26 +196,61 @@ def create_escola():
         }
     }
 })
+@condicional('escola')
 def get_escolas():
-    escolas = Escola.query.all()
-    result = [{
-        'id': e.id,
-        'nome': e.nome,
-        'telefone': e.telefone,
-        'rua': e.rua,
-        'numero': e.numero,
-        'bairro': e.bairro,
-        'cidade': e.cidade,
-        'estado': e.estado,
-        'cep': e.cep,
-        'mensalidade': e.mensalidade,
-        'quantidade_alunos': e.quantidade_alunos,
-        'metodologia': e.metodologia,
-        'email': e.email,
-        'imagem_url': e.imagem_url,
-        'avaliacao': e.avaliacao
-    } for e in escolas]
-    return jsonify(result), 200
+    try:
+        if 'ids' in request.args:
+            return jsonify(buscar_por_ids(serializador_escola, ler_ids_da_url(request.args['ids']), 'escolas')), 200
+        return responder_listagem(serializador_escola)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+
+@escola_routes.route('/escolas/batch-get', methods=['POST'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Busca escolas por uma lista de ids em uma única consulta, na ordem pedida',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [3, 1, 2]}
+                }
+            }
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Campos a retornar, separados por vírgula'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Registros encontrados, na ordem dos ids, e os ids que não existem',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'escolas': {'type': 'array', 'items': {'type': 'object'}},
+                    'nao_encontrados': {'type': 'array', 'items': {'type': 'integer'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Lista de ids inválida, vazia ou com mais de 100 ids'
+        }
+    }
+})
+def get_escolas_lote():
+    try:
+        ids = ler_ids_do_corpo(request.get_json(silent=True))
+        return jsonify(buscar_por_ids(serializador_escola, ids, 'escolas')), 200
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
 
 @escola_routes.route('/escolas/<int:id>', methods=['GET'])
 @swag_from({
@@ -192,7 +285,10 @@ def get_escolas():
                     'metodologia': {'type': 'string'},
                     'email': {'type': 'string'},
                     'imagem_url': {'type': 'string'},
-                    'avaliacao': {'type': 'number'}
+                    'avaliacao': {'type': 'number'},
+                    'avaliacoes_total': {'type': 'integer'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 },
                 'example': {
                     'id': 1,
@@ -218,26 +314,10 @@ def get_escolas():
         }
     }
 })
+@condicional('escola')
 def get_escola(id):
     escola = Escola.query.get_or_404(id)
-    result = {
-        'id': escola.id,
-        'nome': escola.nome,
-        'telefone': escola.telefone,
-        'rua': escola.rua,
-        'numero': escola.numero,
-        'bairro': escola.bairro,
-        'cidade': escola.cidade,
-        'estado': escola.estado,
-        'cep': escola.cep,
-        'mensalidade': escola.mensalidade,
-        'quantidade_alunos': escola.quantidade_alunos,
-        'metodologia': escola.metodologia,
-        'email': escola.email,
-        'imagem_url': escola.imagem_url,
-        'avaliacao': escola.avaliacao
-    }
-    return jsonify(result), 200
+    return jsonify(serializador_escola.objeto(escola)), 200
 
 @escola_routes.route('/escolas/<int:id>', methods=['PUT'])
 @swag_from({
@@ -271,7 +351,8 @@ def get_escola(id):
                     'metodologia': {'type': 'string', 'description': 'Metodologia de ensino da escola'},
                     'email': {'type': 'string', 'description': 'Email de contato da escola'},
                     'imagem_url': {'type': 'string', 'description': 'URL da imagem da escola'},
-                    'avaliacao': {'type': 'number', 'description': 'Avaliação média da escola'}
+                    'latitude': {'type': 'number', 'description': 'Latitude da escola'},
+                    'longitude': {'type': 'number', 'description': 'Longitude da escola'}
                 },
                 'example': {
                     'nome': 'Escola Exemplo',
@@ -286,8 +367,7 @@ def get_escola(id):
                     'quantidade_alunos': 250,
                     'metodologia': 'Construtivista',
                     'email': 'contato@escolaexemplo.com.br',
-                    'imagem_url': 'http://exemplo.com/imagem.jpg',
-                    'avaliacao': 4.5
+                    'imagem_url': 'http://exemplo.com/imagem.jpg'
                 }
             }
         }
@@ -302,11 +382,14 @@ def get_escola(id):
     }
 })
 def update_escola(id):
-    escola = Escola.query.get_or_404(id)
     data = request.json
+    enderecos = antecipar_cep(Escola, id, data)
+    escola = Escola.query.get_or_404(id)
 
-    if 'cep' in data:
-        cep_info = buscar_endereco_por_cep(data['cep'])
+    # o mesmo CEP já gravado não precisa de nova consulta
+    cep = normalizar_cep(data.get('cep'))
+    if 'cep' in data and cep != normalizar_cep(escola.cep):
+        cep_info = enderecos[cep] if cep in enderecos else buscar_endereco_por_cep(data['cep'])
         if not cep_info or 'erro' in cep_info:
             return jsonify({"error": "CEP inválido"}), 400
 
@@ -315,6 +398,8 @@ def update_escola(id):
         escola.cidade = cep_info.get('localidade', escola.cidade)
         escola.estado = cep_info.get('uf', escola.estado)
         escola.cep = data['cep']
+        escola.latitude = cep_info.get('latitude')
+        escola.longitude = cep_info.get('longitude')
 
     escola.nome = data.get('nome', escola.nome)
     escola.telefone = data.get('telefone', escola.telefone)
@@ -324,11 +409,122 @@ def update_escola(id):
     escola.metodologia = data.get('metodologia', escola.metodologia)
     escola.email = data.get('email', escola.email)
     escola.imagem_url = data.get('imagem_url', escola.imagem_url)
-    escola.avaliacao = data.get('avaliacao', escola.avaliacao)
+    escola.latitude = data.get('latitude', escola.latitude)
+    escola.longitude = data.get('longitude', escola.longitude)
 
     db.session.commit()
     return jsonify({"message": "Escola atualizada com sucesso"}), 200
 
+@escola_routes.route('/escolas/<int:id>', methods=['PATCH'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Altera só os campos enviados de uma escola; o CEP só é consultado se mudar',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID da escola a ser alterada'
+        },
+        {
+            'name': 'escola',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': CAMPOS_ALTERAVEIS,
+                'example': {'mensalidade': 1650.00, 'quantidade_alunos': 260}
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Escola com os valores atuais'
+        },
+        400: {
+            'description': 'Campo desconhecido, valor inválido ou CEP inválido'
+        },
+        404: {
+            'description': 'Escola não encontrada'
+        },
+        500: {
+            'description': 'O banco recusou a alteração'
+        }
+    }
+})
+def patch_escola(id):
+    dados = request.get_json(silent=True)
+    enderecos = antecipar_cep(Escola, id, dados)
+    escola = Escola.query.get_or_404(id)
+    try:
+        atualizar(escola, dados, enderecos)
+        db.session.commit()
+    except ValueError as erro:
+        db.session.rollback()
+        return jsonify({"error": str(erro)}), 400
+    except SQLAlchemyError as erro:
+        db.session.rollback()
+        return jsonify({"error": f"Falha ao gravar: {erro.__class__.__name__}"}), 500
+    return jsonify(serializador_escola.objeto(escola)), 200
+
+@escola_routes.route('/escolas', methods=['PATCH'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Altera várias escolas em uma única transação; cada item traz o id e só os campos a alterar',
+    'parameters': [
+        {
+            'name': 'escolas',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': dict(CAMPOS_ALTERAVEIS, id={'type': 'integer'}),
+                    'required': ['id']
+                },
+                'example': [{'id': 1, 'mensalidade': 1650.00}, {'id': 2, 'mensalidade': 1720.00, 'cep': '01001-000'}]
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Resultado de cada item, na ordem enviada; itens com erro não impedem os demais',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'resultados': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'indice': {'type': 'integer'},
+                                'id': {'type': 'integer'},
+                                'status': {'type': 'integer', 'description': '200, 400, 404 ou 500'},
+                                'alterados': {'type': 'array', 'items': {'type': 'string'}},
+                                'error': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'atualizados': {'type': 'integer'},
+                    'com_erro': {'type': 'integer'}
+                }
+            }
+        },
+        400: {
+            'description': f'Corpo não é uma lista ou tem mais de {LOTE_MAXIMO} itens'
+        }
+    }
+})
+def patch_escolas():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Envie uma lista de alterações"}), 400
+    if len(data) > LOTE_MAXIMO:
+        return jsonify({"error": f"O lote aceita até {LOTE_MAXIMO} itens"}), 400
+    return jsonify(atualizar_lote(Escola, data)), 200
+
 @escola_routes.route('/escolas/<int:id>', methods=['DELETE'])
 @swag_from({
     'tags': ['Escolas'],
@@ -353,6 +549,7 @@ def update_escola(id):
 })
 def delete_escola(id):
     escola = Escola.query.get_or_404(id)
+    Avaliacao.query.filter_by(escola_id=id).delete(synchronize_session=False)
     db.session.delete(escola)
     db.session.commit()
     return '', 204
@@ -360,6 +557,7 @@ def delete_escola(id):
 @escola_routes.route('/escolas/filtro/metodologia', methods=['GET'])
 @swag_from({
     'tags': ['Escolas'],
+    'produces': ['application/json', 'application/x-ndjson'],
     'description': 'Filtra escolas por metodologia',
     'parameters': [
         {
@@ -367,7 +565,7 @@ def delete_escola(id):
             'in': 'query',
             'required': True,
             'type': 'string',
-            'description': 'Metodologia de ensino da escola'
+            'description': 'Metodologia de ensino da escola (busca por palavras, sem diferenciar maiúsculas e acentos)'
         }
     ],
     'responses': {
@@ -392,38 +590,35 @@ def delete_escola(id):
                         'metodologia': {'type': 'string'},
                         'email': {'type': 'string'},
                         'imagem_url': {'type': 'string'},
-                        'avaliacao': {'type': 'number'}
+                        'avaliacao': {'type': 'number'},
+                        'avaliacoes_total': {'type': 'integer'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'}
                     }
                 }
             }
+        },
+        400: {
+            'description': 'Metodologia não informada'
         }
     }
 })
+@condicional('escola')
+@cache_resultados.em_cache('escola')
 def filtro_metodologia():
     metodologia = request.args.get('metodologia')
-    escolas = Escola.query.filter(Escola.metodologia.ilike(f"%{metodologia}%")).all()
-    result = [{
-        'id': e.id,
-        'nome': e.nome,
-        'telefone': e.telefone,
-        'rua': e.rua,
-        'numero': e.numero,
-        'bairro': e.bairro,
-        'cidade': e.cidade,
-        'estado': e.estado,
-        'cep': e.cep,
-        'mensalidade': e.mensalidade,
-        'quantidade_alunos': e.quantidade_alunos,
-        'metodologia': e.metodologia,
-        'email': e.email,
-        'imagem_url': e.imagem_url,
-        'avaliacao': e.avaliacao
-    } for e in escolas]
-    return jsonify(result), 200
+    em_memoria = colunar.motor_ativo()
+    ids = colunar.ids_por_metodologia(metodologia) if em_memoria else ids_por_texto(metodologia, 'metodologia')
+    if ids is None:
+        return jsonify({"error": "metodologia é obrigatória"}), 400
+    if em_memoria:
+        return transmitir_ids(ids, serializador_escola)
+    return transmitir(serializador_escola.select().where(Escola.id.in_(ids)).order_by(Escola.id), serializador_escola.de_linha())
 
 @escola_routes.route('/escolas/filtro/preco', methods=['GET'])
 @swag_from({
     'tags': ['Escolas'],
+    'produces': ['application/json', 'application/x-ndjson'],
     'description': 'Filtra escolas por preço (mensalidade)',
     'parameters': [
         {
@@ -463,39 +658,36 @@ def filtro_metodologia():
                         'metodologia': {'type': 'string'},
                         'email': {'type': 'string'},
                         'imagem_url': {'type': 'string'},
-                        'avaliacao': {'type': 'number'}
+                        'avaliacao': {'type': 'number'},
+                        'avaliacoes_total': {'type': 'integer'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'}
                     }
                 }
             }
+        },
+        400: {
+            'description': 'min_preco ou max_preco não informado'
         }
     }
 })
+@condicional('escola')
+@cache_resultados.em_cache('escola')
 def filtro_preco():
     min_preco = request.args.get('min_preco')
     max_preco = request.args.get('max_preco')
-    escolas = Escola.query.filter(and_(Escola.mensalidade >= min_preco, Escola.mensalidade <= max_preco)).all()
-    result = [{
-        'id': e.id,
-        'nome': e.nome,
-        'telefone': e.telefone,
-        'rua': e.rua,
-        'numero': e.numero,
-        'bairro': e.bairro,
-        'cidade': e.cidade,
-        'estado': e.estado,
-        'cep': e.cep,
-        'mensalidade': e.mensalidade,
-        'quantidade_alunos': e.quantidade_alunos,
-        'metodologia': e.metodologia,
-        'email': e.email,
-        'imagem_url': e.imagem_url,
-        'avaliacao': e.avaliacao
-    } for e in escolas]
-    return jsonify(result), 200
+    if min_preco is None or max_preco is None:
+        return jsonify({"error": "min_preco e max_preco são obrigatórios"}), 400
+    if colunar.motor_ativo():
+        return transmitir_ids(colunar.ids_por_preco(min_preco, max_preco), serializador_escola)
+    # a ordem faz parte da resposta (e da ETag): a mesma do motor colunar, sem depender do plano
+    consulta = serializador_escola.select().where(and_(Escola.mensalidade >= min_preco, Escola.mensalidade <= max_preco))
+    return transmitir(consulta.order_by(Escola.mensalidade, Escola.id), serializador_escola.de_linha())
 
 @escola_routes.route('/escolas/filtro/avaliacao', methods=['GET'])
 @swag_from({
     'tags': ['Escolas'],
+    'produces': ['application/json', 'application/x-ndjson'],
     'description': 'Filtra escolas por avaliação',
     'parameters': [
         {
@@ -528,40 +720,35 @@ def filtro_preco():
                         'metodologia': {'type': 'string'},
                         'email': {'type': 'string'},
                         'imagem_url': {'type': 'string'},
-                        'avaliacao': {'type': 'number'}
+                        'avaliacao': {'type': 'number'},
+                        'avaliacoes_total': {'type': 'integer'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'}
                     }
                 }
             }
+        },
+        400: {
+            'description': 'min_avaliacao não informada'
         }
     }
 })
+@condicional('escola')
+@cache_resultados.em_cache('escola')
 def filtro_avaliacao():
     min_avaliacao = request.args.get('min_avaliacao')
+    if min_avaliacao is None:
+        return jsonify({"error": "min_avaliacao é obrigatória"}), 400
+    if colunar.motor_ativo():
+        return transmitir_ids(colunar.ids_por_avaliacao(min_avaliacao), serializador_escola)
 
-    escolas = Escola.query.filter(Escola.avaliacao >= min_avaliacao).all()
-    result = [{
-        'id': e.id,
-        'nome': e.nome,
-        'telefone': e.telefone,
-        'rua': e.rua,
-        'numero': e.numero,
-        'bairro': e.bairro,
-        'cidade': e.cidade,
-        'estado': e.estado,
-        'cep': e.cep,
-        'mensalidade': e.mensalidade,
-        'quantidade_alunos': e.quantidade_alunos,
-        'metodologia': e.metodologia,
-        'email': e.email,
-        'imagem_url': e.imagem_url,
-        'avaliacao': e.avaliacao
-    } for e in escolas]
-    return jsonify(result), 200
+    consulta = serializador_escola.select().where(Escola.avaliacao >= min_avaliacao)
+    return transmitir(consulta.order_by(Escola.avaliacao, Escola.id), serializador_escola.de_linha())
 
 @escola_routes.route('/escolas/filtro/localizacao', methods=['GET'])
 @swag_from({
     'tags': ['Escolas'],
-    'description': 'Filtra escolas por localização (a ser implementado)',
+    'description': 'Filtra escolas por proximidade, ordenadas pela distância. Com k retorna as k escolas mais próximas',
     'parameters': [
         {
             'name': 'latitude',
@@ -576,11 +763,25 @@ def filtro_avaliacao():
             'required': True,
             'type': 'number',
             'description': 'Longitude do ponto de referência'
+        },
+        {
+            'name': 'raio_km',
+            'in': 'query',
+            'required': False,
+            'type': 'number',
+            'description': 'Raio de busca em km (padrão 5, máximo 100)'
+        },
+        {
+            'name': 'k',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Retorna as k escolas mais próximas, procurando até raio_km (padrão 100)'
         }
     ],
     'responses': {
         200: {
-            'description': 'Escolas filtradas por proximidade (não implementado)',
+            'description': 'Escolas filtradas por proximidade',
             'schema': {
                 'type': 'array',
                 'items': {
@@ -600,32 +801,266 @@ def filtro_avaliacao():
                         'metodologia': {'type': 'string'},
                         'email': {'type': 'string'},
                         'imagem_url': {'type': 'string'},
-                        'avaliacao': {'type': 'number'}
+                        'avaliacao': {'type': 'number'},
+                        'avaliacoes_total': {'type': 'integer'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'},
+                        'distancia_km': {'type': 'number'}
                     }
                 }
             }
+        },
+        400: {
+            'description': 'Parâmetros de localização inválidos'
         }
     }
 })
+@condicional('escola')
 def filtro_localizacao():
-    latitude = request.args.get('latitude')
-    longitude = request.args.get('longitude')
-    escolas = Escola.query.all()
-    result = [{
-        'id': e.id,
-        'nome': e.nome,
-        'telefone': e.telefone,
-        'rua': e.rua,
-        'numero': e.numero,
-        'bairro': e.bairro,
-        'cidade': e.cidade,
-        'estado': e.estado,
-        'cep': e.cep,
-        'mensalidade': e.mensalidade,
-        'quantidade_alunos': e.quantidade_alunos,
-        'metodologia': e.metodologia,
-        'email': e.email,
-        'imagem_url': e.imagem_url,
-        'avaliacao': e.avaliacao
-    } for e in escolas]
+    try:
+        k = int(request.args['k']) if 'k' in request.args else None
+    except ValueError:
+        k = 0
+    if k is not None and k < 1:
+        return jsonify({"error": "k deve ser um inteiro positivo"}), 400
+    try:
+        latitude = float(request.args['latitude'])
+        longitude = float(request.args['longitude'])
+        raio_km = float(request.args.get('raio_km', RAIO_MAXIMO_KM if k else RAIO_PADRAO_KM))
+    except (KeyError, ValueError):
+        return jsonify({"error": "latitude e longitude são obrigatórias e devem ser números"}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or raio_km <= 0:
+        return jsonify({"error": "Parâmetros de localização inválidos"}), 400
+    raio_km = min(raio_km, RAIO_MAXIMO_KM)
+
+    colunas = serializador_escola.colunas()
+    if k:
+        encontradas = escolas_mais_proximas(colunas, latitude, longitude, k, raio_km)
+    else:
+        encontradas = escolas_no_raio(colunas, latitude, longitude, raio_km)
+
+    serializar = serializador_escola.de_linha()
+    result = []
+    for distancia, linha in encontradas:
+        escola = serializar(linha)
+        escola['distancia_km'] = round(distancia, 3)
+        result.append(escola)
+    return jsonify(result), 200
+
+@escola_routes.route('/escolas/facetas', methods=['GET'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Contagens para montar os filtros: escolas por metodologia, faixa de mensalidade, faixa de avaliação e cidade. Aceita os mesmos filtros da busca combinada',
+    'parameters': [
+        {'name': 'metodologia', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Metodologia de ensino, por palavras e sem diferenciar maiúsculas e acentos, como em /escolas/filtro/metodologia'},
+        {'name': 'min_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Mensalidade mínima'},
+        {'name': 'max_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Mensalidade máxima'},
+        {'name': 'min_avaliacao', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Avaliação mínima'},
+        {'name': 'cidade', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Cidade'},
+        {'name': 'estado', 'in': 'query', 'required': False, 'type': 'string', 'description': 'UF'},
+        {'name': 'latitude', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Latitude do ponto de referência'},
+        {'name': 'longitude', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Longitude do ponto de referência'},
+        {'name': 'raio_km', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Raio de busca em km (padrão 5, máximo 100)'},
+        {'name': 'largura_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Largura das faixas de mensalidade (padrão 500, mínimo 50)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Contagens das escolas que atendem aos filtros',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'total': {'type': 'integer'},
+                    'metodologias': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'metodologia': {'type': 'string'},
+                                'total': {'type': 'integer'}
+                            }
+                        }
+                    },
+                    'mensalidades': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'min': {'type': 'number'},
+                                'max': {'type': 'number'},
+                                'total': {'type': 'integer'}
+                            }
+                        }
+                    },
+                    'avaliacoes': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'min': {'type': 'number'},
+                                'max': {'type': 'number'},
+                                'total': {'type': 'integer'}
+                            }
+                        }
+                    },
+                    'sem_avaliacao': {'type': 'integer'},
+                    'cidades': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'cidade': {'type': 'string'},
+                                'estado': {'type': 'string'},
+                                'total': {'type': 'integer'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetros inválidos'
+        }
+    }
+})
+@condicional('escola')
+@cache_resultados.em_cache('escola')
+def facetas_escolas():
+    try:
+        result = calcular_facetas()
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+    return jsonify(result), 200
+
+@escola_routes.route('/escolas/busca', methods=['GET'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Busca escolas combinando filtros em uma única consulta, com ordenação e paginação por cursor. Em modo debug inclui o plano da consulta',
+    'parameters': [
+        {'name': 'metodologia', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Metodologia de ensino, por palavras e sem diferenciar maiúsculas e acentos, como em /escolas/filtro/metodologia'},
+        {'name': 'min_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Mensalidade mínima'},
+        {'name': 'max_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Mensalidade máxima'},
+        {'name': 'min_avaliacao', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Avaliação mínima'},
+        {'name': 'cidade', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Cidade'},
+        {'name': 'estado', 'in': 'query', 'required': False, 'type': 'string', 'description': 'UF'},
+        {'name': 'latitude', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Latitude do ponto de referência'},
+        {'name': 'longitude', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Longitude do ponto de referência'},
+        {'name': 'raio_km', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Raio de busca em km (padrão 5, máximo 100)'},
+        {'name': 'ordenar', 'in': 'query', 'required': False, 'type': 'string', 'description': 'id, mensalidade, avaliacao, quantidade_alunos ou distancia; prefixo - para decrescente'},
+        {'name': 'limit', 'in': 'query', 'required': False, 'type': 'integer', 'description': 'Tamanho da página (padrão 20, máximo 500)'},
+        {'name': 'after', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Valor de proximo_cursor da página anterior'},
+        {'name': 'fields', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Campos a retornar, separados por vírgula'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Página de escolas encontradas',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'escolas': {'type': 'array', 'items': {'type': 'object'}},
+                    'proximo_cursor': {'type': 'string'},
+                    'plano_consulta': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetros de busca inválidos'
+        }
+    }
+})
+@condicional('escola')
+def busca_escolas():
+    try:
+        result = buscar_escolas(serializador_escola.campos)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+    return jsonify(result), 200
+
+@escola_routes.route('/escolas/pesquisa', methods=['GET'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Pesquisa textual em nome, metodologia, bairro e cidade, sem diferenciar acentos, ordenada por relevância (bm25)',
+    'parameters': [
+        {'name': 'q', 'in': 'query', 'required': True, 'type': 'string', 'description': 'Texto a pesquisar (ex.: montessori centro)'},
+        {'name': 'limit', 'in': 'query', 'required': False, 'type': 'integer', 'description': 'Quantidade máxima de resultados (padrão 20, máximo 500)'},
+        {'name': 'fields', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Campos a retornar, separados por vírgula'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Escolas encontradas, da mais para a menos relevante',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer'},
+                        'nome': {'type': 'string'},
+                        'metodologia': {'type': 'string'},
+                        'relevancia': {'type': 'number'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetros de pesquisa inválidos'
+        }
+    }
+})
+@condicional('escola')
+def pesquisa_escolas():
+    try:
+        campos = ler_campos(serializador_escola.campos)
+        limite = ler_limite(20)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "q é obrigatório"}), 400
+    result = pesquisar_escolas(campos, q, limite)
+    return jsonify(result), 200
+
+@escola_routes.route('/escolas/importacao', methods=['POST'])
+@swag_from({
+    'tags': ['Escolas'],
+    'description': 'Importa escolas em massa a partir de um CSV (cabeçalho com os nomes dos campos) ou NDJSON (um objeto por linha). Cada CEP distinto é consultado uma única vez e as linhas são gravadas em lotes; linhas inválidas são relatadas sem interromper a importação',
+    'consumes': ['text/csv', 'application/x-ndjson'],
+    'parameters': [
+        {'name': 'formato', 'in': 'query', 'required': False, 'type': 'string', 'enum': ['csv', 'ndjson'], 'description': 'Sobrepõe o formato deduzido pelo Content-Type'},
+        {
+            'name': 'arquivo',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'string',
+                'example': 'nome,telefone,cep,numero,mensalidade,quantidade_alunos,metodologia,email\nEscola Exemplo,(11) 1234-5678,01001-000,100,1500.0,300,Montessori,contato@exemplo.com'
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Relatório da importação',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'recebidas': {'type': 'integer'},
+                    'inseridas': {'type': 'integer'},
+                    'com_erro': {'type': 'integer'},
+                    'erros': {
+                        'type': 'array',
+                        'items': {'type': 'object', 'properties': {'linha': {'type': 'integer'}, 'error': {'type': 'string'}}}
+                    },
+                    'ceps_distintos': {'type': 'integer'},
+                    'segundos': {'type': 'number'},
+                    'linhas_por_segundo': {'type': 'number'}
+                }
+            }
+        },
+        400: {
+            'description': 'Formato não suportado'
+        }
+    }
+})
+def importar_escolas():
+    result, erro = importar_da_requisicao(Escola)
+    if erro:
+        return jsonify({"error": erro}), 400
     return jsonify(result), 200
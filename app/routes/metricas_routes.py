@@ -0,0 +1,25 @@
+from flask import Blueprint, current_app, jsonify
+from flasgger import swag_from
+from app.services.metricas import TIPO_CONTEUDO, metricas
+
+metricas_routes = Blueprint('metricas_routes', __name__)
+
+
+@metricas_routes.route('/metrics', methods=['GET'])
+@swag_from({
+    'tags': ['Métricas'],
+    'produces': ['text/plain'],
+    'description': 'Métricas da aplicação no formato texto do Prometheus: latência por endpoint, comandos e tempo de SQL por requisição e chamadas ao ViaCEP',
+    'responses': {
+        200: {
+            'description': 'Métricas do processo'
+        },
+        404: {
+            'description': 'Métricas desativadas (METRICS_ENABLED)'
+        }
+    }
+})
+def get_metricas():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({"error": "Métricas desativadas"}), 404
+    return current_app.response_class(metricas.exportar(), content_type=TIPO_CONTEUDO)
@@ -1,21 +1,31 @@
 from flask import Blueprint, request, jsonify
 from app.model.pais import Pais
-from app.schema.pais_schema import PaisSchema
+from app.schema.pais_schema import serializador_pais
 from app.db import db
 from flasgger import swag_from
-import requests
+from sqlalchemy.exc import SQLAlchemyError
+from app.services.atualizacao import LOTE_MAXIMO, antecipar_cep, atualizar, atualizar_lote
+from app.services.cep import buscar_endereco_por_cep, normalizar_cep
+from app.services.importacao import importar_da_requisicao
+from app.services.paginacao import ParametroInvalido
+from app.services.por_ids import buscar_por_ids, ler_ids_da_url, ler_ids_do_corpo
+from app.services.recomendacoes import K_MAXIMO, K_PADRAO, recomendar
+from app.services.versoes import condicional
+from app.services.transmissao import responder_listagem
 
 pais_routes = Blueprint('pais_routes', __name__)
-pais_schema = PaisSchema()
-paises_schema = PaisSchema(many=True)
 
-def buscar_endereco_por_cep(cep):
-    url = f"https://viacep.com.br/ws/{cep}/json/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return None
+CAMPOS_ALTERAVEIS = {
+    'nome_completo': {'type': 'string'},
+    'telefone': {'type': 'string'},
+    'cep': {'type': 'string', 'description': 'Rua, bairro, cidade, estado e coordenadas vêm do CEP quando ele muda'},
+    'numero': {'type': 'string'},
+    'idade_crianca': {'type': 'integer'},
+    'necessidades_especiais': {'type': 'boolean'},
+    'email': {'type': 'string'},
+    'latitude': {'type': 'number'},
+    'longitude': {'type': 'number'}
+}
 
 @pais_routes.route('/pais', methods=['POST'])
 @swag_from({
@@ -35,7 +45,9 @@ def buscar_endereco_por_cep(cep):
                     'numero': {'type': 'string'},
                     'idade_crianca': {'type': 'integer'},
                     'necessidades_especiais': {'type': 'boolean'},
-                    'email': {'type': 'string'}
+                    'email': {'type': 'string'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 },
                 'example': {
                     'nome_completo': 'João Silva',
@@ -66,7 +78,9 @@ def buscar_endereco_por_cep(cep):
                     'cep': {'type': 'string'},
                     'idade_crianca': {'type': 'integer'},
                     'necessidades_especiais': {'type': 'boolean'},
-                    'email': {'type': 'string'}
+                    'email': {'type': 'string'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 }
             }
         },
@@ -93,17 +107,50 @@ def create_pais():
         cep=data['cep'],
         idade_crianca=data['idade_crianca'],
         necessidades_especiais=data['necessidades_especiais'],
-        email=data['email']
+        email=data['email'],
+        latitude=data.get('latitude', cep_info.get('latitude')),
+        longitude=data.get('longitude', cep_info.get('longitude'))
     )
     db.session.add(new_pais)
     db.session.commit()
 
-    return pais_schema.jsonify(new_pais), 201
+    return jsonify(serializador_pais.objeto(new_pais)), 201
 
 @pais_routes.route('/pais', methods=['GET'])
 @swag_from({
     'tags': ['Pais'],
+    'produces': ['application/json', 'application/x-ndjson'],
     'description': 'Lista todos os pais ou responsáveis',
+    'parameters': [
+        {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Quantidade máxima de registros por página (até 500). Sem limit a lista vem completa'
+        },
+        {
+            'name': 'after',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Cursor devolvido no cabeçalho X-Next-Cursor da página anterior'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Campos a retornar, separados por vírgula (ex.: id,nome_completo,cidade)'
+        },
+        {
+            'name': 'ids',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Ids separados por vírgula (até 100). A resposta vira {"pais": [...], "nao_encontrados": [...]}, na ordem pedida, e limit/after são ignorados'
+        }
+    ],
     'responses': {
         200: {
             'description': 'Uma lista de pais ou responsáveis',
@@ -123,16 +170,70 @@ def create_pais():
                         'cep': {'type': 'string'},
                         'idade_crianca': {'type': 'integer'},
                         'necessidades_especiais': {'type': 'boolean'},
-                        'email': {'type': 'string'}
+                        'email': {'type': 'string'},
+                        'latitude': {'type': 'number'},
+                        'longitude': {'type': 'number'}
                     }
                 }
             }
         }
     }
 })
+@condicional('pais')
 def get_paises():
-    paises = Pais.query.all()
-    return paises_schema.jsonify(paises), 200
+    try:
+        if 'ids' in request.args:
+            return jsonify(buscar_por_ids(serializador_pais, ler_ids_da_url(request.args['ids']), 'pais')), 200
+        return responder_listagem(serializador_pais)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+
+@pais_routes.route('/pais/batch-get', methods=['POST'])
+@swag_from({
+    'tags': ['Pais'],
+    'description': 'Busca pais ou responsáveis por uma lista de ids em uma única consulta, na ordem pedida',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [3, 1, 2]}
+                }
+            }
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Campos a retornar, separados por vírgula'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Registros encontrados, na ordem dos ids, e os ids que não existem',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'pais': {'type': 'array', 'items': {'type': 'object'}},
+                    'nao_encontrados': {'type': 'array', 'items': {'type': 'integer'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Lista de ids inválida, vazia ou com mais de 100 ids'
+        }
+    }
+})
+def get_pais_lote():
+    try:
+        ids = ler_ids_do_corpo(request.get_json(silent=True))
+        return jsonify(buscar_por_ids(serializador_pais, ids, 'pais')), 200
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
 
 @pais_routes.route('/pais/<int:id>', methods=['GET'])
 @swag_from({
@@ -163,7 +264,9 @@ def get_paises():
                     'cep': {'type': 'string'},
                     'idade_crianca': {'type': 'integer'},
                     'necessidades_especiais': {'type': 'boolean'},
-                    'email': {'type': 'string'}
+                    'email': {'type': 'string'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 }
             }
         },
@@ -172,9 +275,69 @@ def get_paises():
         }
     }
 })
+@condicional('pais')
 def get_pais(id):
     pais = Pais.query.get_or_404(id)
-    return pais_schema.jsonify(pais), 200
+    return jsonify(serializador_pais.objeto(pais)), 200
+
+@pais_routes.route('/pais/<int:id>/recomendacoes', methods=['GET'])
+@swag_from({
+    'tags': ['Pais'],
+    'description': 'Recomenda escolas para o pai ou responsável. Cada escola recebe uma nota de 0 a 1 por critério (distância do endereço do responsável, mensalidade, avaliação, metodologia e tamanho da escola) e a pontuação é a média ponderada pelos pesos; os pesos padrão vêm de RECOMMENDATION_WEIGHTS e podem ser trocados por requisição',
+    'parameters': [
+        {'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'},
+        {'name': 'k', 'in': 'query', 'required': False, 'type': 'integer', 'description': f'Quantas escolas retornar (padrão {K_PADRAO}, máximo {K_MAXIMO})'},
+        {'name': 'orcamento', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Mensalidade pretendida; acima dela a nota de preço cai na proporção do excesso (padrão: a mensalidade mediana)'},
+        {'name': 'metodologia', 'in': 'query', 'required': False, 'type': 'string', 'description': 'Metodologia preferida (sem diferenciar maiúsculas e acentos); sem ela o critério não conta'},
+        {'name': 'peso_distancia', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Peso da distância (ignorado se o responsável não tiver coordenadas)'},
+        {'name': 'peso_preco', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Peso da mensalidade'},
+        {'name': 'peso_avaliacao', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Peso da avaliação (média bayesiana das notas)'},
+        {'name': 'peso_metodologia', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Peso da metodologia preferida'},
+        {'name': 'peso_capacidade', 'in': 'query', 'required': False, 'type': 'number', 'description': 'Peso do tamanho da escola (menos alunos, nota maior)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Escolas recomendadas, da maior para a menor pontuação',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'pais_id': {'type': 'integer'},
+                    'pesos': {'type': 'object', 'description': 'Pesos efetivamente usados, normalizados para somar 1'},
+                    'recomendacoes': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer'},
+                                'nome': {'type': 'string'},
+                                'mensalidade': {'type': 'number'},
+                                'metodologia': {'type': 'string'},
+                                'avaliacao': {'type': 'number'},
+                                'pontuacao': {'type': 'number'},
+                                'distancia_km': {'type': 'number'},
+                                'notas': {'type': 'object', 'description': 'Nota de 0 a 1 de cada critério'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetros inválidos'
+        },
+        404: {
+            'description': 'Pai ou responsável não encontrado'
+        }
+    }
+})
+@condicional('pais', 'escola')
+def recomendacoes_pais(id):
+    pais = Pais.query.get_or_404(id)
+    try:
+        result = recomendar(pais)
+    except ParametroInvalido as erro:
+        return jsonify({"error": str(erro)}), 400
+    return jsonify(result), 200
 
 @pais_routes.route('/pais/<int:id>', methods=['PUT'])
 @swag_from({
@@ -200,7 +363,9 @@ def get_pais(id):
                     'numero': {'type': 'string'},
                     'idade_crianca': {'type': 'integer'},
                     'necessidades_especiais': {'type': 'boolean'},
-                    'email': {'type': 'string'}
+                    'email': {'type': 'string'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 }
             }
         }
@@ -222,7 +387,9 @@ def get_pais(id):
                     'cep': {'type': 'string'},
                     'idade_crianca': {'type': 'integer'},
                     'necessidades_especiais': {'type': 'boolean'},
-                    'email': {'type': 'string'}
+                    'email': {'type': 'string'},
+                    'latitude': {'type': 'number'},
+                    'longitude': {'type': 'number'}
                 }
             }
         },
@@ -232,11 +399,14 @@ def get_pais(id):
     }
 })
 def update_pais(id):
-    pais = Pais.query.get_or_404(id)
     data = request.json
+    enderecos = antecipar_cep(Pais, id, data)
+    pais = Pais.query.get_or_404(id)
 
-    if 'cep' in data:
-        cep_info = buscar_endereco_por_cep(data['cep'])
+    # o mesmo CEP já gravado não precisa de nova consulta
+    cep = normalizar_cep(data.get('cep'))
+    if 'cep' in data and cep != normalizar_cep(pais.cep):
+        cep_info = enderecos[cep] if cep in enderecos else buscar_endereco_por_cep(data['cep'])
         if not cep_info or 'erro' in cep_info:
             return jsonify({"error": "CEP inválido"}), 400
 
@@ -245,6 +415,8 @@ def update_pais(id):
         pais.cidade = cep_info.get('localidade', pais.cidade)
         pais.estado = cep_info.get('uf', pais.estado)
         pais.cep = data['cep']
+        pais.latitude = cep_info.get('latitude')
+        pais.longitude = cep_info.get('longitude')
 
     pais.nome_completo = data.get('nome_completo', pais.nome_completo)
     pais.telefone = data.get('telefone', pais.telefone)
@@ -252,9 +424,120 @@ def update_pais(id):
     pais.idade_crianca = data.get('idade_crianca', pais.idade_crianca)
     pais.necessidades_especiais = data.get('necessidades_especiais', pais.necessidades_especiais)
     pais.email = data.get('email', pais.email)
+    pais.latitude = data.get('latitude', pais.latitude)
+    pais.longitude = data.get('longitude', pais.longitude)
 
     db.session.commit()
-    return pais_schema.jsonify(pais), 200
+    return jsonify(serializador_pais.objeto(pais)), 200
+
+@pais_routes.route('/pais/<int:id>', methods=['PATCH'])
+@swag_from({
+    'tags': ['Pais'],
+    'description': 'Altera só os campos enviados de um pai ou responsável; o CEP só é consultado se mudar',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer'
+        },
+        {
+            'name': 'pai',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': CAMPOS_ALTERAVEIS,
+                'example': {'telefone': '(11) 98765-4321', 'idade_crianca': 6}
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Pai ou responsável com os valores atuais'
+        },
+        400: {
+            'description': 'Campo desconhecido, valor inválido ou CEP inválido'
+        },
+        404: {
+            'description': 'Pai ou responsável não encontrado'
+        },
+        500: {
+            'description': 'O banco recusou a alteração'
+        }
+    }
+})
+def patch_pais(id):
+    dados = request.get_json(silent=True)
+    enderecos = antecipar_cep(Pais, id, dados)
+    pais = Pais.query.get_or_404(id)
+    try:
+        atualizar(pais, dados, enderecos)
+        db.session.commit()
+    except ValueError as erro:
+        db.session.rollback()
+        return jsonify({"error": str(erro)}), 400
+    except SQLAlchemyError as erro:
+        db.session.rollback()
+        return jsonify({"error": f"Falha ao gravar: {erro.__class__.__name__}"}), 500
+    return jsonify(serializador_pais.objeto(pais)), 200
+
+@pais_routes.route('/pais', methods=['PATCH'])
+@swag_from({
+    'tags': ['Pais'],
+    'description': 'Altera vários pais ou responsáveis em uma única transação; cada item traz o id e só os campos a alterar',
+    'parameters': [
+        {
+            'name': 'pais',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': dict(CAMPOS_ALTERAVEIS, id={'type': 'integer'}),
+                    'required': ['id']
+                },
+                'example': [{'id': 1, 'idade_crianca': 7}, {'id': 2, 'cep': '01001-000'}]
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Resultado de cada item, na ordem enviada; itens com erro não impedem os demais',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'resultados': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'indice': {'type': 'integer'},
+                                'id': {'type': 'integer'},
+                                'status': {'type': 'integer', 'description': '200, 400, 404 ou 500'},
+                                'alterados': {'type': 'array', 'items': {'type': 'string'}},
+                                'error': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'atualizados': {'type': 'integer'},
+                    'com_erro': {'type': 'integer'}
+                }
+            }
+        },
+        400: {
+            'description': f'Corpo não é uma lista ou tem mais de {LOTE_MAXIMO} itens'
+        }
+    }
+})
+def patch_paises():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Envie uma lista de alterações"}), 400
+    if len(data) > LOTE_MAXIMO:
+        return jsonify({"error": f"O lote aceita até {LOTE_MAXIMO} itens"}), 400
+    return jsonify(atualizar_lote(Pais, data)), 200
 
 @pais_routes.route('/pais/<int:id>', methods=['DELETE'])
 @swag_from({
@@ -282,3 +565,50 @@ def delete_pais(id):
     db.session.delete(pais)
     db.session.commit()
     return '', 204
+
+@pais_routes.route('/pais/importacao', methods=['POST'])
+@swag_from({
+    'tags': ['Pais'],
+    'description': 'Importa pais ou responsáveis em massa a partir de um CSV (cabeçalho com os nomes dos campos) ou NDJSON (um objeto por linha). Cada CEP distinto é consultado uma única vez e as linhas são gravadas em lotes; linhas inválidas são relatadas sem interromper a importação',
+    'consumes': ['text/csv', 'application/x-ndjson'],
+    'parameters': [
+        {'name': 'formato', 'in': 'query', 'required': False, 'type': 'string', 'enum': ['csv', 'ndjson'], 'description': 'Sobrepõe o formato deduzido pelo Content-Type'},
+        {
+            'name': 'arquivo',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'string',
+                'example': 'nome_completo,telefone,cep,numero,idade_crianca,necessidades_especiais,email\nJoão Silva,(11) 1234-5678,01001-000,123,7,false,joao.silva@example.com'
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Relatório da importação',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'recebidas': {'type': 'integer'},
+                    'inseridas': {'type': 'integer'},
+                    'com_erro': {'type': 'integer'},
+                    'erros': {
+                        'type': 'array',
+                        'items': {'type': 'object', 'properties': {'linha': {'type': 'integer'}, 'error': {'type': 'string'}}}
+                    },
+                    'ceps_distintos': {'type': 'integer'},
+                    'segundos': {'type': 'number'},
+                    'linhas_por_segundo': {'type': 'number'}
+                }
+            }
+        },
+        400: {
+            'description': 'Formato não suportado'
+        }
+    }
+})
+def importar_pais():
+    result, erro = importar_da_requisicao(Pais)
+    if erro:
+        return jsonify({"error": erro}), 400
+    return jsonify(result), 200
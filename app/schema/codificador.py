@@ -0,0 +1,43 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dependência opcional; sem ela fica o json da biblioteca padrão
+    orjson = None
+
+CODIFICADORES = ('orjson', 'json')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Mesmo contrato do provedor padrão do Flask (jsonify, app.json.dumps),
+    # codificando com orjson. Objetos que o orjson não conhece (Decimal, date,
+    # dataclass...) passam pelo default do Flask.
+
+    def _opcoes(self, sort_keys, indentar=False):
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        opcoes = self._opcoes(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent') is not None)
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=opcoes).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        corpo = orjson.dumps(obj, default=self.default, option=self._opcoes(self.sort_keys, indentar))
+        return self._app.response_class(corpo, mimetype=self.mimetype)
+
+
+def init_app(app):
+    # JSON_CODIFICADOR: 'orjson' (padrão quando instalado) ou 'json'
+    codificador = app.config.setdefault('JSON_CODIFICADOR', 'orjson' if orjson else 'json')
+    if codificador not in CODIFICADORES:
+        raise ValueError(f'JSON_CODIFICADOR deve ser um de {CODIFICADORES}')
+    if codificador == 'orjson':
+        if orjson is None:
+            raise RuntimeError('JSON_CODIFICADOR=orjson, mas o pacote orjson não está instalado')
+        app.json = OrjsonProvider(app)
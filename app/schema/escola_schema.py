@@ -1,6 +1,7 @@
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from marshmallow import fields
 from app.model.escola import Escola, Avaliacao
+from app.schema.serializador import Serializador
 
 class AvaliacaoSchema(SQLAlchemyAutoSchema):
     class Meta:
@@ -11,3 +12,7 @@ class EscolaSchema(SQLAlchemyAutoSchema):
 
     class Meta:
         model = Escola
+
+# colunas internas (normalização para busca e soma das notas) não são expostas
+serializador_escola = Serializador(Escola, excluir=('metodologia_normalizada', 'avaliacoes_soma'))
+serializador_avaliacao = Serializador(Avaliacao)
@@ -1,7 +1,10 @@
 from app.db import ma
 from app.model.pais import Pais
+from app.schema.serializador import Serializador
 
 class PaisSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Pais
         load_instance = True
+
+serializador_pais = Serializador(Pais)
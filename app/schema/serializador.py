@@ -0,0 +1,50 @@
+from functools import lru_cache
+from operator import attrgetter
+
+from sqlalchemy import inspect, select
+
+
+@lru_cache(maxsize=256)
+def _compilar(campos, por_atributo):
+    # Monta uma vez, por conjunto de campos, a função que leva a linha ou o
+    # objeto a um dict. As linhas trazem os campos pedidos primeiro, na mesma
+    # ordem; colunas extras no fim (cursor, coordenadas) ficam de fora do zip.
+    if por_atributo:
+        ler = attrgetter(*campos)
+        if len(campos) == 1:
+            return lambda objeto: {campos[0]: ler(objeto)}
+        return lambda objeto: dict(zip(campos, ler(objeto)))
+    return lambda linha: dict(zip(campos, linha))
+
+
+class Serializador:
+    # Serialização de um modelo montada uma vez a partir das colunas mapeadas.
+    # Serve tanto linhas de select() (tuplas, sem objetos ORM) quanto instâncias.
+
+    def __init__(self, modelo, excluir=()):
+        self.modelo = modelo
+        self.campos = tuple(
+            atributo.key for atributo in inspect(modelo).column_attrs if atributo.key not in excluir
+        )
+
+    def colunas(self, campos=None):
+        return [getattr(self.modelo, campo) for campo in campos or self.campos]
+
+    def select(self, campos=None):
+        return select(*self.colunas(campos))
+
+    def de_linha(self, campos=None):
+        return _compilar(tuple(campos or self.campos), False)
+
+    def de_objeto(self, campos=None):
+        return _compilar(tuple(campos or self.campos), True)
+
+    def linha(self, linha, campos=None):
+        return self.de_linha(campos)(linha)
+
+    def objeto(self, objeto, campos=None):
+        return self.de_objeto(campos)(objeto)
+
+    def linhas(self, linhas, campos=None):
+        serializar = self.de_linha(campos)
+        return [serializar(linha) for linha in linhas]
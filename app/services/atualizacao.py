@@ -0,0 +1,213 @@
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import db
+from app.services.cep import buscar_endereco_por_cep, cep_encontrado, normalizar_cep
+from app.services.importacao import CAMPOS_IMPORTACAO, PARALELISMO, converter_campo, resolver_ceps
+
+LOTE_MAXIMO = 500
+
+
+def converter_alteracoes(modelo, dados):
+    # Só os campos enviados, com os mesmos conversores da importação; o
+    # endereço (rua, bairro, cidade, estado) continua vindo do CEP.
+    if not isinstance(dados, dict):
+        raise ValueError('Envie um objeto com os campos a alterar')
+    alteracoes = {}
+    for campo, valor in dados.items():
+        if campo not in CAMPOS_IMPORTACAO[modelo]:
+            raise ValueError(f'{campo} não pode ser alterado')
+        alteracoes[campo] = converter_campo(modelo, campo, valor)
+    if 'cep' in alteracoes and normalizar_cep(alteracoes['cep']) is None:
+        raise ValueError('CEP inválido')
+    return alteracoes
+
+
+def cep_alterado(objeto, alteracoes):
+    # O CEP só é consultado quando muda; o mesmo CEP com outra formatação não conta
+    if 'cep' not in alteracoes:
+        return None
+    cep = normalizar_cep(alteracoes['cep'])
+    return cep if cep != normalizar_cep(objeto.cep) else None
+
+
+def _validar_endereco(endereco):
+    if not cep_encontrado(endereco):
+        raise ValueError('CEP inválido' if endereco else 'Não foi possível consultar o CEP')
+    return endereco
+
+
+def _liberar_conexao():
+    # Encerra a transação de leitura para devolver a conexão ao pool antes da
+    # espera pelo ViaCEP (o cep_cache grava por outra conexão). Só é chamada
+    # antes de carregar os registros que serão alterados: eles são lidos depois
+    # da espera, e uma escrita concorrente feita nesse meio tempo é vista.
+    db.session.commit()
+
+
+def ceps_gravados(modelo, ids):
+    # {id: CEP normalizado} só dos registros que existem; lê apenas essa coluna
+    consulta = db.session.query(modelo.id, modelo.cep).filter(modelo.id.in_(ids))
+    return {linha.id: normalizar_cep(linha.cep) for linha in consulta}
+
+
+def antecipar_cep(modelo, id_, dados):
+    # Lê só o CEP gravado e consulta o do corpo apenas se o registro existe e o
+    # CEP mudou, já sem conexão presa. Devolve {cep: endereço} com o que foi
+    # consultado, para atualizar() e a view não repetirem a consulta.
+    cep = normalizar_cep(dados.get('cep')) if isinstance(dados, dict) else None
+    if cep is None:
+        return {}
+    gravados = ceps_gravados(modelo, [id_])
+    if id_ not in gravados or cep == gravados[id_]:
+        return {}
+    _liberar_conexao()
+    return {cep: buscar_endereco_por_cep(cep)}
+
+
+def aplicar_alteracoes(objeto, alteracoes, endereco=None):
+    # Atribui só o que difere do valor atual: o UPDATE do flush leva apenas
+    # essas colunas e um PATCH que não muda nada não grava nem troca a versão.
+    valores = {}
+    if endereco is not None:
+        valores.update(
+            rua=endereco.get('logradouro', objeto.rua), bairro=endereco.get('bairro', objeto.bairro),
+            cidade=endereco.get('localidade', objeto.cidade), estado=endereco.get('uf', objeto.estado),
+            latitude=endereco.get('latitude'), longitude=endereco.get('longitude'),
+        )
+        valores.update(alteracoes)
+    else:
+        valores.update((campo, valor) for campo, valor in alteracoes.items() if campo != 'cep')
+
+    alterados = []
+    for campo, valor in valores.items():
+        if getattr(objeto, campo) != valor:
+            setattr(objeto, campo, valor)
+            alterados.append(campo)
+    return alterados
+
+
+def _endereco(cep, enderecos):
+    return enderecos[cep] if cep in enderecos else buscar_endereco_por_cep(cep)
+
+
+def atualizar(objeto, dados, enderecos=None):
+    alteracoes = converter_alteracoes(type(objeto), dados)
+    cep = cep_alterado(objeto, alteracoes)
+    endereco = _validar_endereco(_endereco(cep, enderecos or {})) if cep else None
+    return aplicar_alteracoes(objeto, alteracoes, endereco)
+
+
+def _falhou(resultado, erro):
+    resultado.pop('alterados', None)
+    resultado.update(status=500, error=f'Falha ao gravar: {erro.__class__.__name__}')
+
+
+def _gravar_um_a_um(aplicados):
+    # O commit do lote falhou: cada item é reaplicado no seu próprio savepoint,
+    # e só o que o banco recusar fica de fora.
+    for resultado, objeto, alteracoes, endereco in aplicados:
+        try:
+            with db.session.begin_nested():
+                resultado['alterados'] = aplicar_alteracoes(objeto, alteracoes, endereco)
+        except SQLAlchemyError as erro:
+            _falhou(resultado, erro)
+    try:
+        db.session.commit()
+    except SQLAlchemyError as erro:
+        db.session.rollback()
+        for resultado, *_ in aplicados:
+            if resultado['status'] == 200:
+                _falhou(resultado, erro)
+
+
+def _id_do_item(item):
+    id_ = item.get('id') if isinstance(item, dict) else None
+    return id_ if isinstance(id_, int) and not isinstance(id_, bool) else None
+
+
+def _ceps_alterados(pares, gravados):
+    # Segue o CEP de cada registro item a item, como o laço que aplica as
+    # alterações: só entra o que difere do valor gravado ou do item anterior.
+    atuais, ceps = dict(gravados), set()
+    for id_, cep in pares:
+        if id_ in atuais and cep != atuais[id_]:
+            ceps.add(cep)
+            atuais[id_] = cep
+    return ceps
+
+
+def atualizar_lote(modelo, itens, paralelismo=PARALELISMO):
+    # Os CEPs que mudam em registros existentes resolvidos uma vez cada (em
+    # paralelo), um SELECT para todos os registros e um único commit. Itens
+    # inválidos não impedem os demais; cada um volta com o seu status, na ordem enviada.
+    convertidos = []
+    for item in itens:
+        # um item que não é objeto cai no erro de id logo abaixo
+        try:
+            convertidos.append(converter_alteracoes(
+                modelo, {campo: valor for campo, valor in item.items() if campo != 'id'}
+            ) if isinstance(item, dict) else None)
+        except ValueError as erro:
+            convertidos.append(erro)
+
+    # Os CEPs são resolvidos antes de carregar os registros: a comparação usa só
+    # a coluna cep (ceps_gravados) e a conexão é liberada durante a espera. Os
+    # registros vêm do SELECT feito depois, então o que for comparado e gravado
+    # parte dos valores atuais, mesmo que outra escrita aconteça durante a espera.
+    pares = [
+        (_id_do_item(item), normalizar_cep(alteracoes['cep']))
+        for item, alteracoes in zip(itens, convertidos)
+        if _id_do_item(item) is not None and isinstance(alteracoes, dict) and 'cep' in alteracoes
+    ]
+    enderecos = {}
+    if pares:
+        ceps = _ceps_alterados(pares, ceps_gravados(modelo, {id_ for id_, _ in pares}))
+        if ceps:
+            _liberar_conexao()
+            enderecos = resolver_ceps(ceps, paralelismo)
+
+    ids = {id_ for id_ in map(_id_do_item, itens) if id_ is not None}
+    objetos = {objeto.id: objeto for objeto in modelo.query.filter(modelo.id.in_(ids))} if ids else {}
+
+    resultados, pendentes = [], []
+    for indice, (item, alteracoes) in enumerate(zip(itens, convertidos)):
+        id_ = _id_do_item(item)
+        resultado = {'indice': indice, 'id': id_}
+        resultados.append(resultado)
+        if id_ is None:
+            resultado.update(status=400, error='Cada item precisa de um id inteiro')
+            continue
+        if id_ not in objetos:
+            resultado.update(status=404, error='Registro não encontrado')
+            continue
+        if isinstance(alteracoes, Exception):
+            resultado.update(status=400, error=str(alteracoes))
+            continue
+        pendentes.append((resultado, objetos[id_], alteracoes))
+
+    aplicados = []
+    for resultado, objeto, alteracoes in pendentes:
+        # o mesmo registro pode vir mais de uma vez: o CEP é comparado com o
+        # valor deixado pelos itens anteriores
+        cep = cep_alterado(objeto, alteracoes)
+        try:
+            # um item anterior recusado, ou uma escrita durante a espera, pode
+            # deixar um CEP fora da conta de _ceps_alterados
+            endereco = _validar_endereco(_endereco(cep, enderecos)) if cep else None
+        except ValueError as erro:
+            resultado.update(status=400, error=str(erro))
+            continue
+        resultado.update(status=200, alterados=aplicar_alteracoes(objeto, alteracoes, endereco))
+        aplicados.append((resultado, objeto, alteracoes, endereco))
+
+    try:
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        _gravar_um_a_um(aplicados)
+
+    return {
+        'resultados': resultados,
+        'atualizados': sum(resultado['status'] == 200 for resultado in resultados),
+        'com_erro': sum(resultado['status'] != 200 for resultado in resultados),
+    }
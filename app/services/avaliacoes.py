@@ -0,0 +1,57 @@
+from sqlalchemy import case, insert, update
+
+from app.db import db
+from app.model.escola import Avaliacao, Escola
+
+NOTA_MINIMA = 0
+NOTA_MAXIMA = 5
+LOTE_MAXIMO = 1000
+
+
+def validar_avaliacao(data):
+    if not isinstance(data, dict):
+        return None, 'Avaliação deve ser um objeto'
+    nota = data.get('nota')
+    if isinstance(nota, bool) or not isinstance(nota, (int, float)) or not NOTA_MINIMA <= nota <= NOTA_MAXIMA:
+        return None, f'nota deve ser um número entre {NOTA_MINIMA} e {NOTA_MAXIMA}'
+    nome_avaliador = data.get('nome_avaliador')
+    if not isinstance(nome_avaliador, str) or not nome_avaliador.strip() or len(nome_avaliador) > 100:
+        return None, 'nome_avaliador é obrigatório (até 100 caracteres)'
+    comentario = data.get('comentario')
+    if comentario is not None and (not isinstance(comentario, str) or len(comentario) > 200):
+        return None, 'comentario deve ter até 200 caracteres'
+    return {'nota': float(nota), 'nome_avaliador': nome_avaliador.strip(), 'comentario': comentario}, None
+
+
+def _somar_ao_agregado(escola_id, quantidade, soma):
+    # Atualização O(1): ajusta total e soma guardados em vez de recalcular AVG(nota).
+    # No UPDATE do SQLite o lado direito enxerga os valores antigos da linha.
+    total = Escola.avaliacoes_total + quantidade
+    db.session.execute(
+        update(Escola)
+        .where(Escola.id == escola_id)
+        .values(
+            avaliacoes_total=total,
+            avaliacoes_soma=Escola.avaliacoes_soma + soma,
+            avaliacao=case((total > 0, (Escola.avaliacoes_soma + soma) / total), else_=None),
+        )
+        .execution_options(synchronize_session=False, escolas_alteradas=(escola_id,))
+    )
+
+
+def adicionar_avaliacoes(escola_id, avaliacoes):
+    linhas = [dict(avaliacao, escola_id=escola_id) for avaliacao in avaliacoes]
+    if len(linhas) == 1:
+        criada = Avaliacao(**linhas[0])
+        db.session.add(criada)
+        db.session.flush()
+        ids = [criada.id]
+    else:
+        ids = list(db.session.scalars(insert(Avaliacao).returning(Avaliacao.id, sort_by_parameter_order=True), linhas))
+    _somar_ao_agregado(escola_id, len(linhas), sum(linha['nota'] for linha in linhas))
+    return [dict(linha, id=id_) for linha, id_ in zip(linhas, ids)]
+
+
+def remover_avaliacao(avaliacao):
+    _somar_ao_agregado(avaliacao.escola_id, -1, -avaliacao.nota)
+    db.session.delete(avaliacao)
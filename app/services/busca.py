@@ -0,0 +1,207 @@
+import math
+
+from flask import current_app, request
+from sqlalchemy import and_, or_, select, tuple_
+
+from app.db import db
+from app.model.escola import Escola
+from app.schema.escola_schema import serializador_escola
+from app.services.geo import RAIO_MAXIMO_KM, RAIO_PADRAO_KM, escolas_no_raio, filtro_caixa
+from app.services.paginacao import (
+    ParametroInvalido, codificar_cursor, decodificar_cursor, ler_campos, ler_limite
+)
+from app.services.pesquisa import ids_por_texto, termos_pesquisa
+
+LIMITE_PADRAO = 20
+ORDENACOES = ('id', 'mensalidade', 'avaliacao', 'quantidade_alunos', 'distancia')
+
+
+def _numero(nome):
+    valor = request.args.get(nome)
+    if valor in (None, ''):
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        raise ParametroInvalido(f'{nome} deve ser um número')
+
+
+def ler_criterios():
+    criterios = {
+        'metodologia': request.args.get('metodologia') or None,
+        'cidade': request.args.get('cidade') or None,
+        'estado': request.args.get('estado') or None,
+        'min_preco': _numero('min_preco'),
+        'max_preco': _numero('max_preco'),
+        'min_avaliacao': _numero('min_avaliacao'),
+        'latitude': _numero('latitude'),
+        'longitude': _numero('longitude'),
+        'raio_km': _numero('raio_km'),
+    }
+    if criterios['metodologia'] and not termos_pesquisa(criterios['metodologia']):
+        raise ParametroInvalido('metodologia deve ter ao menos uma palavra')
+    if (criterios['latitude'] is None) != (criterios['longitude'] is None):
+        raise ParametroInvalido('latitude e longitude devem ser informadas juntas')
+    if criterios['latitude'] is not None:
+        if not (-90 <= criterios['latitude'] <= 90 and -180 <= criterios['longitude'] <= 180):
+            raise ParametroInvalido('Coordenadas inválidas')
+        raio = criterios['raio_km'] if criterios['raio_km'] is not None else RAIO_PADRAO_KM
+        if raio <= 0:
+            raise ParametroInvalido('raio_km deve ser maior que zero')
+        criterios['raio_km'] = min(raio, RAIO_MAXIMO_KM)
+    return criterios
+
+
+def montar_filtros(criterios):
+    # Só comparações diretas de coluna com valor (igualdade e faixas), para que o
+    # SQLite consiga usar índices; nada de LIKE com curinga no início. A
+    # metodologia segue a regra de /escolas/filtro/metodologia (palavras como
+    # prefixo, pelo índice FTS), então "Montessoriano" também encontra "Montessori".
+    filtros = []
+    if criterios['metodologia']:
+        filtros.append(Escola.id.in_(ids_por_texto(criterios['metodologia'], 'metodologia')))
+    if criterios['cidade']:
+        filtros.append(Escola.cidade == criterios['cidade'])
+    if criterios['estado']:
+        filtros.append(Escola.estado == criterios['estado'].upper())
+    if criterios['min_preco'] is not None:
+        filtros.append(Escola.mensalidade >= criterios['min_preco'])
+    if criterios['max_preco'] is not None:
+        filtros.append(Escola.mensalidade <= criterios['max_preco'])
+    if criterios['min_avaliacao'] is not None:
+        filtros.append(Escola.avaliacao >= criterios['min_avaliacao'])
+    if criterios['latitude'] is not None:
+        filtros.append(filtro_caixa(criterios['latitude'], criterios['longitude'], criterios['raio_km']))
+    return filtros
+
+
+def ler_ordenacao(com_localizacao):
+    ordenar = request.args.get('ordenar') or ('distancia' if com_localizacao else 'id')
+    decrescente = ordenar.startswith('-')
+    campo = ordenar.lstrip('-')
+    if campo not in ORDENACOES:
+        raise ParametroInvalido(f"ordenar deve ser um de: {', '.join(ORDENACOES)}")
+    if campo == 'distancia' and not com_localizacao:
+        raise ParametroInvalido('Ordenar por distância exige latitude e longitude')
+    return campo, decrescente
+
+
+def _numero_valido(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def validar_cursor(cursor, campo_ordem):
+    # O cursor vem do cliente: o id e o valor da ordenação precisam ter o tipo
+    # da coluna, senão a comparação (no SQLite ou no sort em Python) não faz sentido.
+    if isinstance(cursor['id'], bool):
+        raise ParametroInvalido('Cursor inválido')
+    if campo_ordem == 'id':
+        return cursor
+    valor = cursor.get('v')
+    if campo_ordem == 'distancia' and valor is None:
+        raise ParametroInvalido('Cursor inválido')
+    if valor is not None and not _numero_valido(valor):
+        raise ParametroInvalido('Cursor inválido')
+    return cursor
+
+
+def _depois_do_cursor(coluna, decrescente, valor, ultimo_id):
+    # Continuação por chave (valor, id), respeitando onde o SQLite põe os NULLs:
+    # primeiro na ordem crescente, por último na decrescente.
+    if decrescente:
+        if valor is None:
+            return and_(coluna.is_(None), Escola.id < ultimo_id)
+        return or_(tuple_(coluna, Escola.id) < tuple_(valor, ultimo_id), coluna.is_(None))
+    if valor is None:
+        return or_(and_(coluna.is_(None), Escola.id > ultimo_id), coluna.isnot(None))
+    return tuple_(coluna, Escola.id) > tuple_(valor, ultimo_id)
+
+
+def plano_consulta(consulta):
+    compilada = consulta.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    parametros = tuple(compilada.params[nome] for nome in compilada.positiontup)
+    linhas = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compilada}', parametros)
+    return [linha[-1] for linha in linhas]
+
+
+def buscar_escolas(campos_publicos):
+    criterios = ler_criterios()
+    com_localizacao = criterios['latitude'] is not None
+    campo_ordem, decrescente = ler_ordenacao(com_localizacao)
+    campos = ler_campos(campos_publicos)
+    limite = ler_limite(LIMITE_PADRAO)
+    after = request.args.get('after')
+    cursor = validar_cursor(decodificar_cursor(after), campo_ordem) if after else None
+
+    filtros = montar_filtros(criterios)
+    colunas = serializador_escola.colunas(campos)
+    extras = [Escola.id.label('cursor_id')]
+    if campo_ordem not in ('id', 'distancia'):
+        extras.append(getattr(Escola, campo_ordem).label('cursor_valor'))
+
+    if com_localizacao:
+        # Com localização o corte final é a distância exata, calculada em Python sobre os
+        # candidatos da caixa; a ordenação e o cursor são aplicados sobre essa lista.
+        def valor_ordem(distancia, linha):
+            if campo_ordem == 'distancia':
+                return distancia
+            if campo_ordem == 'id':
+                return linha.cursor_id
+            return linha.cursor_valor
+
+        def chave(item):
+            valor = valor_ordem(*item)
+            return (float('-inf') if valor is None else valor, item[1].cursor_id)
+
+        encontradas = escolas_no_raio(
+            colunas + extras, criterios['latitude'], criterios['longitude'], criterios['raio_km'], filtros
+        )
+        encontradas.sort(key=chave, reverse=decrescente)
+        if cursor is not None:
+            valor = cursor['id'] if campo_ordem == 'id' else cursor.get('v')
+            chave_cursor = (float('-inf') if valor is None else valor, cursor['id'])
+            encontradas = [
+                item for item in encontradas
+                if (chave(item) < chave_cursor if decrescente else chave(item) > chave_cursor)
+            ]
+        linhas = encontradas[:limite + 1]
+        consulta = None
+    else:
+        consulta = select(*colunas, *extras).where(*filtros)
+        if campo_ordem == 'id':
+            if cursor is not None:
+                consulta = consulta.where(Escola.id < cursor['id'] if decrescente else Escola.id > cursor['id'])
+            ordem = [Escola.id.desc() if decrescente else Escola.id]
+        else:
+            coluna = getattr(Escola, campo_ordem)
+            if cursor is not None:
+                consulta = consulta.where(_depois_do_cursor(coluna, decrescente, cursor.get('v'), cursor['id']))
+            ordem = [coluna.desc(), Escola.id.desc()] if decrescente else [coluna, Escola.id]
+        consulta = consulta.order_by(*ordem).limit(limite + 1)
+        linhas = [(None, linha) for linha in db.session.execute(consulta)]
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        distancia, ultima = linhas[-1]
+        if com_localizacao:
+            proximo_cursor = codificar_cursor(ultima.cursor_id, v=valor_ordem(distancia, ultima))
+        elif campo_ordem == 'id':
+            proximo_cursor = codificar_cursor(ultima.cursor_id)
+        else:
+            proximo_cursor = codificar_cursor(ultima.cursor_id, v=ultima.cursor_valor)
+
+    serializar = serializador_escola.de_linha(campos)
+    escolas = []
+    for distancia, linha in linhas:
+        escola = serializar(linha)
+        if distancia is not None:
+            escola['distancia_km'] = round(distancia, 3)
+        escolas.append(escola)
+
+    resultado = {'escolas': escolas, 'proximo_cursor': proximo_cursor}
+    if current_app.debug:
+        if consulta is None:
+            consulta = select(*colunas).where(*filtros)
+        resultado['plano_consulta'] = plano_consulta(consulta)
+    return resultado
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db import db
+from app.model.cep import CepCache
+from app.services.geocodificacao import geocodificador
+from app.services.lru import LRUCache
+from app.services.viacep import cliente_viacep
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_cep(cep):
+    digitos = re.sub(r'\D', '', str(cep or ''))
+    return digitos if len(digitos) == 8 else None
+
+
+def cep_encontrado(endereco):
+    return bool(endereco) and 'erro' not in endereco
+
+
+class ResolvedorCep:
+    # Resolve CEPs em camadas: LRU em memória -> índice local (CEP_INDEX_FILE)
+    # -> tabela cep_cache no SQLite -> ViaCEP, que só é consultado para CEPs
+    # fora do índice.
+    # Endereços encontrados são enriquecidos com latitude/longitude antes de guardar.
+    # Respostas negativas ({"erro": true}) também são guardadas, com TTL próprio.
+    # A leitura do cep_cache não escreve: os hits são contados em memória e
+    # gravados em lote, junto da próxima gravação ou a cada CEP_CACHE_HITS_LOTE hits.
+
+    def __init__(self, app=None):
+        self.memoria = LRUCache()
+        self.ttl = 30 * 24 * 3600
+        self.ttl_negativo = 24 * 3600
+        self._lock = threading.Lock()
+        self.indice = None
+        self.hits_lote = 100
+        self._hits_pendentes = Counter()
+        self._estatisticas = {'hits_memoria': 0, 'hits_indice': 0, 'hits_banco': 0, 'misses': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CEP_CACHE_SIZE', 4096)
+        app.config.setdefault('CEP_CACHE_TTL', 30 * 24 * 3600)
+        app.config.setdefault('CEP_CACHE_NEGATIVE_TTL', 24 * 3600)
+        app.config.setdefault('CEP_CACHE_HITS_LOTE', 100)
+        self.memoria = LRUCache(app.config['CEP_CACHE_SIZE'])
+        self.ttl = app.config['CEP_CACHE_TTL']
+        self.ttl_negativo = app.config['CEP_CACHE_NEGATIVE_TTL']
+        self.hits_lote = int(app.config['CEP_CACHE_HITS_LOTE'])
+        self._hits_pendentes = Counter()
+        self.indice = self._abrir_indice(app)
+        app.extensions['cep'] = self
+
+    def _abrir_indice(self, app):
+        # importado aqui: o índice usa normalizar_cep deste módulo
+        from app.services.indice_cep import IndiceCep
+        app.config.setdefault('CEP_INDEX_FILE', os.path.join(app.instance_path, 'ceps.idx'))
+        caminho = app.config['CEP_INDEX_FILE']
+        if not caminho or not os.path.exists(caminho):
+            return None
+        try:
+            return IndiceCep(caminho)
+        except (OSError, ValueError):
+            logger.exception('índice de CEP %s ignorado', caminho)
+            return None
+
+    def buscar(self, cep):
+        cep = normalizar_cep(cep)
+        if cep is None:
+            return {'erro': True}
+
+        endereco = self.em_cache(cep)
+        if endereco is not None:
+            return endereco
+
+        endereco = self.buscar_no_indice(cep)
+        if endereco is None:
+            endereco = self._consultar_viacep(cep)
+            if endereco is None:
+                # falha de rede ou status inesperado: não guarda, tenta de novo na próxima
+                return None
+        if cep_encontrado(endereco) and 'latitude' not in endereco:
+            coordenadas = geocodificador.localizar(endereco)
+            if coordenadas is not None:
+                endereco['latitude'], endereco['longitude'] = coordenadas
+        self.armazenar(cep, endereco)
+        return dict(endereco)
+
+    def em_cache(self, cep):
+        # só as camadas locais (memória, índice e banco); None se for preciso consultar o ViaCEP
+        endereco = self.memoria.get(cep)
+        if endereco is not None:
+            self._contar('hits_memoria')
+            return dict(endereco)
+
+        endereco = self._ler_do_indice(cep)
+        if endereco is not None:
+            self._contar('hits_indice')
+            return endereco
+
+        endereco = self.ler_do_banco(cep)
+        if endereco is not None:
+            self._contar('hits_banco')
+            return dict(endereco)
+        return None
+
+    def resolvido_localmente(self, cep):
+        # memória ou índice, sem tocar no banco nem na rede; não conta como
+        # hit, a rota conta quando ler o endereço
+        return self.memoria.get(cep) is not None or self._ler_do_indice(cep) is not None
+
+    def buscar_no_indice(self, cep):
+        # depois do cache: o índice vale mesmo sem coordenadas (só a
+        # geocodificação sai para a rede); None conta como miss, falta o ViaCEP
+        endereco = self.indice.buscar(cep) if self.indice is not None else None
+        self._contar('hits_indice' if endereco is not None else 'misses')
+        return endereco
+
+    def armazenar(self, cep, endereco):
+        encontrado = cep_encontrado(endereco)
+        ttl = self.ttl if encontrado else self.ttl_negativo
+        agora = time.time()
+        valores = {
+            'endereco': json.dumps(endereco),
+            'encontrado': encontrado,
+            'expira_em': agora + ttl,
+            'atualizado_em': agora,
+        }
+        stmt = insert(CepCache.__table__).values(cep=cep, hits=0, **valores)
+        stmt = stmt.on_conflict_do_update(index_elements=['cep'], set_=valores)
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+            # a transação de escrita já está aberta: leva junto os hits pendentes
+            self._gravar_hits(conn)
+        self.memoria.set(cep, endereco, ttl)
+
+    def invalidar(self, cep):
+        cep = normalizar_cep(cep)
+        self.memoria.pop(cep)
+        with db.engine.begin() as conn:
+            conn.execute(CepCache.__table__.delete().where(CepCache.cep == cep))
+
+    def estatisticas(self):
+        with self._lock:
+            estatisticas = dict(self._estatisticas)
+        estatisticas['entradas_memoria'] = len(self.memoria)
+        return estatisticas
+
+    def _ler_do_indice(self, cep):
+        # o endereço do índice vale direto quando já tem coordenadas ou quando
+        # não há geocodificador para completá-lo; fora isso segue pelo cache
+        if self.indice is None:
+            return None
+        endereco = self.indice.buscar(cep)
+        if endereco is None or ('latitude' not in endereco and geocodificador.url):
+            return None
+        return endereco
+
+    def ler_do_banco(self, cep):
+        tabela = CepCache.__table__
+        with db.engine.connect() as conn:
+            linha = conn.execute(
+                select(tabela.c.endereco, tabela.c.expira_em).where(tabela.c.cep == cep)
+            ).first()
+        restante = linha.expira_em - time.time() if linha is not None else 0
+        if restante <= 0:
+            return None
+        self._contar_hit(cep)
+        endereco = json.loads(linha.endereco)
+        self.memoria.set(cep, endereco, restante)
+        return endereco
+
+    def _contar_hit(self, cep):
+        with self._lock:
+            self._hits_pendentes[cep] += 1
+            cheio = sum(self._hits_pendentes.values()) >= self.hits_lote
+        if cheio:
+            with db.engine.begin() as conn:
+                self._gravar_hits(conn)
+
+    def _gravar_hits(self, conn):
+        with self._lock:
+            pendentes, self._hits_pendentes = self._hits_pendentes, Counter()
+        if not pendentes:
+            return
+        tabela = CepCache.__table__
+        conn.execute(
+            update(tabela).where(tabela.c.cep == bindparam('chave')).values(hits=tabela.c.hits + bindparam('soma')),
+            [{'chave': cep, 'soma': soma} for cep, soma in pendentes.items()],
+        )
+
+    def _consultar_viacep(self, cep):
+        return cliente_viacep.buscar(cep)
+
+    def _contar(self, chave):
+        with self._lock:
+            self._estatisticas[chave] += 1
+
+
+resolvedor_cep = ResolvedorCep()
+
+
+def buscar_endereco_por_cep(cep):
+    return resolvedor_cep.buscar(cep)
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from functools import partial
+
+import aiohttp
+
+from app.services.cep import cep_encontrado, normalizar_cep, resolvedor_cep
+from app.services.geocodificacao import geocodificador
+from app.services.metricas import metricas
+from app.services.viacep import cliente_viacep
+
+logger = logging.getLogger(__name__)
+
+STATUS_RETENTAVEIS = (429, 500, 502, 503, 504)
+
+
+class ResolvedorCepAssincrono:
+    # Mesmas camadas do ResolvedorCep, mas a espera pelo ViaCEP e pelo
+    # geocodificador acontece no event loop (aiohttp), sem ocupar thread. A
+    # leitura e a gravação no cep_cache continuam síncronas e vão para o
+    # executor limitado do servidor ASGI. O endereço termina na memória do
+    # ResolvedorCep, onde a rota síncrona o encontra logo em seguida.
+
+    def __init__(self, app, executor):
+        self.app = app
+        self.executor = executor
+        self.retries = int(app.config['VIACEP_RETRIES'])
+        self.backoff = float(app.config['VIACEP_BACKOFF'])
+        self.conexoes = int(app.config['ASGI_VIACEP_CONEXOES'])
+        self._em_andamento = {}
+        self._sessao = None
+
+    def sessao(self):
+        # criada no primeiro uso, dentro do event loop do servidor
+        if self._sessao is None:
+            self._sessao = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.conexoes), headers={'Accept': 'application/json'}
+            )
+        return self._sessao
+
+    async def resolver(self, cep):
+        cep = normalizar_cep(cep)
+        if cep is None or resolvedor_cep.resolvido_localmente(cep):
+            return
+        # requisições simultâneas com o mesmo CEP aguardam a mesma consulta
+        tarefa = self._em_andamento.get(cep)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._resolver(cep))
+            self._em_andamento[cep] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_andamento.pop(cep, None))
+        try:
+            await asyncio.shield(tarefa)
+        except Exception:
+            # a rota ainda resolve o CEP pelo caminho síncrono
+            logger.exception('falha ao resolver o CEP %s de forma assíncrona', cep)
+
+    async def _resolver(self, cep):
+        # as mesmas camadas de ResolvedorCep.buscar, só pela interface pública dele
+        if await self._em_thread(resolvedor_cep.ler_do_banco, cep) is not None:
+            return
+        endereco = resolvedor_cep.buscar_no_indice(cep)
+        if endereco is None:
+            endereco = await self._consultar_viacep(cep)
+            if endereco is None:
+                return
+        if cep_encontrado(endereco) and 'latitude' not in endereco:
+            coordenadas = await self._geocodificar(endereco)
+            if coordenadas is not None:
+                endereco['latitude'], endereco['longitude'] = coordenadas
+        await self._em_thread(resolvedor_cep.armazenar, cep, endereco)
+
+    async def _consultar_viacep(self, cep):
+        conexao, leitura = cliente_viacep.timeout
+        timeout = aiohttp.ClientTimeout(sock_connect=conexao, sock_read=leitura)
+        for tentativa in range(self.retries + 1):
+            if tentativa:
+                await asyncio.sleep(self.backoff * 2 ** (tentativa - 1))
+            inicio = time.perf_counter()
+            try:
+                async with self.sessao().get(cliente_viacep.url.format(cep=cep), timeout=timeout) as response:
+                    if response.status != 200:
+                        metricas.observar_viacep('assincrono', inicio, f'status_{response.status}')
+                        if response.status in STATUS_RETENTAVEIS:
+                            continue
+                        return None
+                    endereco = await response.json(content_type=None)
+            except asyncio.TimeoutError:
+                metricas.observar_viacep('assincrono', inicio, 'timeout')
+                continue
+            except aiohttp.ClientError:
+                metricas.observar_viacep('assincrono', inicio, 'rede')
+                continue
+            except ValueError:
+                metricas.observar_viacep('assincrono', inicio, 'json')
+                return None
+            metricas.observar_viacep('assincrono', inicio)
+            return endereco
+        return None
+
+    async def _geocodificar(self, endereco):
+        if not geocodificador.url:
+            return None
+        cabecalhos = {'User-Agent': geocodificador.session.headers['User-Agent']}
+        # o mesmo prazo total e o mesmo intervalo mínimo do cliente síncrono
+        prazo = time.monotonic() + geocodificador.prazo
+        for params in geocodificador.tentativas(endereco):
+            espera = geocodificador.reservar_vaga(prazo)
+            if espera is None:
+                return None
+            await asyncio.sleep(espera)
+            restante = geocodificador.timeout_no_prazo(prazo)
+            if restante is None:
+                return None
+            params = {chave: str(valor) for chave, valor in params.items() if valor is not None}
+            try:
+                async with self.sessao().get(
+                    geocodificador.url, params=params, headers=cabecalhos,
+                    timeout=aiohttp.ClientTimeout(total=restante),
+                ) as response:
+                    resultados = await response.json(content_type=None) if response.status == 200 else []
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                return None
+            coordenadas = geocodificador.interpretar(resultados)
+            if coordenadas is not None:
+                return coordenadas
+        return None
+
+    async def _em_thread(self, funcao, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self._no_contexto, funcao, *args))
+
+    def _no_contexto(self, funcao, *args):
+        with self.app.app_context():
+            return funcao(*args)
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
@@ -0,0 +1,274 @@
+import re
+import threading
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+
+from app.db import db
+from app.model.escola import Escola
+from app.services.pesquisa import termos_pesquisa
+from app.services.versoes import ler_versoes, versoes_gravadas
+
+# ids alterados de uma vez acima dos quais vale mais recarregar tudo
+LIMITE_INCREMENTAL = 5000
+# versões com alterações conhecidas guardadas à espera do próximo uso do retrato
+LIMITE_VERSOES = 1000
+PALAVRA = re.compile(r'[^\W_]+')
+_ALTERADAS = 'escolas_alteradas'
+
+
+class Dicionario:
+    # Valores distintos de uma coluna de texto na ordem em que apareceram; o
+    # código de um valor é a sua posição. Só cresce: valores que deixam de
+    # existir continuam com código, sem escola nenhuma apontando para ele.
+
+    def __init__(self, valores=()):
+        self.valores = list(valores)
+        self.indice = {valor: codigo for codigo, valor in enumerate(self.valores)}
+
+    def __len__(self):
+        return len(self.valores)
+
+    def copia(self):
+        return Dicionario(self.valores)
+
+    def codificar(self, valores):
+        for valor in dict.fromkeys(valores):
+            if valor not in self.indice:
+                self.indice[valor] = len(self.valores)
+                self.valores.append(valor)
+        return np.fromiter(map(self.indice.__getitem__, valores), dtype=np.int32, count=len(valores))
+
+    def codigo(self, valor):
+        # -1 quando o valor não existe: nenhuma posição casa
+        return self.indice.get(valor, -1)
+
+
+class ColunasEscola:
+    # Retrato da tabela escola em arrays NumPy, todos na ordem de id; a posição
+    # i de cada array é a mesma escola. metodologia, cidade e estado vêm
+    # codificados por dicionário, coordenadas já em radianos e NaN onde a
+    # coluna é nula.
+
+    NUMERICAS = (
+        'mensalidade', 'avaliacao', 'avaliacoes_total', 'avaliacoes_soma', 'quantidade_alunos', 'latitude', 'longitude',
+    )
+    CODIFICADAS = {'metodologia': 'metodologias', 'cidade': 'cidades', 'estado': 'estados'}
+    ARRAYS = ('ids', *NUMERICAS, *CODIFICADAS)
+
+    def __init__(self, versao, arrays, dicionarios):
+        self.versao = versao
+        for nome in self.ARRAYS:
+            setattr(self, nome, arrays[nome])
+        for nome in self.CODIFICADAS.values():
+            setattr(self, nome, dicionarios[nome])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def de_linhas(cls, versao, linhas, dicionarios=None):
+        dicionarios = dicionarios or {nome: Dicionario() for nome in cls.CODIFICADAS.values()}
+        colunas = list(zip(*linhas)) or [()] * len(cls.ARRAYS)
+        ids, *numericas, metodologia, cidade, estado = colunas
+        arrays = {'ids': np.array(ids, dtype=np.int64)}
+        arrays.update(
+            (nome, np.array(valores, dtype=np.float64)) for nome, valores in zip(cls.NUMERICAS, numericas)
+        )
+        arrays['latitude'] = np.radians(arrays['latitude'])
+        arrays['longitude'] = np.radians(arrays['longitude'])
+        for nome, valores in zip(cls.CODIFICADAS, (metodologia, cidade, estado)):
+            arrays[nome] = dicionarios[cls.CODIFICADAS[nome]].codificar(valores)
+        return cls(versao, arrays, dicionarios)
+
+    def atualizar(self, versao, linhas, ids_alterados):
+        # Cópia com as escolas alteradas trocadas pelas linhas atuais; as que
+        # não voltaram do banco foram removidas. Quem ainda usa este retrato
+        # continua vendo um estado consistente.
+        dicionarios = {nome: getattr(self, nome).copia() for nome in self.CODIFICADAS.values()}
+        novas = ColunasEscola.de_linhas(versao, linhas, dicionarios)
+        alterados = np.fromiter(ids_alterados, dtype=np.int64, count=len(ids_alterados))
+        manter = ~np.isin(self.ids, alterados)
+        arrays = {nome: np.concatenate((getattr(self, nome)[manter], getattr(novas, nome))) for nome in self.ARRAYS}
+        ordem = np.argsort(arrays['ids'], kind='stable')
+        return ColunasEscola(versao, {nome: valores[ordem] for nome, valores in arrays.items()}, dicionarios)
+
+    def ids_em_ordem(self, mascara, *chaves):
+        # ids das escolas da máscara ordenados pelas chaves e por id, o mesmo
+        # ORDER BY (chaves, id) das rotas no caminho SQL
+        posicoes = np.flatnonzero(mascara)
+        if chaves:
+            posicoes = posicoes[np.lexsort((self.ids[posicoes], *(chave[posicoes] for chave in reversed(chaves))))]
+        return self.ids[posicoes].tolist()
+
+
+def carregar_linhas(ids=None):
+    consulta = select(
+        Escola.id, *(getattr(Escola, nome) for nome in ColunasEscola.NUMERICAS),
+        Escola.metodologia_normalizada, Escola.cidade, Escola.estado,
+    ).order_by(Escola.id)
+    if ids is not None:
+        consulta = consulta.where(Escola.id.in_(sorted(ids)))
+    # direto pelo driver: sem os processadores de tipo do ORM a carga cai pela metade
+    compilada = consulta.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    parametros = tuple(compilada.params[nome] for nome in compilada.positiontup or ())
+    return db.session.connection().exec_driver_sql(str(compilada), parametros).fetchall()
+
+
+def carregar_colunas(versao):
+    return ColunasEscola.de_linhas(versao, carregar_linhas())
+
+
+class CatalogoEscolas:
+    # Mantém o retrato colunar de um app. A versão da tabela escola (a mesma do
+    # ETag) é conferida a cada uso. Quando muda e todas as versões no meio
+    # foram gravadas por este processo, só as escolas alteradas são relidas;
+    # escritas de outro processo, ou em massa sem dizer os ids, recarregam
+    # tudo. Uma única thread atualiza e as demais usam o novo retrato.
+
+    def __init__(self):
+        self._colunas = None
+        self._lock = threading.Lock()
+        self._alteracoes = {}
+        self._lock_alteracoes = threading.Lock()
+
+    def registrar(self, versao, ids):
+        # ids None: a versão mudou sem sabermos quais escolas
+        if self._colunas is None:
+            return
+        with self._lock_alteracoes:
+            self._alteracoes[versao] = ids
+            while len(self._alteracoes) > LIMITE_VERSOES:
+                del self._alteracoes[next(iter(self._alteracoes))]
+
+    def _alteradas(self, de, ate):
+        with self._lock_alteracoes:
+            ids = set()
+            for versao in range(de + 1, ate + 1):
+                alteradas = self._alteracoes.get(versao)
+                if alteradas is None:
+                    return None
+                ids |= alteradas
+            return ids
+
+    def _descartar(self, ate):
+        with self._lock_alteracoes:
+            for versao in [versao for versao in self._alteracoes if versao <= ate]:
+                del self._alteracoes[versao]
+
+    def colunas(self):
+        versao = ler_versoes(('escola',))['escola'][0]
+        atuais = self._colunas
+        if atuais is not None and atuais.versao == versao:
+            return atuais
+        with self._lock:
+            atuais = self._colunas
+            if atuais is None or atuais.versao != versao:
+                ids = self._alteradas(atuais.versao, versao) if atuais is not None and atuais.versao < versao else None
+                if ids is not None and len(ids) <= LIMITE_INCREMENTAL:
+                    self._colunas = atuais.atualizar(versao, carregar_linhas(ids), ids)
+                else:
+                    self._colunas = carregar_colunas(versao)
+                self._descartar(versao)
+            return self._colunas
+
+
+def _acumular(session, ids):
+    if _ALTERADAS in session.info and session.info[_ALTERADAS] is None:
+        return
+    session.info[_ALTERADAS] = None if ids is None else session.info.get(_ALTERADAS, set()) | set(ids)
+
+
+# Quais escolas cada transação alterou, para a atualização incremental: objetos
+# no flush e comandos em massa que informam os ids pela execution option
+# escolas_alteradas. Sem ela o comando conta como "não se sabe quais".
+@event.listens_for(db.session, 'after_flush')
+def _apos_flush(session, contexto):
+    objetos = [*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj))]
+    ids = [obj.id for obj in objetos if isinstance(obj, Escola)]
+    if ids:
+        _acumular(session, ids)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _ao_executar(estado):
+    if (estado.is_insert or estado.is_update or estado.is_delete) and estado.statement.table.name == 'escola':
+        _acumular(estado.session, estado.execution_options.get('escolas_alteradas'))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apos_commit(session):
+    ids = session.info.pop(_ALTERADAS, None)
+    versao = versoes_gravadas(session).get('escola')
+    if versao is None or not has_app_context():
+        return
+    catalogo_app = current_app.extensions.get('catalogo_escolas')
+    if catalogo_app is not None:
+        catalogo_app.registrar(versao, ids)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _apos_rollback(session, transacao):
+    session.info.pop(_ALTERADAS, None)
+
+
+def init_app(app):
+    app.config.setdefault('COLUMNAR_ENGINE_ENABLED', False)
+    app.extensions['catalogo_escolas'] = CatalogoEscolas()
+
+
+def catalogo():
+    return current_app.extensions['catalogo_escolas']
+
+
+def motor_ativo():
+    return current_app.config['COLUMNAR_ENGINE_ENABLED']
+
+
+def _numero(valor):
+    # como no SQL, limite ausente ou que não é número não casa com nada
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if np.isfinite(numero) else None
+
+
+def ids_por_preco(minimo, maximo):
+    minimo, maximo = _numero(minimo), _numero(maximo)
+    if minimo is None or maximo is None:
+        return []
+    colunas = catalogo().colunas()
+    mascara = (colunas.mensalidade >= minimo) & (colunas.mensalidade <= maximo)
+    return colunas.ids_em_ordem(mascara, colunas.mensalidade)
+
+
+def ids_por_avaliacao(minimo):
+    minimo = _numero(minimo)
+    if minimo is None:
+        return []
+    colunas = catalogo().colunas()
+    # NaN (sem avaliação) nunca passa na comparação, como NULL no SQL
+    return colunas.ids_em_ordem(colunas.avaliacao >= minimo, colunas.avaliacao)
+
+
+def codigos_por_metodologia(colunas, texto):
+    # Os termos do FTS (radical como prefixo, todos obrigatórios) conferidos em
+    # cada metodologia distinta; None se o texto não tem nenhuma palavra.
+    termos = termos_pesquisa(texto)
+    if not termos:
+        return None
+    return [
+        codigo for codigo, valor in enumerate(colunas.metodologias.valores)
+        if all(any(palavra.startswith(termo) for palavra in PALAVRA.findall(valor)) for termo in termos)
+    ]
+
+
+def ids_por_metodologia(texto):
+    # a máscara sai dos códigos que casaram
+    colunas = catalogo().colunas()
+    codigos = codigos_por_metodologia(colunas, texto)
+    if codigos is None:
+        return None
+    return colunas.ids_em_ordem(np.isin(colunas.metodologia, codigos))
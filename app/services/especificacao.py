@@ -0,0 +1,81 @@
+import glob
+import hashlib
+import logging
+import os
+
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT = 'apispec_1'
+DIRETORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _fontes_da_especificacao():
+    # arquivos com os @swag_from e o template do Swagger
+    return [os.path.join(DIRETORIO_APP, '__init__.py'), *glob.glob(os.path.join(DIRETORIO_APP, 'routes', '*.py'))]
+
+
+class EspecificacaoOpenApi:
+    # Serve /apispec_1.json no lugar da view do flasgger. O flasgger percorre
+    # todos os @swag_from no primeiro acesso (dezenas de ms) e serializa o dict
+    # de novo a cada requisição; aqui o JSON vem pronto de OPENAPI_SPEC_FILE,
+    # gerado no build com `flask openapi gerar`, ou é montado uma vez no
+    # primeiro acesso e guardado já serializado. Um arquivo mais antigo que as
+    # rotas é ignorado, e em debug a especificação é sempre remontada.
+
+    def __init__(self):
+        self.swagger = None
+        self.arquivo = None
+        self._corpo = None
+        self._etag = None
+
+    def init_app(self, app, swagger):
+        app.config.setdefault('OPENAPI_SPEC_FILE', os.path.join(app.instance_path, 'apispec_1.json'))
+        self.swagger = swagger
+        self.arquivo = app.config['OPENAPI_SPEC_FILE']
+        self._corpo = self._etag = None
+        app.extensions['especificacao'] = self
+        app.view_functions[f'flasgger.{ENDPOINT}'] = self.servir
+
+    def montar(self):
+        # dentro de um contexto de app; usa o codificador JSON configurado
+        return current_app.json.dumps(self.swagger.get_apispecs(ENDPOINT)).encode()
+
+    def gerar(self, destino=None):
+        destino = destino or self.arquivo
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        corpo = self.montar()
+        temporario = f'{destino}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(corpo)
+        os.replace(temporario, destino)
+        return destino, len(corpo)
+
+    def _ler_arquivo(self):
+        if not self.arquivo or not os.path.exists(self.arquivo):
+            return None
+        gerado_em = os.path.getmtime(self.arquivo)
+        if any(os.path.getmtime(fonte) > gerado_em for fonte in _fontes_da_especificacao()):
+            logger.warning('%s é mais antigo que as rotas; a especificação será montada de novo', self.arquivo)
+            return None
+        with open(self.arquivo, 'rb') as arquivo:
+            return arquivo.read()
+
+    def corpo(self):
+        if current_app.debug:
+            return self.montar()
+        if self._corpo is None:
+            corpo = self._ler_arquivo() or self.montar()
+            self._etag = hashlib.sha1(corpo).hexdigest()
+            self._corpo = corpo
+        return self._corpo
+
+    def servir(self):
+        corpo = self.corpo()
+        resposta = current_app.response_class(corpo, mimetype='application/json')
+        resposta.set_etag(self._etag or hashlib.sha1(corpo).hexdigest())
+        return resposta.make_conditional(request)
+
+
+especificacao = EspecificacaoOpenApi()
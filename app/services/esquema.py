@@ -0,0 +1,40 @@
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db import db
+
+# lê as revisões direto dos arquivos de migração, sem importar o alembic
+REVISAO = re.compile(r"^(revision|down_revision)\s*=\s*(.+)$", re.M)
+
+
+def revisoes_finais(diretorio_migracoes):
+    revisoes, anteriores = set(), set()
+    versoes = os.path.join(diretorio_migracoes, 'versions')
+    for nome in os.listdir(versoes):
+        if not nome.endswith('.py'):
+            continue
+        with open(os.path.join(versoes, nome), encoding='utf-8') as arquivo:
+            for campo, valor in REVISAO.findall(arquivo.read()):
+                ids = re.findall(r"['\"](\w+)['\"]", valor)
+                (revisoes if campo == 'revision' else anteriores).update(ids)
+    return revisoes - anteriores
+
+
+def revisao_do_banco():
+    try:
+        return db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    except OperationalError:
+        db.session.rollback()
+        return None
+    finally:
+        db.session.remove()
+
+
+def esquema_atualizado(diretorio_migracoes):
+    # banco na única revisão final das migrações; com branches abertos ou banco
+    # novo a resposta é não, e o caminho completo (create_all + upgrade) decide
+    finais = revisoes_finais(diretorio_migracoes)
+    return len(finais) == 1 and revisao_do_banco() in finais
@@ -0,0 +1,95 @@
+import math
+from collections import Counter, defaultdict
+
+from flask import request
+from sqlalchemy import Integer, case, cast, func, select
+
+from app.db import db
+from app.model.escola import Escola, normalizar_texto
+from app.services.busca import ler_criterios, montar_filtros
+from app.services.geo import escolas_no_raio
+from app.services.paginacao import ParametroInvalido
+
+LARGURA_PRECO_PADRAO = 500
+# abaixo disto o histograma vira centenas de faixas de poucas escolas
+LARGURA_PRECO_MINIMA = 50
+NOTA_MAXIMA = 5
+GRUPOS = ('metodologia', 'cidade', 'estado', 'faixa_preco', 'faixa_avaliacao')
+
+
+def ler_largura_preco():
+    valor = request.args.get('largura_preco')
+    if valor in (None, ''):
+        return LARGURA_PRECO_PADRAO
+    try:
+        largura = float(valor)
+    except ValueError:
+        raise ParametroInvalido('largura_preco deve ser um número')
+    if not math.isfinite(largura) or largura < LARGURA_PRECO_MINIMA:
+        raise ParametroInvalido(f'largura_preco deve ser um número a partir de {LARGURA_PRECO_MINIMA}')
+    return largura
+
+
+def colunas_agrupadas(largura_preco):
+    # faixa de preço i = [i * largura, (i + 1) * largura); faixa de avaliação n =
+    # [n, n + 1), com a nota máxima entrando na última; sem avaliação, NULL
+    faixa_preco = cast(Escola.mensalidade / largura_preco, Integer)
+    faixa_avaliacao = case((Escola.avaliacao >= NOTA_MAXIMA, NOTA_MAXIMA - 1), else_=cast(Escola.avaliacao, Integer))
+    return [
+        Escola.metodologia, Escola.cidade, Escola.estado,
+        faixa_preco.label('faixa_preco'), faixa_avaliacao.label('faixa_avaliacao'),
+    ]
+
+
+def contar_grupos(criterios, largura_preco):
+    # Uma única passada pela tabela: cada combinação dos cinco grupos com a sua
+    # contagem. As facetas saem da soma dessas combinações em Python.
+    filtros = montar_filtros(criterios)
+    colunas = colunas_agrupadas(largura_preco)
+    if criterios['latitude'] is not None:
+        # o raio exato é conferido em Python, como na busca
+        encontradas = escolas_no_raio(
+            [Escola.id, *colunas], criterios['latitude'], criterios['longitude'], criterios['raio_km'], filtros
+        )
+        return Counter(tuple(linha[1:len(GRUPOS) + 1]) for _, linha in encontradas).items()
+    consulta = select(*colunas, func.count().label('total')).where(*filtros).group_by(*GRUPOS)
+    return ((tuple(linha[:len(GRUPOS)]), linha.total) for linha in db.session.execute(consulta))
+
+
+def _faixas(contagens, largura):
+    return [
+        {'min': round(faixa * largura, 2), 'max': round((faixa + 1) * largura, 2), 'total': contagens[faixa]}
+        for faixa in sorted(contagens)
+    ]
+
+
+def calcular_facetas():
+    criterios = ler_criterios()
+    largura_preco = ler_largura_preco()
+    total = 0
+    metodologias = defaultdict(Counter)
+    precos, avaliacoes, cidades = Counter(), Counter(), Counter()
+    for (metodologia, cidade, estado, faixa_preco, faixa_avaliacao), quantidade in contar_grupos(criterios, largura_preco):
+        total += quantidade
+        # grafias diferentes da mesma metodologia somam juntas, com o nome da mais comum
+        metodologias[normalizar_texto(metodologia)][metodologia] += quantidade
+        precos[faixa_preco] += quantidade
+        avaliacoes[faixa_avaliacao] += quantidade
+        cidades[(cidade, estado)] += quantidade
+
+    sem_avaliacao = avaliacoes.pop(None, 0)
+    por_metodologia = []
+    for grafias in metodologias.values():
+        nome = min(grafias.items(), key=lambda item: (-item[1], item[0]))[0]
+        por_metodologia.append({'metodologia': nome, 'total': sum(grafias.values())})
+    return {
+        'total': total,
+        'metodologias': sorted(por_metodologia, key=lambda item: (-item['total'], item['metodologia'])),
+        'mensalidades': _faixas(precos, largura_preco),
+        'avaliacoes': _faixas(avaliacoes, 1),
+        'sem_avaliacao': sem_avaliacao,
+        'cidades': [
+            {'cidade': cidade, 'estado': estado, 'total': quantidade}
+            for (cidade, estado), quantidade in sorted(cidades.items(), key=lambda item: (-item[1], item[0]))
+        ],
+    }
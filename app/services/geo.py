@@ -0,0 +1,70 @@
+import math
+
+from sqlalchemy import select
+
+from app.db import db
+from app.model.escola import Escola, escola_geo
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU_LAT = 111.32
+RAIO_PADRAO_KM = 5.0
+RAIO_MAXIMO_KM = 100.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def caixa_delimitadora(latitude, longitude, raio_km):
+    dlat = raio_km / KM_POR_GRAU_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-6 or dlat >= 90:
+        dlon = 180.0
+    else:
+        dlon = min(180.0, raio_km / (KM_POR_GRAU_LAT * cos_lat))
+    return (
+        max(-90.0, latitude - dlat), min(90.0, latitude + dlat),
+        max(-180.0, longitude - dlon), min(180.0, longitude + dlon),
+    )
+
+
+def filtro_caixa(latitude, longitude, raio_km):
+    # Subconsulta no R*Tree: ids das escolas dentro do retângulo que envolve o círculo.
+    min_lat, max_lat, min_lon, max_lon = caixa_delimitadora(latitude, longitude, raio_km)
+    ids = select(escola_geo.c.id).where(
+        escola_geo.c.max_lat >= min_lat, escola_geo.c.min_lat <= max_lat,
+        escola_geo.c.max_lon >= min_lon, escola_geo.c.min_lon <= max_lon,
+    )
+    return Escola.id.in_(ids)
+
+
+def escolas_no_raio(colunas, latitude, longitude, raio_km, filtros=()):
+    # Pré-filtra pela caixa no índice espacial e só então calcula a distância exata.
+    # O id do desempate vem em coluna própria: a projeção pedida pode não trazer id.
+    consulta = select(
+        *colunas, Escola.id.label('geo_id'), Escola.latitude.label('geo_lat'), Escola.longitude.label('geo_lon')
+    ).where(
+        filtro_caixa(latitude, longitude, raio_km), *filtros
+    )
+    encontradas = []
+    for linha in db.session.execute(consulta):
+        distancia = haversine_km(latitude, longitude, linha.geo_lat, linha.geo_lon)
+        if distancia <= raio_km:
+            encontradas.append((distancia, linha))
+    encontradas.sort(key=lambda item: (item[0], item[1].geo_id))
+    return encontradas
+
+
+def escolas_mais_proximas(colunas, latitude, longitude, k, raio_maximo_km, raio_inicial_km=2.0, filtros=()):
+    # k vizinhos mais próximos: dobra o raio até achar k escolas dentro do círculo
+    # (ou até o raio máximo). Só o que está dentro do círculo é garantidamente o mais próximo.
+    raio = min(raio_inicial_km, raio_maximo_km)
+    while True:
+        encontradas = escolas_no_raio(colunas, latitude, longitude, raio, filtros)
+        if len(encontradas) >= k or raio >= raio_maximo_km:
+            return encontradas[:k]
+        raio = min(raio * 2, raio_maximo_km)
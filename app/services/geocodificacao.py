@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+
+import requests
+
+
+class Geocodificador:
+    # Converte o endereço devolvido pelo ViaCEP (que não traz coordenadas) em
+    # latitude/longitude usando uma API de busca no formato do Nominatim.
+    # O resultado fica junto do endereço no cache de CEP, então cada CEP é
+    # geocodificado uma única vez. Desligado por padrão: o Nominatim público
+    # limita o uso a uma requisição por segundo, então cada consulta tem um
+    # prazo total e as requisições do processo respeitam um intervalo mínimo.
+
+    def __init__(self, app=None):
+        self.url = None
+        self.timeout = 5.0
+        self.prazo = 10.0
+        self.intervalo = 1.0
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._liberado_em = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GEOCODER_URL', None)
+        app.config.setdefault('GEOCODER_TIMEOUT', 5.0)
+        app.config.setdefault('GEOCODER_DEADLINE', 10.0)
+        app.config.setdefault('GEOCODER_MIN_INTERVAL', 1.0)
+        app.config.setdefault('GEOCODER_USER_AGENT', 'school-indicator-api')
+        self.url = app.config['GEOCODER_URL']
+        self.timeout = float(app.config['GEOCODER_TIMEOUT'])
+        self.prazo = float(app.config['GEOCODER_DEADLINE'])
+        self.intervalo = float(app.config['GEOCODER_MIN_INTERVAL'])
+        self.session.headers['User-Agent'] = app.config['GEOCODER_USER_AGENT']
+        app.extensions['geocodificador'] = self
+
+    def localizar(self, endereco):
+        if not self.url:
+            return None
+        prazo = time.monotonic() + self.prazo
+        for params in self.tentativas(endereco):
+            timeout = self.reservar(prazo)
+            if timeout is None:
+                return None
+            try:
+                response = self.session.get(self.url, params=params, timeout=timeout)
+                resultados = response.json() if response.status_code == 200 else []
+            except (requests.RequestException, ValueError):
+                return None
+            coordenadas = self.interpretar(resultados)
+            if coordenadas is not None:
+                return coordenadas
+        return None
+
+    def reservar(self, prazo):
+        # Reserva a próxima vaga do intervalo mínimo (entre todas as threads) e
+        # espera por ela fora do lock; devolve o timeout que cabe no prazo, ou
+        # None se a vaga ou a resposta não caberiam mais nele.
+        espera = self.reservar_vaga(prazo)
+        if espera is None:
+            return None
+        time.sleep(espera)
+        return self.timeout_no_prazo(prazo)
+
+    def reservar_vaga(self, prazo):
+        # também usada pelo cliente assíncrono, que espera com asyncio.sleep
+        with self._lock:
+            agora = time.monotonic()
+            vaga = max(agora, self._liberado_em)
+            if vaga >= prazo:
+                return None
+            self._liberado_em = vaga + self.intervalo
+        return vaga - agora
+
+    def timeout_no_prazo(self, prazo):
+        restante = prazo - time.monotonic()
+        return min(self.timeout, restante) if restante > 0 else None
+
+    @staticmethod
+    def tentativas(endereco):
+        # da busca mais precisa para a mais genérica (também usada pelo cliente assíncrono)
+        cidade = {'city': endereco.get('localidade'), 'state': endereco.get('uf'), 'country': 'Brazil'}
+        tentativas = []
+        if endereco.get('logradouro'):
+            tentativas.append(dict(cidade, street=endereco['logradouro']))
+        if endereco.get('cep'):
+            tentativas.append({'postalcode': endereco['cep'], 'country': 'Brazil'})
+        tentativas.append(cidade)
+        return [dict(params, format='json', limit=1) for params in tentativas]
+
+    @staticmethod
+    def interpretar(resultados):
+        # resposta fora do formato esperado conta como "não encontrado"
+        try:
+            latitude, longitude = float(resultados[0]['lat']), float(resultados[0]['lon'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return None
+        return latitude, longitude
+
+geocodificador = Geocodificador()
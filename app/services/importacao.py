@@ -0,0 +1,246 @@
+import csv
+import io
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from flask import current_app, request
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import db
+from app.model.escola import Escola
+from app.model.pais import Pais
+from app.services.cep import buscar_endereco_por_cep, cep_encontrado, normalizar_cep
+
+FORMATOS = ('csv', 'ndjson')
+TAMANHO_LOTE = 1000
+PARALELISMO = 8
+MAXIMO_ERROS_RELATADOS = 1000
+TIPOS_CONTEUDO = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ('1', 'true', 'sim', 's', 'yes'):
+        return True
+    if texto in ('0', 'false', 'nao', 'não', 'n', 'no'):
+        return False
+    raise ValueError('booleano inválido')
+
+
+def _texto(valor):
+    # números viram texto (CEP e telefone podem vir do CSV ou do JSON como número)
+    if isinstance(valor, bool) or not isinstance(valor, (str, int, float)):
+        raise ValueError('texto inválido')
+    return str(valor).strip()
+
+
+def _numero(valor):
+    # NaN e infinito passariam pelo float() e só falhariam no INSERT do lote inteiro
+    if isinstance(valor, bool):
+        raise ValueError('número inválido')
+    numero = float(valor)
+    if not math.isfinite(numero):
+        raise ValueError('número inválido')
+    return numero
+
+
+def _inteiro(valor):
+    # 2.7 não vira 2: só valores sem parte fracionária
+    numero = _numero(valor)
+    if not numero.is_integer() or abs(numero) >= 2 ** 63:
+        raise ValueError('inteiro inválido')
+    return int(numero)
+
+
+# campo -> (conversor, obrigatório). Os campos de endereço vêm do CEP.
+CAMPOS_IMPORTACAO = {
+    Escola: {
+        'nome': (_texto, True),
+        'telefone': (_texto, True),
+        'cep': (_texto, True),
+        'numero': (_texto, True),
+        'mensalidade': (_numero, True),
+        'quantidade_alunos': (_inteiro, True),
+        'metodologia': (_texto, True),
+        'email': (_texto, True),
+        'imagem_url': (_texto, False),
+        'latitude': (_numero, False),
+        'longitude': (_numero, False),
+    },
+    Pais: {
+        'nome_completo': (_texto, True),
+        'telefone': (_texto, True),
+        'cep': (_texto, True),
+        'numero': (_texto, True),
+        'idade_crianca': (_inteiro, True),
+        'necessidades_especiais': (_booleano, True),
+        'email': (_texto, True),
+        'latitude': (_numero, False),
+        'longitude': (_numero, False),
+    },
+}
+
+
+def detectar_formato(nome_ou_tipo, formato=None):
+    # O formato explícito vence; senão vale o Content-Type ou a extensão do arquivo.
+    if formato is None:
+        formato = TIPOS_CONTEUDO.get(nome_ou_tipo)
+    if formato is None and nome_ou_tipo:
+        formato = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(
+            nome_ou_tipo[nome_ou_tipo.rfind('.'):].lower())
+    return formato if formato in FORMATOS else None
+
+
+def ler_registros(arquivo, formato):
+    # Gera (número da linha, registro ou exceção) sem carregar o arquivo inteiro.
+    texto = arquivo
+    if not isinstance(arquivo, io.TextIOBase):
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        leitor = csv.DictReader(texto)
+        for registro in leitor:
+            yield leitor.line_num, registro
+    else:
+        for numero, linha in enumerate(texto, start=1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError as erro:
+                yield numero, ValueError(f'JSON inválido: {erro}')
+                continue
+            if not isinstance(registro, dict):
+                yield numero, ValueError('a linha deve ser um objeto JSON')
+                continue
+            yield numero, registro
+
+
+def converter_campo(modelo, campo, valor):
+    # None quando o campo opcional vem vazio
+    conversor, obrigatorio = CAMPOS_IMPORTACAO[modelo][campo]
+    if valor is None or valor == '':
+        if obrigatorio:
+            raise ValueError(f'{campo} é obrigatório')
+        return None
+    try:
+        return conversor(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'{campo} inválido')
+
+
+def converter(modelo, registro):
+    dados = {}
+    for campo in CAMPOS_IMPORTACAO[modelo]:
+        valor = converter_campo(modelo, campo, registro.get(campo))
+        if valor is not None:
+            dados[campo] = valor
+    return dados
+
+
+def resolver_ceps(ceps, paralelismo):
+    app = current_app._get_current_object()
+
+    def resolver(cep):
+        with app.app_context():
+            return cep, buscar_endereco_por_cep(cep)
+
+    with ThreadPoolExecutor(max_workers=paralelismo) as executor:
+        return dict(executor.map(resolver, ceps))
+
+
+def importar(modelo, registros, tamanho_lote=TAMANHO_LOTE, paralelismo=PARALELISMO):
+    # Processa o fluxo em lotes: cada CEP distinto é resolvido uma única vez (em
+    # paralelo) e cada lote entra com um único INSERT executemany e um commit.
+    relatorio = {'recebidas': 0, 'inseridas': 0, 'com_erro': 0, 'erros': []}
+    enderecos = {}
+    inicio = time.perf_counter()
+
+    def registrar_erro(linha, mensagem):
+        relatorio['com_erro'] += 1
+        if len(relatorio['erros']) < MAXIMO_ERROS_RELATADOS:
+            relatorio['erros'].append({'linha': linha, 'error': mensagem})
+
+    registros = iter(registros)
+    while True:
+        lote = list(islice(registros, tamanho_lote))
+        if not lote:
+            break
+        relatorio['recebidas'] += len(lote)
+
+        validos = []
+        for linha, registro in lote:
+            if isinstance(registro, Exception):
+                registrar_erro(linha, str(registro))
+                continue
+            try:
+                dados = converter(modelo, registro)
+            except ValueError as erro:
+                registrar_erro(linha, str(erro))
+                continue
+            cep = normalizar_cep(dados['cep'])
+            if cep is None:
+                registrar_erro(linha, 'CEP inválido')
+                continue
+            validos.append((linha, cep, dados))
+
+        pendentes = {cep for _, cep, _ in validos} - enderecos.keys()
+        if pendentes:
+            enderecos.update(resolver_ceps(pendentes, paralelismo))
+
+        linhas = []
+        numeros = []
+        for linha, cep, dados in validos:
+            endereco = enderecos.get(cep)
+            if not cep_encontrado(endereco):
+                registrar_erro(linha, 'CEP inválido' if endereco else 'Não foi possível consultar o CEP')
+                continue
+            dados.setdefault('latitude', endereco.get('latitude'))
+            dados.setdefault('longitude', endereco.get('longitude'))
+            dados.update(
+                rua=endereco['logradouro'], bairro=endereco['bairro'],
+                cidade=endereco['localidade'], estado=endereco['uf'],
+            )
+            linhas.append(dados)
+            numeros.append(linha)
+
+        if linhas:
+            try:
+                db.session.execute(insert(modelo), linhas)
+                db.session.commit()
+                relatorio['inseridas'] += len(linhas)
+            except SQLAlchemyError:
+                db.session.rollback()
+                # o lote falhou inteiro: grava linha a linha para que só a culpada fique de fora
+                for linha, dados in zip(numeros, linhas):
+                    try:
+                        db.session.execute(insert(modelo), [dados])
+                        db.session.commit()
+                        relatorio['inseridas'] += 1
+                    except SQLAlchemyError as erro:
+                        db.session.rollback()
+                        registrar_erro(linha, f'Falha ao gravar a linha: {erro.__class__.__name__}')
+
+    duracao = time.perf_counter() - inicio
+    relatorio['erros'].sort(key=lambda erro: erro['linha'])
+    relatorio['segundos'] = round(duracao, 3)
+    relatorio['linhas_por_segundo'] = round(relatorio['recebidas'] / duracao, 1) if duracao else None
+    relatorio['ceps_distintos'] = len(enderecos)
+    return relatorio
+
+
+def importar_da_requisicao(modelo):
+    # O corpo é lido como fluxo; nada além do lote corrente fica em memória.
+    formato = detectar_formato(request.mimetype, request.args.get('formato'))
+    if formato is None:
+        return None, 'Envie o corpo como text/csv ou application/x-ndjson (ou informe formato=csv|ndjson)'
+    return importar(modelo, ler_registros(request.stream, formato)), None
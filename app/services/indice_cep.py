@@ -0,0 +1,177 @@
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+
+import numpy as np
+
+from app.services.cep import normalizar_cep
+
+# Arquivo do índice: cabeçalho, chaves, registros e o pool de textos.
+#   cabeçalho  assinatura, quantidade de CEPs e tamanho do pool
+#   chaves     um uint32 por CEP, em ordem crescente (a busca binária só toca aqui)
+#   registros  um por chave, na mesma ordem: (posição, tamanho) no pool de
+#              logradouro, bairro e localidade, a UF e latitude/longitude (NaN se não há)
+#   pool       os textos em UTF-8, cada valor distinto uma única vez
+ASSINATURA = b'CEPIDX01'
+CABECALHO = struct.Struct('<8sIQ')
+CHAVE = np.dtype('<u4')
+REGISTRO = struct.Struct('<IHIHIH2sdd')
+TEXTOS = ('logradouro', 'bairro', 'localidade')
+MAXIMO_ERROS_RELATADOS = 1000
+
+
+class IndiceCep:
+    # Índice somente leitura mapeado em memória: abrir não lê o arquivo, o
+    # sistema traz as páginas conforme as buscas e as compartilha entre os
+    # processos que abrem o mesmo arquivo.
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as arquivo:
+            # arquivo vazio: o mmap recusa com ValueError, como um índice inválido
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        # truncado: confere o tamanho antes de ler o cabeçalho e as áreas que ele declara
+        if len(self._mapa) < CABECALHO.size:
+            self._invalido(caminho)
+        assinatura, quantidade, tamanho_pool = CABECALHO.unpack_from(self._mapa)
+        self._inicio_registros = CABECALHO.size + quantidade * CHAVE.itemsize
+        self._inicio_pool = self._inicio_registros + quantidade * REGISTRO.size
+        if assinatura != ASSINATURA or len(self._mapa) != self._inicio_pool + tamanho_pool:
+            self._invalido(caminho)
+        self.caminho = caminho
+        self.chaves = np.frombuffer(self._mapa, dtype=CHAVE, count=quantidade, offset=CABECALHO.size)
+
+    def _invalido(self, caminho):
+        self._mapa.close()
+        raise ValueError(f'{caminho} não é um índice de CEP válido')
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def _posicao(self, cep):
+        cep = normalizar_cep(cep)
+        if cep is None:
+            return None
+        # a chave no mesmo tipo do array: com um int do Python o NumPy
+        # converteria o array inteiro antes de cada busca
+        chave = CHAVE.type(cep)
+        posicao = int(self.chaves.searchsorted(chave))
+        if posicao < len(self.chaves) and self.chaves[posicao] == chave:
+            return posicao
+        return None
+
+    def __contains__(self, cep):
+        return self._posicao(cep) is not None
+
+    def buscar(self, cep):
+        # no formato do ViaCEP; None se o CEP não está no índice
+        posicao = self._posicao(cep)
+        if posicao is None:
+            return None
+        *textos, uf, latitude, longitude = REGISTRO.unpack_from(
+            self._mapa, self._inicio_registros + posicao * REGISTRO.size
+        )
+        cep = f'{int(self.chaves[posicao]):08d}'
+        endereco = {'cep': f'{cep[:5]}-{cep[5:]}'}
+        for campo, inicio, tamanho in zip(TEXTOS, textos[::2], textos[1::2]):
+            inicio += self._inicio_pool
+            endereco[campo] = self._mapa[inicio:inicio + tamanho].decode()
+        endereco['uf'] = uf.decode()
+        if not math.isnan(latitude):
+            endereco['latitude'], endereco['longitude'] = latitude, longitude
+        return endereco
+
+
+def _coordenada(registro, *nomes):
+    valor = next((registro[nome] for nome in nomes if registro.get(nome) not in (None, '')), None)
+    if valor is None:
+        return math.nan
+    numero = float(valor)
+    if not math.isfinite(numero):
+        raise ValueError
+    return numero
+
+
+def construir_indice(registros, destino):
+    # registros: (linha, dict ou exceção), como os de importacao.ler_registros.
+    # Colunas cep, logradouro, bairro, localidade e uf, e opcionalmente
+    # latitude e longitude (ou lat e lon). Um CEP repetido fica com a última linha.
+    relatorio = {'recebidas': 0, 'indexadas': 0, 'repetidos': 0, 'com_erro': 0, 'erros': []}
+    inicio = time.perf_counter()
+    chaves = array('I')
+    registros_binarios = bytearray()
+    pool = bytearray()
+    no_pool = {}
+
+    def registrar_erro(linha, mensagem):
+        relatorio['com_erro'] += 1
+        if len(relatorio['erros']) < MAXIMO_ERROS_RELATADOS:
+            relatorio['erros'].append({'linha': linha, 'error': mensagem})
+
+    def guardar(texto):
+        posicao = no_pool.get(texto)
+        if posicao is None:
+            codificado = texto.encode()
+            if len(codificado) > 0xFFFF:
+                raise ValueError('texto longo demais')
+            posicao = no_pool[texto] = (len(pool), len(codificado))
+            pool.extend(codificado)
+        return posicao
+
+    for linha, registro in registros:
+        relatorio['recebidas'] += 1
+        if isinstance(registro, Exception):
+            registrar_erro(linha, str(registro))
+            continue
+        cep = normalizar_cep(registro.get('cep'))
+        if cep is None:
+            registrar_erro(linha, 'CEP inválido')
+            continue
+        uf = str(registro.get('uf') or '').strip().upper()
+        localidade = str(registro.get('localidade') or '').strip()
+        if len(uf) != 2 or not uf.isascii() or not localidade:
+            registrar_erro(linha, 'uf e localidade são obrigatórios')
+            continue
+        try:
+            latitude = _coordenada(registro, 'latitude', 'lat')
+            longitude = _coordenada(registro, 'longitude', 'lon')
+        except (TypeError, ValueError):
+            registrar_erro(linha, 'latitude ou longitude inválida')
+            continue
+        if math.isnan(latitude) != math.isnan(longitude):
+            registrar_erro(linha, 'latitude e longitude devem vir juntas')
+            continue
+        try:
+            textos = [
+                parte for campo in TEXTOS for parte in guardar(str(registro.get(campo) or '').strip())
+            ]
+        except ValueError as erro:
+            registrar_erro(linha, str(erro))
+            continue
+        chaves.append(int(cep))
+        registros_binarios += REGISTRO.pack(*textos, uf.encode(), latitude, longitude)
+
+    # ordenação estável: entre CEPs iguais a última linha fica por último e é a que vale
+    todas = np.frombuffer(chaves, dtype=np.uint32)
+    ordem = np.argsort(todas, kind='stable')
+    ordenadas = todas[ordem]
+    ultima = np.append(ordenadas[1:] != ordenadas[:-1], True) if len(ordenadas) else np.array([], dtype=bool)
+    linhas = np.frombuffer(registros_binarios, dtype=np.uint8).reshape(-1, REGISTRO.size)[ordem[ultima]]
+    relatorio['indexadas'] = int(ultima.sum())
+    relatorio['repetidos'] = len(ordenadas) - relatorio['indexadas']
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = f'{destino}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(ASSINATURA, relatorio['indexadas'], len(pool)))
+        arquivo.write(ordenadas[ultima].astype(CHAVE).tobytes())
+        arquivo.write(linhas.tobytes())
+        arquivo.write(pool)
+    os.replace(temporario, destino)
+
+    relatorio['erros'].sort(key=lambda erro: erro['linha'])
+    relatorio['bytes'] = os.path.getsize(destino)
+    relatorio['segundos'] = round(time.perf_counter() - inicio, 3)
+    return relatorio
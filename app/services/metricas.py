@@ -0,0 +1,224 @@
+import bisect
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app.db import db
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_COMANDOS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores, extra=()):
+    pares = [*zip(nomes, valores), *extra]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, int):
+        return str(valor)
+    return '+Inf' if valor == float('inf') else repr(float(valor))
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def amostras(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for valores, total in itens:
+            yield f'{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}'
+
+    def limpar(self):
+        with self._lock:
+            self._valores.clear()
+
+
+class Histograma:
+    # Contagens por faixa guardadas sem acumular (um incremento por observação);
+    # a soma cumulativa que o Prometheus espera é feita só na exportação.
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def amostras(self):
+        with self._lock:
+            itens = sorted((valores, list(contagens), soma) for valores, (contagens, soma) in self._series.items())
+        limites = self.buckets + (float('inf'),)
+        for valores, contagens, soma in itens:
+            acumulado = 0
+            for limite, contagem in zip(limites, contagens):
+                acumulado += contagem
+                rotulos = _rotulos(self.rotulos, valores, [('le', _numero(limite))])
+                yield f'{self.nome}_bucket{rotulos} {acumulado}'
+            yield f'{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}'
+            yield f'{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}'
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Metricas:
+    # Instrumentação exposta em /metrics no formato texto do Prometheus: latência
+    # por endpoint, comandos e tempo de SQL por requisição (eventos de cursor do
+    # SQLAlchemy) e as chamadas ao ViaCEP. Os valores ficam na memória do
+    # processo; com vários workers cada um expõe os seus.
+
+    def __init__(self):
+        self.ativo = False
+        self.requisicoes = Histograma(
+            'http_request_duration_seconds', 'Latência das requisições por endpoint, incluindo o streaming da resposta.',
+            ('endpoint', 'method', 'status'),
+        )
+        self.comandos_por_requisicao = Histograma(
+            'http_request_sql_statements', 'Comandos SQL executados por requisição.', ('endpoint',), BUCKETS_COMANDOS
+        )
+        self.sql_por_requisicao = Histograma(
+            'http_request_sql_duration_seconds', 'Tempo somado dos comandos SQL de cada requisição.', ('endpoint',)
+        )
+        self.comandos_sql = Contador('sql_statements_total', 'Comandos SQL executados, dentro ou fora de requisições.')
+        self.tempo_sql = Contador('sql_statement_duration_seconds_total', 'Tempo total gasto em comandos SQL.')
+        self.viacep = Histograma(
+            'viacep_request_duration_seconds', 'Latência de cada chamada ao ViaCEP (cada retentativa assíncrona conta).',
+            ('cliente', 'resultado'),
+        )
+        self.erros_viacep = Contador('viacep_errors_total', 'Chamadas ao ViaCEP que falharam.', ('cliente', 'motivo'))
+
+    def init_app(self, app):
+        # depois de db.init_app: os eventos de cursor vão nos engines já criados
+        app.config.setdefault('METRICS_ENABLED', True)
+        self.ativo = bool(app.config['METRICS_ENABLED'])
+        app.extensions['metricas'] = self
+        if not self.ativo:
+            return
+        app.before_request(self._iniciar_requisicao)
+        app.after_request(self._guardar_status)
+        app.teardown_request(self._finalizar_requisicao)
+        with app.app_context():
+            engines = db.engines
+        for engine in engines.values():
+            event.listen(engine, 'before_cursor_execute', self._antes_do_sql)
+            event.listen(engine, 'after_cursor_execute', self._depois_do_sql)
+
+    def _iniciar_requisicao(self):
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_sql = [0, 0.0]
+
+    def _guardar_status(self, resposta):
+        g.metricas_status = resposta.status_code
+        return resposta
+
+    def _finalizar_requisicao(self, erro):
+        # teardown: com stream_with_context só roda depois do último bloco enviado
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return
+        duracao = time.perf_counter() - inicio
+        endpoint = request.endpoint or 'desconhecido'
+        status = g.pop('metricas_status', 500)
+        comandos, tempo = g.pop('metricas_sql')
+        self.requisicoes.observar(duracao, endpoint, request.method, str(status))
+        self.comandos_por_requisicao.observar(comandos, endpoint)
+        self.sql_por_requisicao.observar(tempo, endpoint)
+
+    @staticmethod
+    def _antes_do_sql(conexao, cursor, comando, parametros, contexto, executemany):
+        conexao.info['metricas_inicio_sql'] = time.perf_counter()
+
+    def _depois_do_sql(self, conexao, cursor, comando, parametros, contexto, executemany):
+        duracao = time.perf_counter() - conexao.info.pop('metricas_inicio_sql', time.perf_counter())
+        self.comandos_sql.inc()
+        self.tempo_sql.inc(quantidade=duracao)
+        if has_request_context():
+            sql = g.get('metricas_sql')
+            if sql is not None:
+                sql[0] += 1
+                sql[1] += duracao
+
+    def observar_viacep(self, cliente, inicio, erro=None):
+        if not self.ativo:
+            return
+        self.viacep.observar(time.perf_counter() - inicio, cliente, 'erro' if erro else 'ok')
+        if erro:
+            self.erros_viacep.inc(cliente, erro)
+
+    def todas(self):
+        return [
+            self.requisicoes, self.comandos_por_requisicao, self.sql_por_requisicao,
+            self.comandos_sql, self.tempo_sql, self.viacep, self.erros_viacep,
+        ]
+
+    def exportar(self):
+        linhas = []
+        for metrica in self.todas():
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.amostras())
+        # contadores que os caches já mantêm, lidos no momento da coleta
+        cep = current_app.extensions.get('cep')
+        if cep is not None:
+            estatisticas = cep.estatisticas()
+            linhas += _contador_simples('cep_lookups_total', 'Consultas de CEP por camada que respondeu.', 'camada', {
+                'memoria': estatisticas['hits_memoria'],
+                'indice': estatisticas['hits_indice'],
+                'banco': estatisticas['hits_banco'],
+                'viacep': estatisticas['misses'],
+            })
+        resultados = current_app.extensions.get('resultados')
+        if resultados is not None:
+            estatisticas = resultados.estatisticas()
+            linhas += _contador_simples('result_cache_requests_total', 'Consultas ao cache de resultados.', 'resultado', {
+                'hit': estatisticas['hits'],
+                'miss': estatisticas['misses'],
+            })
+        return '\n'.join(linhas) + '\n'
+
+    def limpar(self):
+        for metrica in self.todas():
+            metrica.limpar()
+
+
+def _contador_simples(nome, ajuda, rotulo, valores):
+    yield f'# HELP {nome} {ajuda}'
+    yield f'# TYPE {nome} counter'
+    for valor_rotulo, valor in valores.items():
+        yield f'{nome}{_rotulos((rotulo,), (valor_rotulo,))} {_numero(valor)}'
+
+
+metricas = Metricas()
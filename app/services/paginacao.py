@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import select
+
+LIMITE_MAXIMO = 500
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(ultimo_id, **posicao):
+    # posicao guarda valores extras da ordenação (ex.: a mensalidade do último item)
+    dados = json.dumps(dict(posicao, id=ultimo_id), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(dados).rstrip(b'=').decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        ultimo_id = dados['id']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ParametroInvalido('Cursor inválido')
+    if not isinstance(ultimo_id, int):
+        raise ParametroInvalido('Cursor inválido')
+    return dados
+
+
+def ler_campos(campos_publicos):
+    fields = request.args.get('fields')
+    if not fields:
+        return list(campos_publicos)
+    campos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+    desconhecidos = [campo for campo in campos if campo not in campos_publicos]
+    if desconhecidos:
+        raise ParametroInvalido(f"Campos inválidos: {', '.join(desconhecidos)}")
+    return list(dict.fromkeys(campos))
+
+
+def ler_limite(padrao=None):
+    limit = request.args.get('limit')
+    if limit is None:
+        return padrao
+    try:
+        limite = int(limit)
+    except ValueError:
+        raise ParametroInvalido('limit deve ser um inteiro')
+    if limite < 1:
+        raise ParametroInvalido('limit deve ser maior que zero')
+    return min(limite, LIMITE_MAXIMO)
+
+
+def consulta_paginada(modelo, campos_publicos, filtros=(), limite_padrao=None):
+    # Paginação por chave (keyset): ordena por id e continua a partir do último id
+    # entregue, então o custo de cada página não depende de quantas vieram antes.
+    campos = ler_campos(campos_publicos)
+    limite = ler_limite(limite_padrao)
+    after = request.args.get('after')
+    apos = decodificar_cursor(after)['id'] if after else None
+
+    colunas = [getattr(modelo, campo) for campo in campos]
+    if 'id' not in campos:
+        colunas.append(modelo.id)
+    consulta = select(*colunas).where(*filtros).order_by(modelo.id)
+    if apos is not None:
+        consulta = consulta.where(modelo.id > apos)
+    if limite is not None:
+        consulta = consulta.limit(limite + 1)
+    return consulta, campos, limite
+
+
+def cortar_pagina(linhas, limite):
+    if limite is not None and len(linhas) > limite:
+        linhas = linhas[:limite]
+        return linhas, codificar_cursor(linhas[-1].id)
+    return linhas, None
+
+
+def cabecalhos_paginacao(proximo_cursor):
+    if proximo_cursor is None:
+        return {}
+    args = request.args.to_dict()
+    args['after'] = proximo_cursor
+    proxima = f'{request.base_url}?{urlencode(args)}'
+    return {'X-Next-Cursor': proximo_cursor, 'Link': f'<{proxima}>; rel="next"'}
@@ -0,0 +1,102 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.db import db
+
+BIND_LEITURA = 'leitura'
+
+# configuração -> pragma aplicado em cada conexão; None desativa o pragma
+PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_BUSY_TIMEOUT': 'busy_timeout',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+}
+
+
+def _caminho_sqlite(app):
+    # Caminho do arquivo do banco, ou None se não for SQLite em arquivo.
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.query.get('uri'):
+        return None
+    if os.path.isabs(url.database):
+        return url.database
+    # mesma regra do Flask-SQLAlchemy para caminhos relativos
+    return os.path.join(app.instance_path, url.database)
+
+
+class PerfilSqlite:
+    # Perfil do engine SQLite: WAL e demais pragmas em toda conexão, pool com
+    # tamanho explícito e, opcionalmente, um pool somente leitura para as
+    # requisições GET (ver SessaoRoteada em app/db.py).
+
+    def init_app(self, app):
+        # precisa rodar antes de db.init_app, que cria os engines com estas opções
+        app.config.setdefault('SQLITE_JOURNAL_MODE', 'WAL')
+        app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+        app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5000)
+        app.config.setdefault('SQLITE_CACHE_SIZE', -64000)
+        app.config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+        app.config.setdefault('SQLITE_POOL_SIZE', 5)
+        app.config.setdefault('SQLITE_MAX_OVERFLOW', 10)
+        app.config.setdefault('SQLITE_POOL_TIMEOUT', 30)
+        app.config.setdefault('SQLITE_READ_ONLY_POOL', False)
+        app.config.setdefault('SQLITE_READ_POOL_SIZE', 10)
+
+        caminho = _caminho_sqlite(app)
+        app.extensions['perfil_sqlite'] = {'ativo': caminho is not None, 'leitura': False}
+        if caminho is None:
+            return
+
+        opcoes = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        opcoes.setdefault('poolclass', QueuePool)
+        opcoes.setdefault('pool_size', app.config['SQLITE_POOL_SIZE'])
+        opcoes.setdefault('max_overflow', app.config['SQLITE_MAX_OVERFLOW'])
+        opcoes.setdefault('pool_timeout', app.config['SQLITE_POOL_TIMEOUT'])
+
+        if app.config['SQLITE_READ_ONLY_POOL']:
+            binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+            binds.setdefault(BIND_LEITURA, {
+                'url': f'sqlite:///file:{caminho}?mode=ro&uri=true',
+                'poolclass': QueuePool,
+                'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+                'max_overflow': app.config['SQLITE_MAX_OVERFLOW'],
+                'pool_timeout': app.config['SQLITE_POOL_TIMEOUT'],
+            })
+            app.extensions['perfil_sqlite']['leitura'] = True
+
+    def aplicar_pragmas(self, app):
+        # depois de db.init_app: registra os pragmas nos engines já criados
+        if not app.extensions['perfil_sqlite']['ativo']:
+            return
+        pragmas = [
+            (pragma, app.config[chave]) for chave, pragma in PRAGMAS.items() if app.config[chave] is not None
+        ]
+        with app.app_context():
+            engines = db.engines
+        for chave, engine in engines.items():
+            somente_leitura = chave == BIND_LEITURA
+            event.listen(engine, 'connect', self._ao_conectar(pragmas, somente_leitura))
+
+    @staticmethod
+    def _ao_conectar(pragmas, somente_leitura):
+        def aplicar(conexao_dbapi, registro):
+            cursor = conexao_dbapi.cursor()
+            try:
+                for pragma, valor in pragmas:
+                    # o modo do journal é do arquivo; uma conexão somente leitura não pode trocá-lo
+                    if somente_leitura and pragma == 'journal_mode':
+                        continue
+                    cursor.execute(f'PRAGMA {pragma}={valor}')
+                if somente_leitura:
+                    cursor.execute('PRAGMA query_only=ON')
+            finally:
+                cursor.close()
+        return aplicar
+
+
+perfil_sqlite = PerfilSqlite()
@@ -0,0 +1,153 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app.db import db
+from app.services.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+CABECALHO = 'X-Query-Profile'
+# EXPLAIN QUERY PLAN só diz algo útil sobre comandos que procuram linhas
+COMANDOS_EXPLICAVEIS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+# "SCAN escola" sem índice; ficam de fora tabelas virtuais (R*Tree, FTS5), o
+# catálogo do SQLite e "SCAN escola USING INDEX ..." (varredura de índice)
+SCAN_COMPLETO = re.compile(r'^SCAN (?!sqlite_)(\w+)(?: AS \w+)?$')
+TAMANHO_MAXIMO_PARAMETROS = 500
+
+
+def tabelas_varridas(plano):
+    return [encontrado.group(1) for encontrado in map(SCAN_COMPLETO.match, plano) if encontrado]
+
+
+def _parametros(parametros):
+    texto = repr(parametros)
+    if len(texto) > TAMANHO_MAXIMO_PARAMETROS:
+        return texto[:TAMANHO_MAXIMO_PARAMETROS] + '...'
+    return texto
+
+
+class PerfiladorConsultas:
+    # Perfilador de consultas, desligado por padrão (QUERY_PROFILER_ENABLED).
+    # Cronometra cada comando pelos eventos de cursor e registra no log:
+    # - comandos acima de QUERY_PROFILER_SLOW_MS, com parâmetros e plano;
+    # - o plano de cada formato de consulta novo que faça SCAN completo de tabela
+    #   (uma vez por formato, antes de a tabela crescer e a consulta ficar lenta);
+    # - formatos repetidos QUERY_PROFILER_N_PLUS_ONE vezes ou mais na mesma
+    #   requisição (N+1).
+    # Em modo debug, ou com QUERY_PROFILER_HEADER, o resumo da requisição vai no
+    # cabeçalho X-Query-Profile.
+
+    def __init__(self):
+        self.limite_ms = 100.0
+        self.explicar = True
+        self.repeticoes = 5
+        self.planos = LRUCache(1024)
+
+    def init_app(self, app):
+        # depois de db.init_app: os eventos de cursor vão nos engines já criados
+        app.config.setdefault('QUERY_PROFILER_ENABLED', False)
+        app.config.setdefault('QUERY_PROFILER_SLOW_MS', 100)
+        app.config.setdefault('QUERY_PROFILER_EXPLAIN', True)
+        app.config.setdefault('QUERY_PROFILER_N_PLUS_ONE', 5)
+        app.config.setdefault('QUERY_PROFILER_HEADER', None)
+        app.extensions['perfilador'] = self
+        if not app.config['QUERY_PROFILER_ENABLED']:
+            return
+        self.limite_ms = float(app.config['QUERY_PROFILER_SLOW_MS'])
+        self.explicar = bool(app.config['QUERY_PROFILER_EXPLAIN'])
+        self.repeticoes = int(app.config['QUERY_PROFILER_N_PLUS_ONE'])
+        app.before_request(self._iniciar_requisicao)
+        app.after_request(self._resumir)
+        app.teardown_request(self._procurar_n_mais_um)
+        with app.app_context():
+            engines = db.engines
+        for engine in engines.values():
+            event.listen(engine, 'before_cursor_execute', self._antes_do_sql)
+            event.listen(engine, 'after_cursor_execute', self._depois_do_sql)
+
+    def _iniciar_requisicao(self):
+        g.perfil_consultas = {'consultas': 0, 'tempo_ms': 0.0, 'lentas': 0, 'scans': set(), 'formatos': Counter()}
+
+    @staticmethod
+    def _antes_do_sql(conexao, cursor, comando, parametros, contexto, executemany):
+        conexao.info['perfil_inicio'] = time.perf_counter()
+
+    def _depois_do_sql(self, conexao, cursor, comando, parametros, contexto, executemany):
+        duracao_ms = (time.perf_counter() - conexao.info.pop('perfil_inicio', time.perf_counter())) * 1000
+        lenta = duracao_ms >= self.limite_ms
+        em_requisicao = has_request_context()
+        explicavel = not executemany and comando.lstrip()[:6].upper().startswith(COMANDOS_EXPLICAVEIS)
+        # fora de requisições (migrações, CLI) só os comandos lentos são explicados
+        plano = None
+        if explicavel and (lenta or (self.explicar and em_requisicao)):
+            plano = self._plano(conexao, comando, parametros)
+
+        if lenta:
+            logger.warning(
+                'consulta lenta (%.1f ms)%s\n%s\nparâmetros: %s\nplano: %s',
+                duracao_ms, f' em {request.endpoint}' if em_requisicao else '',
+                comando, _parametros(parametros), ' / '.join(plano) if plano else '-',
+            )
+
+        resumo = g.get('perfil_consultas') if em_requisicao else None
+        if resumo is not None:
+            resumo['consultas'] += 1
+            resumo['tempo_ms'] += duracao_ms
+            resumo['lentas'] += lenta
+            resumo['formatos'][comando] += 1
+            if plano:
+                resumo['scans'].update(tabelas_varridas(plano))
+
+    def _plano(self, conexao, comando, parametros):
+        # um EXPLAIN por formato de consulta; roda direto no cursor do driver,
+        # sem passar pelos eventos do SQLAlchemy
+        plano = self.planos.get(comando)
+        if plano is not None:
+            return plano
+        cursor = conexao.connection.cursor()
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {comando}', parametros)
+            plano = [linha[-1] for linha in cursor.fetchall()]
+        except conexao.dialect.dbapi.Error:
+            plano = []
+        finally:
+            cursor.close()
+        self.planos.set(comando, plano)
+        varridas = tabelas_varridas(plano)
+        if varridas:
+            logger.warning(
+                'consulta com SCAN completo de %s\n%s\nplano: %s', ', '.join(varridas), comando, ' / '.join(plano)
+            )
+        return plano
+
+    def _resumir(self, resposta):
+        resumo = g.get('perfil_consultas')
+        cabecalho = current_app.config['QUERY_PROFILER_HEADER']
+        if resumo is None or not (current_app.debug if cabecalho is None else cabecalho):
+            return resposta
+        # com streaming, o que rodar depois deste ponto não entra no cabeçalho
+        repetidas = sum(1 for vezes in resumo['formatos'].values() if vezes >= self.repeticoes)
+        resposta.headers[CABECALHO] = (
+            f"consultas={resumo['consultas']}; tempo_ms={resumo['tempo_ms']:.2f}; lentas={resumo['lentas']}; "
+            f"scan={','.join(sorted(resumo['scans'])) or '-'}; repetidas={repetidas}"
+        )
+        return resposta
+
+    def _procurar_n_mais_um(self, erro):
+        resumo = g.pop('perfil_consultas', None)
+        if resumo is None:
+            return
+        for comando, vezes in resumo['formatos'].items():
+            if vezes >= self.repeticoes:
+                logger.warning(
+                    'possível N+1 em %s: o mesmo comando rodou %d vezes na requisição\n%s',
+                    request.endpoint, vezes, comando,
+                )
+
+
+perfilador = PerfiladorConsultas()
@@ -0,0 +1,70 @@
+import re
+
+from sqlalchemy import func, literal_column, select
+
+from app.db import db
+from app.model.escola import Escola, escola_fts, normalizar_texto
+from app.schema.escola_schema import serializador_escola
+
+# Sufixos comuns em nomes de metodologias ("montessoriano", "construtivista",
+# "construtivismo"): a busca usa o radical como prefixo, então "Montessoriano"
+# também encontra "Montessori".
+SUFIXOS = ('ianos', 'ianas', 'iano', 'iana', 'istas', 'ista', 'ismos', 'ismo', 'anos', 'anas', 'ano', 'ana')
+TAMANHO_MINIMO_RADICAL = 5
+
+# Pesos do bm25 por coluna do índice: nome, metodologia, bairro, cidade.
+PESOS_BM25 = (10.0, 5.0, 1.0, 1.0)
+
+_fts = literal_column('escola_fts')
+
+
+def radical(termo):
+    for sufixo in SUFIXOS:
+        if termo.endswith(sufixo) and len(termo) - len(sufixo) >= TAMANHO_MINIMO_RADICAL:
+            return termo[:-len(sufixo)]
+    return termo
+
+
+def termos_pesquisa(texto):
+    return [radical(termo) for termo in re.findall(r'\w+', normalizar_texto(texto))]
+
+
+def expressao_fts(texto, coluna=None):
+    # Transforma o texto livre em uma expressão FTS5 segura: cada palavra vira um
+    # prefixo entre aspas ("montessori"*), todas obrigatórias.
+    termos = termos_pesquisa(texto)
+    if not termos:
+        return None
+    expressao = ' '.join(f'"{termo}"*' for termo in termos)
+    if coluna is not None:
+        expressao = f'{coluna} : ({expressao})'
+    return expressao
+
+
+def ids_por_texto(texto, coluna=None):
+    expressao = expressao_fts(texto, coluna)
+    if expressao is None:
+        return None
+    return select(escola_fts.c.rowid).where(_fts.op('MATCH')(expressao))
+
+
+def pesquisar_escolas(campos, texto, limite):
+    expressao = expressao_fts(texto)
+    if expressao is None:
+        return []
+    relevancia = func.bm25(_fts, *PESOS_BM25)
+    consulta = (
+        select(*serializador_escola.colunas(campos), relevancia.label('relevancia'))
+        .select_from(escola_fts.join(Escola.__table__, Escola.id == escola_fts.c.rowid))
+        .where(_fts.op('MATCH')(expressao))
+        .order_by(relevancia)
+        .limit(limite)
+    )
+    serializar = serializador_escola.de_linha(campos)
+    resultado = []
+    for linha in db.session.execute(consulta):
+        escola = serializar(linha)
+        # bm25 é negativo e menor é melhor; invertido para "maior é mais relevante"
+        escola['relevancia'] = round(-linha.relevancia, 4)
+        resultado.append(escola)
+    return resultado
@@ -0,0 +1,44 @@
+from sqlalchemy import select
+
+from app.db import db
+from app.services.paginacao import ParametroInvalido, ler_campos
+
+IDS_MAXIMO = 100
+
+
+def _validar(ids):
+    if not ids:
+        raise ParametroInvalido('Informe pelo menos um id')
+    if len(ids) > IDS_MAXIMO:
+        raise ParametroInvalido(f'Envie até {IDS_MAXIMO} ids por vez')
+    # repetidos vêm uma vez só, na posição do primeiro
+    return list(dict.fromkeys(ids))
+
+
+def ler_ids_da_url(valor):
+    try:
+        ids = [int(parte) for parte in valor.split(',') if parte.strip()]
+    except ValueError:
+        raise ParametroInvalido('ids deve ser uma lista de inteiros separados por vírgula')
+    return _validar(ids)
+
+
+def ler_ids_do_corpo(data):
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or any(isinstance(id_, bool) or not isinstance(id_, int) for id_ in ids):
+        raise ParametroInvalido('Envie {"ids": [...]} com uma lista de inteiros')
+    return _validar(ids)
+
+
+def buscar_por_ids(serializador, ids, chave):
+    # Um único SELECT ... WHERE id IN (...) no lugar de uma consulta por id; a
+    # resposta segue a ordem pedida e lista os ids que não existem.
+    campos = ler_campos(serializador.campos)
+    modelo = serializador.modelo
+    consulta = select(*serializador.colunas(campos), modelo.id.label('lote_id')).where(modelo.id.in_(ids))
+    serializar = serializador.de_linha(campos)
+    encontrados = {linha.lote_id: serializar(linha) for linha in db.session.execute(consulta)}
+    return {
+        chave: [encontrados[id_] for id_ in ids if id_ in encontrados],
+        'nao_encontrados': [id_ for id_ in ids if id_ not in encontrados],
+    }
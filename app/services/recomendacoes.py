@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+from flask import current_app, request
+
+from app.db import db
+from app.model.escola import Escola
+from app.schema.escola_schema import serializador_escola
+from app.services.colunar import catalogo, codigos_por_metodologia
+from app.services.geo import RAIO_TERRA_KM
+from app.services.paginacao import ParametroInvalido
+
+CRITERIOS = ('distancia', 'preco', 'avaliacao', 'metodologia', 'capacidade')
+PESOS_PADRAO = {'distancia': 0.35, 'preco': 0.25, 'avaliacao': 0.2, 'metodologia': 0.15, 'capacidade': 0.05}
+K_PADRAO = 10
+K_MAXIMO = 100
+# na média bayesiana, quantas avaliações "médias" cada escola recebe de partida
+AVALIACOES_A_PRIORI = 5
+NOTA_MAXIMA = 5
+
+
+def init_app(app):
+    # pesos parciais (ex.: FLASK_RECOMMENDATION_WEIGHTS='{"distancia": 0.6}') completam os padrões
+    pesos = {**PESOS_PADRAO, **app.config.get('RECOMMENDATION_WEIGHTS', {})}
+    desconhecidos = set(pesos) - set(CRITERIOS)
+    if desconhecidos:
+        raise ValueError(f"RECOMMENDATION_WEIGHTS aceita só os critérios {', '.join(CRITERIOS)}")
+    app.config['RECOMMENDATION_WEIGHTS'] = pesos
+    app.config.setdefault('RECOMMENDATION_DISTANCE_KM', 10.0)
+
+
+def _numero(nome, minimo=None):
+    valor = request.args.get(nome)
+    if valor in (None, ''):
+        return None
+    try:
+        numero = float(valor)
+    except ValueError:
+        raise ParametroInvalido(f'{nome} deve ser um número')
+    if not math.isfinite(numero) or (minimo is not None and numero < minimo):
+        raise ParametroInvalido(f'{nome} deve ser um número maior ou igual a {minimo}')
+    return numero
+
+
+def ler_preferencias():
+    k = request.args.get('k', K_PADRAO)
+    try:
+        k = int(k)
+    except ValueError:
+        raise ParametroInvalido('k deve ser um inteiro')
+    if not 1 <= k <= K_MAXIMO:
+        raise ParametroInvalido(f'k deve estar entre 1 e {K_MAXIMO}')
+    orcamento = _numero('orcamento', 0)
+    if orcamento == 0:
+        raise ParametroInvalido('orcamento deve ser maior que zero')
+    pesos = dict(current_app.config['RECOMMENDATION_WEIGHTS'])
+    for criterio in CRITERIOS:
+        peso = _numero(f'peso_{criterio}', 0)
+        if peso is not None:
+            pesos[criterio] = peso
+    return {
+        'k': k,
+        'orcamento': orcamento,
+        'metodologia': request.args.get('metodologia') or None,
+        'pesos': pesos,
+    }
+
+
+def distancias_km(colunas, latitude, longitude):
+    # haversine vetorizado; NaN onde a escola não tem coordenadas
+    phi = math.radians(latitude)
+    dphi = colunas.latitude - phi
+    dlambda = colunas.longitude - math.radians(longitude)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi) * np.cos(colunas.latitude) * np.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def pontuar(colunas, pais, preferencias):
+    # Cada critério vira uma nota de 0 a 1 para todas as escolas de uma vez; a
+    # pontuação é a média ponderada pelos pesos dos critérios que se aplicam.
+    # Sem coordenadas do responsável não há distância, e sem metodologia
+    # preferida o critério fica de fora.
+    notas, distancia = {}, None
+    if pais.latitude is not None and pais.longitude is not None:
+        distancia = distancias_km(colunas, pais.latitude, pais.longitude)
+        escala = float(current_app.config['RECOMMENDATION_DISTANCE_KM'])
+        notas['distancia'] = np.nan_to_num(np.exp(-distancia / escala), nan=0.0)
+
+    # preço: 1 até o orçamento (ou a mensalidade mediana), caindo na proporção do excesso
+    mensalidade = colunas.mensalidade
+    referencia = preferencias['orcamento'] or (float(np.median(mensalidade)) if len(mensalidade) else 1.0)
+    notas['preco'] = np.minimum(1.0, referencia / np.maximum(mensalidade, 1e-9))
+
+    # avaliação: média bayesiana, para que uma única nota 5 não vença dezenas de notas 4,8
+    total, soma = colunas.avaliacoes_total, colunas.avaliacoes_soma
+    media_geral = soma.sum() / total.sum() if total.sum() else NOTA_MAXIMA / 2
+    notas['avaliacao'] = (soma + AVALIACOES_A_PRIORI * media_geral) / (total + AVALIACOES_A_PRIORI) / NOTA_MAXIMA
+
+    if preferencias['metodologia']:
+        # a mesma regra da busca e dos filtros: palavras do texto como prefixo
+        codigos = codigos_por_metodologia(colunas, preferencias['metodologia']) or []
+        notas['metodologia'] = np.isin(colunas.metodologia, codigos).astype(np.float64)
+
+    # capacidade: escolas menores (mais atenção por aluno) pontuam mais, em escala logarítmica
+    alunos = np.log(np.maximum(colunas.quantidade_alunos, 1.0))
+    amplitude = alunos.max() - alunos.min() if len(alunos) else 0.0
+    notas['capacidade'] = 1.0 - (alunos - alunos.min()) / amplitude if amplitude else np.ones_like(alunos)
+
+    pesos = {criterio: preferencias['pesos'].get(criterio, 0.0) for criterio in notas}
+    soma_pesos = sum(pesos.values())
+    if soma_pesos <= 0:
+        raise ParametroInvalido('Pelo menos um peso aplicável deve ser maior que zero')
+    pesos = {criterio: peso / soma_pesos for criterio, peso in pesos.items()}
+    pontuacao = np.zeros(len(colunas))
+    for criterio, nota in notas.items():
+        if pesos[criterio]:
+            pontuacao += pesos[criterio] * nota
+    return pontuacao, notas, distancia, pesos
+
+
+def melhores(pontuacao, ids, k):
+    # argpartition separa as k maiores em O(n); só elas são ordenadas (empate: menor id)
+    k = min(k, len(pontuacao))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    candidatas = np.argpartition(-pontuacao, k - 1)[:k]
+    return candidatas[np.lexsort((ids[candidatas], -pontuacao[candidatas]))]
+
+
+def recomendar(pais):
+    preferencias = ler_preferencias()
+    colunas = catalogo().colunas()
+    pontuacao, notas, distancia, pesos = pontuar(colunas, pais, preferencias)
+    posicoes = melhores(pontuacao, colunas.ids, preferencias['k'])
+
+    ids = [int(colunas.ids[posicao]) for posicao in posicoes]
+    serializar = serializador_escola.de_linha()
+    linhas = db.session.execute(serializador_escola.select().where(Escola.id.in_(ids))).all() if ids else []
+    por_id = {linha.id: serializar(linha) for linha in linhas}
+
+    recomendacoes = []
+    for posicao, id_ in zip(posicoes, ids):
+        escola = por_id.get(id_)
+        if escola is None:
+            # removida depois do retrato; a próxima requisição já não a vê
+            continue
+        escola['pontuacao'] = round(float(pontuacao[posicao]), 4)
+        escola['distancia_km'] = (
+            round(float(distancia[posicao]), 2)
+            if distancia is not None and not np.isnan(distancia[posicao]) else None
+        )
+        escola['notas'] = {criterio: round(float(nota[posicao]), 3) for criterio, nota in notas.items()}
+        recomendacoes.append(escola)
+    return {
+        'pais_id': pais.id,
+        'pesos': {criterio: round(peso, 4) for criterio, peso in pesos.items()},
+        'recomendacoes': recomendacoes,
+    }
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import threading
+from functools import wraps
+
+from flask import current_app, request
+
+from app.model.escola import normalizar_texto
+from app.services.lru import LRUCache
+from app.services.transmissao import quer_ndjson
+from app.services.versoes import ler_versoes
+
+logger = logging.getLogger(__name__)
+
+
+class BackendMemoria:
+    def __init__(self, maxsize, ttl):
+        self._lru = LRUCache(maxsize)
+        self.ttl = ttl
+
+    def get(self, chave):
+        return self._lru.get(chave)
+
+    def set(self, chave, valor):
+        self._lru.set(chave, valor, self.ttl)
+
+    def clear(self):
+        self._lru.clear()
+
+
+class BackendRedis:
+    # Compartilhado entre workers. A remoção por tamanho fica a cargo do próprio
+    # Redis (maxmemory + maxmemory-policy allkeys-lru); cada chave tem TTL.
+    PREFIXO = 'school-indicator:resultado:'
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RESULT_CACHE_URL aponta para o Redis, mas o pacote redis não está instalado')
+        self._erros = (redis.RedisError,)
+        self._cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, chave):
+        try:
+            dados = self._cliente.get(self.PREFIXO + chave)
+        except self._erros as erro:
+            logger.warning('cache de resultados indisponível: %s', erro)
+            return None
+        if dados is None:
+            return None
+        mimetype, _, corpo = dados.partition(b'\n')
+        return mimetype.decode(), corpo
+
+    def set(self, chave, valor):
+        mimetype, corpo = valor
+        try:
+            self._cliente.set(self.PREFIXO + chave, mimetype.encode() + b'\n' + corpo, ex=self.ttl)
+        except self._erros as erro:
+            logger.warning('cache de resultados indisponível: %s', erro)
+
+    def clear(self):
+        for chave in self._cliente.scan_iter(self.PREFIXO + '*'):
+            self._cliente.delete(chave)
+
+
+def _normalizar_valor(valor):
+    # "1000", "1000.0" e " 1e3" viram a mesma chave; texto ignora caixa e acentos
+    valor = valor.strip()
+    try:
+        return repr(float(valor))
+    except ValueError:
+        return normalizar_texto(valor)
+
+
+class CacheResultados:
+    # Cache das respostas já serializadas, por endpoint e parâmetros normalizados.
+    # A versão da tabela (ver versoes.py) faz parte da chave: qualquer escrita
+    # muda a geração e as entradas antigas deixam de ser lidas até sair do LRU.
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.max_bytes = 0
+        self._lock = threading.Lock()
+        self._estatisticas = {'hits': 0, 'misses': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESULT_CACHE_SIZE', 256)
+        app.config.setdefault('RESULT_CACHE_TTL', 3600)
+        app.config.setdefault('RESULT_CACHE_MAX_BYTES', 1024 * 1024)
+        app.config.setdefault('RESULT_CACHE_URL', '')
+        ttl = app.config['RESULT_CACHE_TTL']
+        if app.config['RESULT_CACHE_URL']:
+            self.backend = BackendRedis(app.config['RESULT_CACHE_URL'], ttl)
+        else:
+            self.backend = BackendMemoria(app.config['RESULT_CACHE_SIZE'], ttl)
+        self.max_bytes = app.config['RESULT_CACHE_MAX_BYTES']
+        app.extensions['resultados'] = self
+
+    def chave(self, tabelas):
+        versoes = ler_versoes(tabelas)
+        geracao = '.'.join(str(versoes[tabela][0]) for tabela in sorted(versoes))
+        parametros = sorted((nome, _normalizar_valor(valor)) for nome, valor in request.args.items(multi=True))
+        variante = f"{quer_ndjson()}|{current_app.config.get('JSON_CODIFICADOR')}"
+        bruta = f'{request.endpoint}|{geracao}|{variante}|{parametros}'
+        return hashlib.blake2b(bruta.encode(), digest_size=16).hexdigest()
+
+    def _acumular(self, chave, mimetype, corpo):
+        # Repassa a resposta (possivelmente em streaming) enquanto guarda uma cópia;
+        # se passar de max_bytes a cópia é descartada e nada é gravado.
+        partes, tamanho = [], 0
+        for parte in corpo:
+            yield parte
+            if partes is None:
+                continue
+            tamanho += len(parte)
+            if tamanho > self.max_bytes:
+                partes = None
+            else:
+                partes.append(parte)
+        if partes is not None:
+            self.backend.set(chave, (mimetype, b''.join(partes)))
+
+    def em_cache(self, *tabelas):
+        def decorador(view):
+            @wraps(view)
+            def envolvida(*args, **kwargs):
+                chave = self.chave(tabelas)
+                guardado = self.backend.get(chave)
+                if guardado is not None:
+                    self._contar('hits')
+                    mimetype, corpo = guardado
+                    return current_app.response_class(corpo, mimetype=mimetype, headers={'X-Cache': 'HIT'})
+                self._contar('misses')
+                resposta = current_app.make_response(view(*args, **kwargs))
+                if resposta.status_code == 200:
+                    resposta.response = self._acumular(chave, resposta.mimetype, resposta.iter_encoded())
+                    resposta.headers['X-Cache'] = 'MISS'
+                return resposta
+            return envolvida
+        return decorador
+
+    def _contar(self, chave):
+        with self._lock:
+            self._estatisticas[chave] += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self._estatisticas)
+
+    def limpar(self):
+        self.backend.clear()
+
+
+cache_resultados = CacheResultados()
@@ -0,0 +1,79 @@
+import json
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import func
+
+from app.db import db
+from app.services.paginacao import cabecalhos_paginacao, consulta_paginada, cortar_pagina
+
+NDJSON = 'application/x-ndjson'
+LINHAS_POR_BLOCO = 1000
+
+
+def quer_ndjson():
+    return request.accept_mimetypes.best_match(['application/json', NDJSON]) == NDJSON
+
+
+def _blocos(particoes, serializar, ndjson):
+    # Um pedaço da resposta por bloco de linhas: como array JSON ("[", itens
+    # separados por vírgula, "]") ou NDJSON (um objeto por linha).
+    def dumps(item):
+        return current_app.json.dumps(item, separators=(',', ':'))
+
+    if ndjson:
+        for linhas in particoes:
+            yield ''.join(dumps(serializar(linha)) + '\n' for linha in linhas)
+        return
+    separador = '['
+    for linhas in particoes:
+        if linhas:
+            # um único dumps por bloco; os colchetes da lista são descartados
+            yield separador + dumps([serializar(linha) for linha in linhas])[1:-1]
+            separador = ','
+    yield '[]' if separador == '[' else ']'
+
+
+def _resposta(corpo, ndjson, cabecalhos=None):
+    return Response(corpo, mimetype=NDJSON if ndjson else 'application/json', headers=cabecalhos)
+
+
+def transmitir(consulta, serializar):
+    # Percorre o resultado com yield_per: só um bloco de linhas fica em memória
+    # por vez, não importa quantas a consulta devolva.
+    ndjson = quer_ndjson()
+
+    def gerar():
+        resultado = db.session.execute(consulta.execution_options(yield_per=LINHAS_POR_BLOCO))
+        try:
+            yield from _blocos(resultado.partitions(), serializar, ndjson)
+        finally:
+            resultado.close()
+
+    return _resposta(stream_with_context(gerar()), ndjson)
+
+
+def transmitir_ids(ids, serializador):
+    # Linhas já escolhidas (ex.: pelo retrato colunar), na ordem de ids: a lista
+    # vai como um único parâmetro JSON e o json_each do SQLite a percorre
+    # buscando cada linha pela chave primária. Ids que sumiram no meio são pulados.
+    modelo = serializador.modelo
+    lista = func.json_each(json.dumps(ids)).table_valued('key', 'value')
+    consulta = (
+        serializador.select()
+        .select_from(lista.join(modelo, modelo.id == lista.c.value))
+        .order_by(lista.c.key)
+    )
+    return transmitir(consulta, serializador.de_linha())
+
+
+def responder_listagem(serializador, filtros=(), limite_padrao=None):
+    # Sem limit a listagem é transmitida aos poucos; uma página (no máximo
+    # LIMITE_MAXIMO linhas) é montada inteira para levar o cursor no cabeçalho.
+    consulta, campos, limite = consulta_paginada(serializador.modelo, serializador.campos, filtros, limite_padrao)
+    serializar = serializador.de_linha(campos)
+    if limite is None:
+        return transmitir(consulta, serializar)
+    linhas, proximo_cursor = cortar_pagina(db.session.execute(consulta).all(), limite)
+    ndjson = quer_ndjson()
+    corpo = ''.join(_blocos([linhas], serializar, ndjson))
+    return _resposta(corpo, ndjson, cabecalhos_paginacao(proximo_cursor))
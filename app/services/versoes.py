@@ -0,0 +1,117 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db import db
+from app.model.versao import VersaoTabela
+from app.services.transmissao import quer_ndjson
+
+TABELAS_VERSIONADAS = {'escola', 'pais', 'avaliacao'}
+_ALTERADAS = 'tabelas_alteradas'
+_GRAVADAS = 'versoes_gravadas'
+
+
+def _marcar(session, tabelas):
+    tabelas = {tabela for tabela in tabelas if tabela in TABELAS_VERSIONADAS}
+    if tabelas:
+        session.info.setdefault(_ALTERADAS, set()).update(tabelas)
+
+
+# As versões são incrementadas na mesma transação da escrita, a partir do que a
+# sessão efetivamente gravou: objetos no flush e INSERT/UPDATE/DELETE em massa
+# (importação, avaliações em lote, agregados), sem depender de cada rota.
+@event.listens_for(db.session, 'after_flush')
+def _apos_flush(session, contexto):
+    objetos = [*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj))]
+    _marcar(session, (obj.__table__.name for obj in objetos))
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _ao_executar(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        _marcar(estado.session, [estado.statement.table.name])
+
+
+@event.listens_for(db.session, 'before_commit')
+def _antes_do_commit(session):
+    session.flush()
+    tabelas = session.info.pop(_ALTERADAS, None)
+    if not tabelas:
+        return
+    agora = time.time()
+    comando = insert(VersaoTabela).values([
+        {'tabela': tabela, 'versao': 1, 'atualizado_em': agora} for tabela in sorted(tabelas)
+    ])
+    gravadas = session.execute(comando.on_conflict_do_update(
+        index_elements=[VersaoTabela.tabela],
+        set_={'versao': VersaoTabela.versao + 1, 'atualizado_em': agora},
+    ).returning(VersaoTabela.tabela, VersaoTabela.versao))
+    session.info[_GRAVADAS] = dict(gravadas.all())
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _apos_rollback(session, transacao):
+    session.info.pop(_ALTERADAS, None)
+    session.info.pop(_GRAVADAS, None)
+
+
+def versoes_gravadas(session):
+    # versão que cada tabela recebeu no último commit; lida uma vez, no after_commit
+    return session.info.pop(_GRAVADAS, {})
+
+
+def ler_versoes(tabelas):
+    # lidas uma vez por requisição (ETag e cache de resultados usam as mesmas)
+    lidas = g.setdefault('versoes_lidas', {})
+    chave = tuple(tabelas)
+    if chave not in lidas:
+        lidas[chave] = _consultar_versoes(tabelas)
+    return lidas[chave]
+
+
+def _consultar_versoes(tabelas):
+    linhas = db.session.execute(
+        select(VersaoTabela.tabela, VersaoTabela.versao, VersaoTabela.atualizado_em)
+        .where(VersaoTabela.tabela.in_(tabelas))
+    ).all()
+    encontradas = {linha.tabela: (linha.versao, linha.atualizado_em) for linha in linhas}
+    return {tabela: encontradas.get(tabela, (0, None)) for tabela in tabelas}
+
+
+def calcular_etag(versoes):
+    # A mesma URL pode render corpos diferentes conforme o formato pedido e o
+    # codificador JSON; os dois entram na ETag para ela continuar forte.
+    variante = f"{request.full_path}|{quer_ndjson()}|{current_app.config.get('JSON_CODIFICADOR')}"
+    resumo = hashlib.blake2b(variante.encode(), digest_size=8).hexdigest()
+    numeros = '.'.join(str(versoes[tabela][0]) for tabela in sorted(versoes))
+    return f'{numeros}-{resumo}'
+
+
+def condicional(*tabelas):
+    # GET condicional: a versão é lida antes da consulta, então uma escrita no
+    # meio do caminho no máximo faz o cliente baixar de novo, nunca guardar dado velho.
+    def decorador(view):
+        @wraps(view)
+        def envolvida(*args, **kwargs):
+            versoes = ler_versoes(tabelas)
+            etag = calcular_etag(versoes)
+            if request.if_none_match.contains(etag):
+                resposta = current_app.response_class(status=304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            resposta.set_etag(etag)
+            modificacoes = [atualizado_em for _, atualizado_em in versoes.values() if atualizado_em is not None]
+            if modificacoes:
+                resposta.last_modified = datetime.fromtimestamp(max(modificacoes), timezone.utc)
+            # o navegador pode guardar, mas deve revalidar a cada uso
+            resposta.cache_control.no_cache = True
+            return resposta
+        return envolvida
+    return decorador
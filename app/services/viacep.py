@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.services.metricas import metricas
+
+
+def _copia(endereco):
+    return dict(endereco) if endereco is not None else None
+
+
+class ViaCepClient:
+    # Cliente HTTP do ViaCEP: sessão keep-alive com pool de conexões, timeouts de
+    # conexão/leitura, retentativas com backoff e coalescência de consultas
+    # simultâneas ao mesmo CEP (uma única requisição atende todos os chamadores).
+
+    def __init__(self, app=None):
+        self.session = None
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+        self.configurar('https://viacep.com.br/ws/{cep}/json/', 2.0, 5.0, retries=2, backoff=0.3, pool_size=10)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('VIACEP_URL', 'https://viacep.com.br/ws/{cep}/json/')
+        app.config.setdefault('VIACEP_CONNECT_TIMEOUT', 2.0)
+        app.config.setdefault('VIACEP_READ_TIMEOUT', 5.0)
+        app.config.setdefault('VIACEP_RETRIES', 2)
+        app.config.setdefault('VIACEP_BACKOFF', 0.3)
+        app.config.setdefault('VIACEP_POOL_SIZE', 10)
+        self.configurar(
+            url=app.config['VIACEP_URL'],
+            connect_timeout=float(app.config['VIACEP_CONNECT_TIMEOUT']),
+            read_timeout=float(app.config['VIACEP_READ_TIMEOUT']),
+            retries=int(app.config['VIACEP_RETRIES']),
+            backoff=float(app.config['VIACEP_BACKOFF']),
+            pool_size=int(app.config['VIACEP_POOL_SIZE']),
+        )
+        app.extensions['viacep'] = self
+
+    def configurar(self, url, connect_timeout, read_timeout, retries, backoff, pool_size):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers['Accept'] = 'application/json'
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        anterior = self.session
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session
+        if anterior is not None:
+            anterior.close()
+
+    def buscar(self, cep):
+        with self._lock:
+            futuro = self._em_andamento.get(cep)
+            responsavel = futuro is None
+            if responsavel:
+                futuro = Future()
+                self._em_andamento[cep] = futuro
+
+        # cada chamador recebe a sua cópia: quem chama completa o endereço
+        # (coordenadas) e o guarda em cache
+        if not responsavel:
+            return _copia(futuro.result())
+
+        try:
+            resultado = self._requisitar(cep)
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        else:
+            futuro.set_result(resultado)
+        finally:
+            with self._lock:
+                self._em_andamento.pop(cep, None)
+        return _copia(resultado)
+
+    def _requisitar(self, cep):
+        inicio = time.perf_counter()
+        try:
+            response = self.session.get(self.url.format(cep=cep), timeout=self.timeout)
+        except requests.Timeout:
+            metricas.observar_viacep('sincrono', inicio, 'timeout')
+            return None
+        except requests.RequestException:
+            metricas.observar_viacep('sincrono', inicio, 'rede')
+            return None
+        if response.status_code != 200:
+            metricas.observar_viacep('sincrono', inicio, f'status_{response.status_code}')
+            return None
+        try:
+            endereco = response.json()
+        except ValueError:
+            metricas.observar_viacep('sincrono', inicio, 'json')
+            return None
+        metricas.observar_viacep('sincrono', inicio)
+        return endereco
+
+
+cliente_viacep = ViaCepClient()
@@ -0,0 +1,156 @@
+"""Cadastros e atualizações simultâneos esperando o ViaCEP: flask run x ASGI.
+
+Uso:
+    python -m benchmarks.bench_asgi --requisicoes 500 --concorrencia 200 --latencia 0.5
+
+Sobe o ViaCEP simulado com a latência pedida e, para cada modo, a API em um
+processo separado com um banco novo. Em cada operação dispara uma requisição
+por escola com um CEP ainda não consultado (todas precisam ir ao ViaCEP),
+mantendo --concorrencia requisições em voo, e mede vazão, latência, erros e o
+pico de threads e memória do processo do servidor:
+    criar       POST /api/escolas
+    atualizar   PUT /api/escolas/<id> das escolas criadas, com outro CEP
+    alterar     PATCH /api/escolas/<id> só com um novo CEP
+
+Modos:
+    flask run             o modo atual: uma thread por requisição
+    asgi, CEP síncrono    uvicorn asgi:app com ASGI_THREADS threads e o CEP
+                          resolvido dentro da view (a thread espera o ViaCEP)
+    asgi, CEP assíncrono  uvicorn asgi:app com o CEP resolvido no event loop
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.medicao import FLASK_RUN, UVICORN, Monitor, percentil, servidor
+from benchmarks.viacep_stub import iniciar_stub, url_geocodificacao
+
+MODOS = {
+    'flask run': (FLASK_RUN, {}),
+    'asgi, CEP síncrono': (UVICORN, {'FLASK_ASGI_CEP_ASSINCRONO': 'false'}),
+    'asgi, CEP assíncrono': (UVICORN, {}),
+}
+
+
+def cep(i, operacao):
+    # CEPs distintos entre as escolas e entre as operações
+    return f'{10000000 + (i * len(OPERACOES) + list(OPERACOES).index(operacao)) * 7919:08d}'
+
+
+def escola(i, operacao='criar'):
+    return {
+        'nome': f'Escola {i}', 'telefone': '(11) 1234-5678', 'cep': cep(i, operacao), 'numero': i,
+        'mensalidade': 1500.0, 'quantidade_alunos': 300, 'metodologia': 'Montessori', 'email': f'e{i}@exemplo.com',
+    }
+
+
+# operação: (método, caminho, corpo e status esperado) da requisição da escola i,
+# que no banco novo tem o id i + 1
+OPERACOES = {
+    'criar': lambda i: ('POST', '/api/escolas', escola(i), 201),
+    'atualizar': lambda i: ('PUT', f'/api/escolas/{i + 1}', escola(i, 'atualizar'), 200),
+    'alterar': lambda i: ('PATCH', f'/api/escolas/{i + 1}', {'cep': cep(i, 'alterar')}, 200),
+}
+
+
+async def disparar(base, operacao, requisicoes, concorrencia):
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias, erros = [], 0
+
+    async def uma(cliente, i):
+        nonlocal erros
+        metodo, caminho, corpo, esperado = OPERACOES[operacao](i)
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                async with cliente.request(metodo, f'{base}{caminho}', json=corpo) as resposta:
+                    await resposta.read()
+                    ok = resposta.status == esperado
+            except aiohttp.ClientError:
+                ok = False
+            if ok:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            else:
+                erros += 1
+
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=300)) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(uma(cliente, i) for i in range(requisicoes)))
+        return latencias, erros, time.perf_counter() - inicio
+
+
+def medir(modo, url_viacep, requisicoes, concorrencia, threads):
+    comando, ambiente_modo = MODOS[modo]
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(
+            FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(diretorio, 'bench.db')}",
+            FLASK_VIACEP_URL=url_viacep,
+            FLASK_GEOCODER_URL=url_geocodificacao(url_viacep),
+            FLASK_GEOCODER_MIN_INTERVAL='0',
+            FLASK_ASGI_THREADS=str(threads),
+            **ambiente_modo,
+        )
+        with servidor(comando, ambiente) as (base, processo):
+            # as atualizações usam as escolas criadas antes, no mesmo servidor
+            return {
+                operacao: medir_operacao(base, processo.pid, operacao, requisicoes, concorrencia)
+                for operacao in OPERACOES
+            }
+
+
+def medir_operacao(base, pid, operacao, requisicoes, concorrencia):
+    monitor = Monitor(pid)
+    monitor.start()
+    latencias, erros, segundos = asyncio.run(disparar(base, operacao, requisicoes, concorrencia))
+    monitor.parar.set()
+    monitor.join()
+    return {
+        'ok': len(latencias),
+        'erros': erros,
+        'segundos': round(segundos, 2),
+        'req_por_s': round(len(latencias) / segundos, 1),
+        'ms_p50': round(statistics.median(latencias), 1) if latencias else None,
+        'ms_p95': round(percentil(latencias, 0.95), 1) if latencias else None,
+        'threads_max': monitor.threads_max,
+        'rss_max_mb': round(monitor.rss_max_kb / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--concorrencia', type=int, default=200)
+    parser.add_argument('--latencia', type=float, default=0.5, help='atraso do ViaCEP simulado, em segundos')
+    parser.add_argument('--threads', type=int, default=32, help='ASGI_THREADS dos modos ASGI')
+    parser.add_argument('--modos', nargs='+', choices=list(MODOS), default=list(MODOS))
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    stub, url_viacep = iniciar_stub(latencia=args.latencia)
+    try:
+        resultados = {
+            modo: medir(modo, url_viacep, args.requisicoes, args.concorrencia, args.threads) for modo in args.modos
+        }
+    finally:
+        stub.shutdown()
+
+    colunas = list(next(iter(next(iter(resultados.values())).values())))
+    print(f"{'modo':<24}{'operação':<12}" + ''.join(f'{coluna:>12}' for coluna in colunas))
+    for modo, operacoes in resultados.items():
+        for operacao, valores in operacoes.items():
+            print(f'{modo:<24}{operacao:<12}' + ''.join(f'{str(valores[coluna]):>12}' for coluna in colunas))
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
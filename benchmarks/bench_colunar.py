@@ -0,0 +1,138 @@
+"""Filtros de escola: SQLite x retrato colunar em memória (COLUMNAR_ENGINE_ENABLED).
+
+Uso:
+    python -m benchmarks.bench_colunar --linhas 10000 100000
+
+Para cada tamanho e filtro (preço, avaliação, metodologia) mede, com o cache
+de resultados desligado:
+    sql ids       só a seleção no SQLite (os ids que o filtro devolve)
+    colunar ids   só a seleção com máscaras NumPy sobre o retrato
+    sql           a requisição inteira pelo caminho SQL
+    colunar       a requisição inteira com o motor colunar ligado
+e o custo de manter o retrato: carga completa e atualização incremental depois
+de uma escrita de cada tipo (avaliação nova, atualização, cadastro).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import and_, select
+
+from app import create_app
+from app.db import db
+from app.model.escola import Escola
+from app.services import colunar
+from app.services.pesquisa import ids_por_texto
+from benchmarks.dados import popular_escolas
+
+FILTROS = {
+    'preco': (
+        lambda a: {'min_preco': a.choice([500, 800, 1200]), 'max_preco': a.choice([1500, 2000, 3000])},
+        lambda p: select(Escola.id).where(and_(Escola.mensalidade >= p['min_preco'], Escola.mensalidade <= p['max_preco'])),
+        lambda p: colunar.ids_por_preco(p['min_preco'], p['max_preco']),
+    ),
+    'avaliacao': (
+        lambda a: {'min_avaliacao': a.choice([3, 4, 4.5])},
+        lambda p: select(Escola.id).where(Escola.avaliacao >= p['min_avaliacao']),
+        lambda p: colunar.ids_por_avaliacao(p['min_avaliacao']),
+    ),
+    'metodologia': (
+        lambda a: {'metodologia': a.choice(['Montessori', 'Waldorf', 'Construtivista', 'Tradicional'])},
+        lambda p: select(Escola.id).where(Escola.id.in_(ids_por_texto(p['metodologia'], 'metodologia'))),
+        lambda p: colunar.ids_por_metodologia(p['metodologia']),
+    ),
+}
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tempos), 3)
+
+
+def manutencao(app, cliente, repeticoes):
+    # cada escrita muda a versão; a próxima leitura aplica só a diferença
+    aleatorio = random.Random(7)
+    escritas = {
+        'avaliacao': lambda: cliente.post(
+            f'/api/escolas/{aleatorio.randint(1, 1000)}/avaliacoes', json={'nota': 4, 'nome_avaliador': 'Bench'}
+        ),
+        'atualizacao': lambda: cliente.put(
+            f'/api/escolas/{aleatorio.randint(1, 1000)}', json={'mensalidade': round(aleatorio.uniform(500, 3000), 2)}
+        ),
+    }
+    resultado = {}
+    with app.test_request_context():
+        resultado['carga completa'] = medir(lambda: colunar.carregar_colunas(0), max(3, repeticoes // 5))
+    for nome, escrever in escritas.items():
+        tempos = []
+        for _ in range(repeticoes):
+            escrever().close()
+            with app.test_request_context():
+                inicio = time.perf_counter()
+                colunar.catalogo().colunas()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+        resultado[f'incremental ({nome})'] = round(statistics.median(tempos), 3)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    resultados = {}
+    for linhas in args.linhas:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'bench.db')
+            config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'RESULT_CACHE_SIZE': 0, 'GEOCODER_URL': ''}
+            app_sql = create_app(config)
+            app_colunar = create_app(dict(config, COLUMNAR_ENGINE_ENABLED=True))
+            popular_escolas(caminho, linhas)
+            clientes = {'sql': app_sql.test_client(), 'colunar': app_colunar.test_client()}
+            por_filtro = {}
+            for filtro, (parametros, consulta, mascara) in FILTROS.items():
+                aleatorio = random.Random(42)
+                amostras = [parametros(aleatorio) for _ in range(args.repeticoes)]
+                proxima = iter(amostras * 4).__next__
+                with app_colunar.test_request_context():
+                    colunar.catalogo().colunas()
+                    por_filtro[filtro] = {
+                        'sql ids': medir(lambda: db.session.execute(consulta(proxima())).scalars().all(), args.repeticoes),
+                        'colunar ids': medir(lambda: mascara(proxima()), args.repeticoes),
+                    }
+                    db.session.remove()
+                for motor, cliente in clientes.items():
+                    por_filtro[filtro][motor] = medir(
+                        lambda: cliente.get(f'/api/escolas/filtro/{filtro}', query_string=proxima()).get_data(),
+                        args.repeticoes,
+                    )
+            resultados[linhas] = {
+                'filtros_ms': por_filtro,
+                'retrato_ms': manutencao(app_colunar, clientes['colunar'], args.repeticoes),
+            }
+
+    for linhas, resultado in resultados.items():
+        variantes = list(next(iter(resultado['filtros_ms'].values())))
+        print(f"\n{linhas} escolas (mediana, ms)\n{'filtro':<14}" + ''.join(f'{nome:>14}' for nome in variantes))
+        for filtro, tempos in resultado['filtros_ms'].items():
+            print(f'{filtro:<14}' + ''.join(f'{tempos[nome]:>14}' for nome in variantes))
+        for nome, tempo in resultado['retrato_ms'].items():
+            print(f'retrato: {nome:<28}{tempo:>10}')
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Leituras sob um escritor concorrente, com e sem o perfil SQLite.
+
+Uso:
+    python -m benchmarks.bench_concorrencia --linhas 100000 --leitores 8 --segundos 10
+
+Para cada perfil cria um banco novo com as mesmas escolas sintéticas e, pelo
+test client do Flask, roda em paralelo N threads leitoras (busca por cidade e
+detalhe de escola) e escritores contínuos (PUT de mensalidade e avaliações).
+Mede leituras e escritas por segundo, latência das leituras e respostas com
+erro ("database is locked" vira 500).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from app import create_app
+from benchmarks.dados import popular_escolas
+from benchmarks.viacep_stub import CIDADES
+
+PERFIS = {
+    # o que a aplicação fazia antes: journal padrão (DELETE) e nenhum pragma
+    'sem perfil': {
+        'SQLITE_JOURNAL_MODE': None, 'SQLITE_SYNCHRONOUS': None, 'SQLITE_BUSY_TIMEOUT': None,
+        'SQLITE_CACHE_SIZE': None, 'SQLITE_MMAP_SIZE': None,
+    },
+    'wal': {},
+    'wal + pool de leitura': {'SQLITE_READ_ONLY_POOL': True},
+}
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def leitor(app, linhas, fim, resultado, semente):
+    aleatorio = random.Random(semente)
+    cliente = app.test_client()
+    while time.perf_counter() < fim:
+        if aleatorio.random() < 0.5:
+            cidade, uf, _, _ = aleatorio.choice(CIDADES)
+            url = f'/api/escolas/busca?cidade={cidade}&estado={uf}&limit=20&ordenar=-avaliacao'
+        else:
+            url = f'/api/escolas/{aleatorio.randint(1, linhas)}'
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        resposta.close()
+        resultado['latencias'].append((time.perf_counter() - inicio) * 1000)
+        if resposta.status_code != 200:
+            resultado['erros'] += 1
+
+
+def escritor(app, linhas, fim, resultado, semente):
+    aleatorio = random.Random(semente)
+    cliente = app.test_client()
+    while time.perf_counter() < fim:
+        escola_id = aleatorio.randint(1, linhas)
+        if aleatorio.random() < 0.5:
+            resposta = cliente.put(f'/api/escolas/{escola_id}', json={'mensalidade': round(aleatorio.uniform(500, 5000), 2)})
+        else:
+            resposta = cliente.post(
+                f'/api/escolas/{escola_id}/avaliacoes', json={'nota': aleatorio.randint(0, 5), 'nome_avaliador': 'bench'}
+            )
+        resposta.close()
+        if resposta.status_code in (200, 201):
+            resultado['escritas'] += 1
+        else:
+            resultado['erros'] += 1
+
+
+def medir(perfil, linhas, leitores, escritores, segundos):
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'bench.db')
+        config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'GEOCODER_URL': ''}
+        config.update(PERFIS[perfil])
+        app = create_app(config)
+        popular_escolas(caminho, linhas)
+        app.logger.disabled = True
+
+        leituras = {'latencias': [], 'erros': 0}
+        escritas = {'escritas': 0, 'erros': 0}
+        fim = time.perf_counter() + segundos
+        threads = [threading.Thread(target=leitor, args=(app, linhas, fim, leituras, i)) for i in range(leitores)]
+        threads += [
+            threading.Thread(target=escritor, args=(app, linhas, fim, escritas, 1000 + i)) for i in range(escritores)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencias = leituras['latencias']
+        return {
+            'leituras_por_s': round(len(latencias) / segundos, 1),
+            'leitura_ms_p50': round(statistics.median(latencias), 2) if latencias else None,
+            'leitura_ms_p95': round(percentil(latencias, 0.95), 2) if latencias else None,
+            'leitura_ms_max': round(max(latencias), 2) if latencias else None,
+            'erros_leitura': leituras['erros'],
+            'escritas_por_s': round(escritas['escritas'] / segundos, 1),
+            'erros_escrita': escritas['erros'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    resultados = {
+        perfil: medir(perfil, args.linhas, args.leitores, args.escritores, args.segundos) for perfil in PERFIS
+    }
+
+    colunas = list(next(iter(resultados.values())))
+    print(f"{'perfil':<24}" + ''.join(f'{coluna:>16}' for coluna in colunas))
+    for perfil, valores in resultados.items():
+        print(f'{perfil:<24}' + ''.join(f'{str(valores[coluna]):>16}' for coluna in colunas))
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Resolução de CEP: índice local mapeado em memória x cep_cache x ViaCEP.
+
+Uso:
+    python -m benchmarks.bench_indice_cep --ceps 1000000
+
+Gera um CSV com os CEPs pedidos (endereços do ViaCEP simulado), constrói o
+índice com construir_indice e mede, por CEP:
+    índice            IndiceCep.buscar direto
+    índice (fora)     IndiceCep.buscar de um CEP que não está no arquivo
+    resolvedor        buscar_endereco_por_cep respondido pelo índice
+    cep_cache         buscar_endereco_por_cep sem índice, lido da tabela cep_cache
+    viacep            buscar_endereco_por_cep sem índice nem cache, no ViaCEP simulado
+além do tempo de construção e do tamanho do arquivo.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.services.cep import buscar_endereco_por_cep
+from app.services.importacao import ler_registros
+from app.services.indice_cep import IndiceCep, construir_indice
+from benchmarks.viacep_stub import COORDENADAS, endereco_ficticio, iniciar_stub
+
+
+def gerar_csv(caminho, quantidade, aleatorio):
+    ceps = aleatorio.sample(range(1_000_000, 98_999_999), quantidade)
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['cep', 'logradouro', 'bairro', 'localidade', 'uf', 'latitude', 'longitude'])
+        for cep in ceps:
+            endereco = endereco_ficticio(f'{cep:08d}')
+            escritor.writerow([
+                endereco['cep'], endereco['logradouro'], endereco['bairro'], endereco['localidade'], endereco['uf'],
+                *COORDENADAS[endereco['localidade']],
+            ])
+    return [f'{cep:08d}' for cep in ceps]
+
+
+def medir(funcao, ceps):
+    # microssegundos por CEP, mediana de 5 rodadas
+    tempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for cep in ceps:
+            funcao(cep)
+        tempos.append((time.perf_counter() - inicio) / len(ceps) * 1e6)
+    return round(statistics.median(tempos), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ceps', type=int, default=1_000_000)
+    parser.add_argument('--amostra', type=int, default=2000, help='CEPs consultados por variante')
+    parser.add_argument('--latencia', type=float, default=0.05, help='latência do ViaCEP simulado, em segundos')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    aleatorio = random.Random(42)
+    servidor, url = iniciar_stub(latencia=args.latencia)
+    with tempfile.TemporaryDirectory() as diretorio:
+        dados, indice = os.path.join(diretorio, 'ceps.csv'), os.path.join(diretorio, 'ceps.idx')
+        ceps = gerar_csv(dados, args.ceps, aleatorio)
+        with open(dados, 'rb') as arquivo:
+            relatorio = construir_indice(ler_registros(arquivo, 'csv'), indice)
+        amostra = aleatorio.sample(ceps, min(args.amostra, len(ceps)))
+        existentes = set(ceps)
+        fora = [cep for cep in (f'{numero:08d}' for numero in range(99_000_000, 99_100_000)) if cep not in existentes]
+
+        config = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(diretorio, 'bench.db')}",
+            'VIACEP_URL': url, 'GEOCODER_URL': '', 'CEP_CACHE_SIZE': 1,
+        }
+        resultado = {'construcao_s': relatorio['segundos'], 'arquivo_bytes': relatorio['bytes']}
+
+        direto = IndiceCep(indice)
+        resultado['índice'] = medir(direto.buscar, amostra)
+        resultado['índice (fora)'] = medir(direto.buscar, fora[:len(amostra)])
+        with create_app(dict(config, CEP_INDEX_FILE=indice)).app_context():
+            resultado['resolvedor'] = medir(buscar_endereco_por_cep, amostra)
+        # sem índice: a primeira passada vai ao ViaCEP e grava o cep_cache, a
+        # seguinte lê do banco (a memória guarda um único CEP)
+        remotos = amostra[:min(len(amostra), 200)]
+        with create_app(dict(config, CEP_INDEX_FILE='')).app_context():
+            inicio = time.perf_counter()
+            for cep in remotos:
+                buscar_endereco_por_cep(cep)
+            resultado['viacep'] = round((time.perf_counter() - inicio) / len(remotos) * 1e6, 2)
+            resultado['cep_cache'] = medir(buscar_endereco_por_cep, remotos)
+    servidor.shutdown()
+
+    print(f"\n{args.ceps} CEPs: índice de {resultado['arquivo_bytes'] / 1e6:.1f} MB em {resultado['construcao_s']} s")
+    print(f"{'variante':<20}{'µs por CEP':>14}")
+    for nome in ('índice', 'índice (fora)', 'resolvedor', 'cep_cache', 'viacep'):
+        print(f'{nome:<20}{resultado[nome]:>14}')
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
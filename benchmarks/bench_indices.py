@@ -0,0 +1,111 @@
+"""Endpoints de filtro de escola sem e com os índices secundários.
+
+Uso:
+    python -m benchmarks.bench_indices --linhas 1000000
+
+Popula um banco temporário com escolas sintéticas, mede cada endpoint pelo
+test client do Flask sem os índices e depois de criá-los, e mostra o plano
+(EXPLAIN QUERY PLAN) da consulta que cada endpoint executou.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from app import create_app
+from app.db import db
+from app.model.escola import Escola
+from benchmarks.dados import popular_escolas
+
+CONSULTAS = [
+    ('filtro_preco', '/api/escolas/filtro/preco?min_preco=1500&max_preco=1502'),
+    ('filtro_avaliacao', '/api/escolas/filtro/avaliacao?min_avaliacao=4.995'),
+    ('filtro_metodologia', '/api/escolas/filtro/metodologia?metodologia=Reggio'),
+    ('busca_metodologia_preco', '/api/escolas/busca?metodologia=Waldorf&max_preco=700&ordenar=mensalidade'),
+    ('busca_cidade', '/api/escolas/busca?cidade=Recife&estado=PE&min_avaliacao=4.9'),
+]
+
+
+def capturar_select(engine):
+    capturado = {}
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM escola' in statement:
+            capturado['sql'], capturado['parametros'] = statement, parameters
+
+    event.listen(engine, 'before_cursor_execute', antes)
+    return capturado
+
+
+def medir(cliente, capturado, repeticoes):
+    resultados = {}
+    for nome, url in CONSULTAS:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        assert resposta.status_code == 200, (url, resposta.status_code)
+        corpo = resposta.get_json()
+        linhas = len(corpo) if isinstance(corpo, list) else len(corpo['escolas'])
+        with db.engine.connect() as conn:
+            plano = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {capturado['sql']}", capturado['parametros']).all()
+        resultados[nome] = {
+            'ms_mediana': round(statistics.median(tempos), 2),
+            'ms_min': round(min(tempos), 2),
+            'linhas': linhas,
+            'plano': [linha[-1] for linha in plano],
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'})
+        with app.app_context():
+            indices = list(Escola.__table__.indexes)
+            for indice in indices:
+                indice.drop(db.engine)
+
+            inicio = time.perf_counter()
+            popular_escolas(caminho, args.linhas)
+            print(f'{args.linhas} escolas inseridas em {time.perf_counter() - inicio:.1f}s')
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+
+            capturado = capturar_select(db.engine)
+            cliente = app.test_client()
+            antes = medir(cliente, capturado, args.repeticoes)
+
+            inicio = time.perf_counter()
+            for indice in indices:
+                indice.create(db.engine)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+            print(f'índices criados em {time.perf_counter() - inicio:.1f}s')
+            depois = medir(cliente, capturado, args.repeticoes)
+
+    print(f"\n{'consulta':<26}{'linhas':>8}{'sem índice (ms)':>18}{'com índice (ms)':>18}")
+    for nome, _ in CONSULTAS:
+        print(f"{nome:<26}{depois[nome]['linhas']:>8}{antes[nome]['ms_mediana']:>18}{depois[nome]['ms_mediana']:>18}")
+        print(f"    antes:  {' | '.join(antes[nome]['plano'])}")
+        print(f"    depois: {' | '.join(depois[nome]['plano'])}")
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump({'linhas': args.linhas, 'sem_indice': antes, 'com_indice': depois}, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
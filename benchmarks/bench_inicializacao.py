@@ -0,0 +1,141 @@
+"""Cold start da API: tempo até a primeira resposta e de onde ele vem.
+
+Uso:
+    python -m benchmarks.bench_inicializacao --rodadas 5 --json inicializacao.json
+    python -m benchmarks.bench_inicializacao --modos producao --limite-ms 1500   # em CI
+
+Cada rodada é um processo Python novo com -X importtime, que importa o app,
+chama create_app, faz a primeira requisição e busca /apispec_1.json. Mede as
+fases (importação, create_app, primeira requisição, especificação) e o tempo
+do processo inteiro, e soma o tempo próprio de importação de cada pacote de
+primeiro nível para mostrar quais dependências pesam no cold start.
+
+Modos:
+    padrao    create_all + upgrade a cada boot e especificação montada pelo
+              flasgger no primeiro acesso
+    producao  PRODUCTION_MODE (só confere a revisão do banco, sem importar o
+              alembic) e especificação pré-gerada com `flask openapi gerar`
+
+Com --limite-ms termina com código 1 se a mediana do processo inteiro de
+algum modo passar do limite.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.medicao import RAIZ
+
+CODIGO = '''
+import json, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+app = create_app()
+criado = time.perf_counter()
+cliente = app.test_client()
+cliente.get('/api/pais?limit=1').close()
+respondido = time.perf_counter()
+cliente.get('/apispec_1.json').close()
+documentado = time.perf_counter()
+print(json.dumps({
+    'importacao_ms': (importado - inicio) * 1000,
+    'create_app_ms': (criado - importado) * 1000,
+    'primeira_requisicao_ms': (respondido - criado) * 1000,
+    'especificacao_ms': (documentado - respondido) * 1000,
+}))
+'''
+LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def pacotes(saida_importtime):
+    # tempo próprio (sem os submódulos importados) somado por pacote de primeiro nível
+    por_pacote = defaultdict(float)
+    for linha in saida_importtime.splitlines():
+        encontrado = LINHA_IMPORTTIME.match(linha)
+        if encontrado:
+            por_pacote[encontrado.group(4).split('.')[0]] += int(encontrado.group(1)) / 1000
+    return por_pacote
+
+
+def rodada(ambiente):
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CODIGO],
+        cwd=RAIZ, env=dict(os.environ, **ambiente), capture_output=True, text=True, check=True,
+    )
+    total_ms = (time.perf_counter() - inicio) * 1000
+    fases = json.loads(processo.stdout.strip().splitlines()[-1])
+    return dict(fases, processo_ms=total_ms), pacotes(processo.stderr)
+
+
+def medir(ambiente, rodadas):
+    fases, por_pacote = defaultdict(list), defaultdict(list)
+    for _ in range(rodadas):
+        tempos, importacoes = rodada(ambiente)
+        for fase, valor in tempos.items():
+            fases[fase].append(valor)
+        for pacote, valor in importacoes.items():
+            por_pacote[pacote].append(valor)
+    medianas = {pacote: statistics.median(valores) for pacote, valores in por_pacote.items()}
+    return {
+        'fases': {fase: round(statistics.median(valores), 1) for fase, valores in fases.items()},
+        'importacao_por_pacote_ms': {
+            pacote: round(valor, 1) for pacote, valor in sorted(medianas.items(), key=lambda item: -item[1])
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=5)
+    parser.add_argument('--modos', nargs='+', choices=['padrao', 'producao'], default=['padrao', 'producao'])
+    parser.add_argument('--pacotes', type=int, default=15, help='quantos pacotes mostrar na tabela de importação')
+    parser.add_argument('--limite-ms', type=float, help='falha se a mediana do processo passar disto')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        especificacao = os.path.join(diretorio, 'apispec_1.json')
+        # banco já migrado e especificação gerada antes das rodadas, como no deploy
+        subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'app', 'openapi', 'gerar', '--saida', especificacao],
+            cwd=RAIZ, env=dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=banco), capture_output=True, check=True,
+        )
+        ambientes = {
+            'padrao': {'FLASK_OPENAPI_SPEC_FILE': os.path.join(diretorio, 'inexistente.json')},
+            'producao': {'FLASK_PRODUCTION_MODE': 'true', 'FLASK_OPENAPI_SPEC_FILE': especificacao},
+        }
+        for modo in args.modos:
+            resultados[modo] = medir(dict(ambientes[modo], FLASK_SQLALCHEMY_DATABASE_URI=banco), args.rodadas)
+
+    fases = list(next(iter(resultados.values()))['fases'])
+    print(f"{'modo':<10}" + ''.join(f'{fase:>24}' for fase in fases))
+    for modo, resultado in resultados.items():
+        print(f'{modo:<10}' + ''.join(f"{resultado['fases'][fase]:>24}" for fase in fases))
+    for modo, resultado in resultados.items():
+        print(f'\nimportação por pacote, {modo} (ms, tempo próprio)')
+        for pacote, valor in list(resultado['importacao_por_pacote_ms'].items())[:args.pacotes]:
+            print(f'  {pacote:<28}{valor:>8}')
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    if args.limite_ms is not None:
+        acima = [modo for modo, resultado in resultados.items() if resultado['fases']['processo_ms'] > args.limite_ms]
+        if acima:
+            print(f"\ncold start acima de {args.limite_ms} ms: {', '.join(acima)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
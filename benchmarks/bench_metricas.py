@@ -0,0 +1,123 @@
+"""Custo da instrumentação de /metrics por requisição.
+
+Uso:
+    python -m benchmarks.bench_metricas --linhas 10000 --requisicoes 2000
+
+Cria o mesmo banco sintético para dois apps, um com METRICS_ENABLED e outro
+sem, e faz as mesmas requisições pelo test client, alternando os dois em
+rodadas para que ruído do sistema afete ambos igualmente, e mostra o menor
+tempo por requisição de cada endpoint. Como o acréscimo fica perto do ruído
+de uma requisição inteira, mede também o custo isolado dos ganchos de
+requisição, de cada comando SQL instrumentado e de gerar /metrics.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+from flask import g
+
+from app import create_app
+from app.services.metricas import metricas
+from benchmarks.dados import popular_escolas
+from benchmarks.viacep_stub import CIDADES
+
+ENDPOINTS = {
+    'detalhe': lambda aleatorio, linhas: f'/api/escolas/{aleatorio.randint(1, linhas)}',
+    'busca': lambda aleatorio, linhas: '/api/escolas/busca?cidade={}&limit=20&ordenar=-avaliacao'.format(
+        aleatorio.choice(CIDADES)[0]
+    ),
+    'listagem': lambda aleatorio, linhas: '/api/escolas?limit=100&fields=id,nome,mensalidade',
+}
+
+
+def rodada(app, url, requisicoes, linhas, semente):
+    aleatorio = random.Random(semente)
+    cliente = app.test_client()
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        cliente.get(url(aleatorio, linhas)).close()
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+def custo_isolado(app, repeticoes=50_000):
+    resposta = app.response_class()
+    conexao = SimpleNamespace(info={})
+    with app.test_request_context('/api/escolas/1'):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            metricas._iniciar_requisicao()
+            metricas._guardar_status(resposta)
+            metricas._finalizar_requisicao(None)
+        meio = time.perf_counter()
+        g.metricas_sql = [0, 0.0]
+        for _ in range(repeticoes):
+            metricas._antes_do_sql(conexao, None, None, None, None, False)
+            metricas._depois_do_sql(conexao, None, None, None, None, False)
+        fim = time.perf_counter()
+    metricas.limpar()
+    return {
+        'us_por_requisicao': round((meio - inicio) / repeticoes * 1e6, 2),
+        'us_por_comando_sql': round((fim - meio) / repeticoes * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--requisicoes', type=int, default=2000, help='requisições por endpoint, somando as rodadas')
+    parser.add_argument('--rodadas', type=int, default=10)
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    por_rodada = max(1, args.requisicoes // args.rodadas)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        apps = {}
+        for ativo in (False, True):
+            caminho = os.path.join(diretorio, f'bench_{ativo}.db')
+            apps[ativo] = create_app({
+                'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'GEOCODER_URL': '', 'METRICS_ENABLED': ativo,
+            })
+            popular_escolas(caminho, args.linhas)
+            apps[ativo].logger.disabled = True
+
+        for nome, url in ENDPOINTS.items():
+            tempos = {False: [], True: []}
+            for i in range(args.rodadas):
+                for ativo in (False, True):
+                    tempos[ativo].append(rodada(apps[ativo], url, por_rodada, args.linhas, semente=i))
+            sem, com = min(tempos[False]), min(tempos[True])
+            resultados[nome] = {
+                'us_sem_metricas': round(sem, 1),
+                'us_com_metricas': round(com, 1),
+                'acrescimo_us': round(com - sem, 1),
+                'acrescimo_pct': round((com - sem) / sem * 100, 1),
+            }
+
+        with apps[True].app_context():
+            inicio = time.perf_counter()
+            tamanho = len(metricas.exportar())
+            exportacao_ms = (time.perf_counter() - inicio) * 1000
+        isolado = custo_isolado(apps[True])
+
+    colunas = list(next(iter(resultados.values())))
+    print(f"{'endpoint':<12}" + ''.join(f'{coluna:>18}' for coluna in colunas))
+    for nome, valores in resultados.items():
+        print(f'{nome:<12}' + ''.join(f'{str(valores[coluna]):>18}' for coluna in colunas))
+    resultados['isolado'] = isolado
+    resultados['exportacao'] = {'ms': round(exportacao_ms, 2), 'bytes': tamanho}
+    print(f"\nganchos de requisição: {resultados['isolado']['us_por_requisicao']} us por requisição")
+    print(f"eventos de cursor: {resultados['isolado']['us_por_comando_sql']} us por comando SQL")
+    print(f"GET /metrics: {resultados['exportacao']['ms']} ms para {tamanho} bytes")
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
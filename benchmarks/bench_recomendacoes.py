@@ -0,0 +1,158 @@
+"""Recomendação de escolas: pontuação vetorizada x laço em Python.
+
+Uso:
+    python -m benchmarks.bench_recomendacoes --linhas 10000 100000
+    python -m benchmarks.bench_recomendacoes --linhas 100000 --limite-ms 50   # em CI
+
+Para cada tamanho mede, com os mesmos critérios e pesos:
+    python       lê as escolas com select() e pontua linha a linha, top K com heapq
+    numpy        pontua o retrato colunar inteiro de uma vez, top K com argpartition
+    numpy+sort   igual, mas ordenando todas as pontuações (argsort)
+    endpoint     GET /api/pais/<id>/recomendacoes com o retrato já carregado
+e o tempo de carregar o retrato colunar depois de uma escrita.
+
+Com --limite-ms termina com código 1 se o p95 do endpoint passar do limite.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import select
+
+from app import create_app
+from app.db import db
+from app.model.escola import Escola
+from app.services.colunar import PALAVRA, carregar_colunas, catalogo
+from app.services.geo import RAIO_TERRA_KM
+from app.services.pesquisa import termos_pesquisa
+from app.services.recomendacoes import AVALIACOES_A_PRIORI, NOTA_MAXIMA, PESOS_PADRAO, melhores, pontuar
+from benchmarks.dados import popular_escolas, popular_pais, sortear_cidade
+
+K = 10
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def python(pais, preferencias, escala_km):
+    linhas = db.session.execute(select(
+        Escola.id, Escola.mensalidade, Escola.avaliacoes_total, Escola.avaliacoes_soma, Escola.quantidade_alunos,
+        Escola.metodologia_normalizada, Escola.latitude, Escola.longitude,
+    )).all()
+    total = sum(linha.avaliacoes_total for linha in linhas)
+    media_geral = sum(linha.avaliacoes_soma for linha in linhas) / total if total else NOTA_MAXIMA / 2
+    alunos = [math.log(max(linha.quantidade_alunos, 1)) for linha in linhas]
+    minimo, amplitude = min(alunos), max(alunos) - min(alunos)
+    # cada metodologia distinta conferida uma vez, com a regra de prefixo da busca
+    termos = termos_pesquisa(preferencias['metodologia'])
+    preferidas = {
+        valor for valor in {linha.metodologia_normalizada for linha in linhas}
+        if all(any(palavra.startswith(termo) for palavra in PALAVRA.findall(valor)) for termo in termos)
+    }
+    pesos = preferencias['pesos']
+    soma_pesos = sum(pesos.values())
+
+    def pontuacao(linha, log_alunos):
+        if linha.latitude is None:
+            distancia = 0.0
+        else:
+            distancia = math.exp(-_haversine(pais.latitude, pais.longitude, linha.latitude, linha.longitude) / escala_km)
+        notas = {
+            'distancia': distancia,
+            'preco': min(1.0, preferencias['orcamento'] / max(linha.mensalidade, 1e-9)),
+            'avaliacao': (linha.avaliacoes_soma + AVALIACOES_A_PRIORI * media_geral)
+            / (linha.avaliacoes_total + AVALIACOES_A_PRIORI) / NOTA_MAXIMA,
+            'metodologia': float(linha.metodologia_normalizada in preferidas),
+            'capacidade': 1.0 - (log_alunos - minimo) / amplitude if amplitude else 1.0,
+        }
+        return sum(pesos[criterio] * nota for criterio, nota in notas.items()) / soma_pesos
+
+    return heapq.nlargest(K, ((pontuacao(linha, log), -linha.id) for linha, log in zip(linhas, alunos)))
+
+
+def vetorizado(pais, preferencias, ordenar_tudo=False):
+    colunas = catalogo().colunas()
+    pontuacao = pontuar(colunas, pais, preferencias)[0]
+    if ordenar_tudo:
+        return np.argsort(-pontuacao, kind='stable')[:K]
+    return melhores(pontuacao, colunas.ids, K)
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        'p50_ms': round(statistics.median(tempos), 2),
+        'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--limite-ms', type=float, help='falha se o p95 do endpoint passar disto')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    aleatorio = random.Random(42)
+    resultados = {}
+    for linhas in args.linhas:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'bench.db')
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'GEOCODER_URL': ''})
+            popular_escolas(caminho, linhas)
+            popular_pais(caminho, 100)
+            cliente = app.test_client()
+            with app.app_context():
+                latitude, longitude = sortear_cidade(aleatorio)[2:4]
+                pais = SimpleNamespace(latitude=latitude, longitude=longitude)
+                preferencias = {'orcamento': 1500.0, 'metodologia': 'Montessori', 'pesos': dict(PESOS_PADRAO)}
+                escala_km = app.config['RECOMMENDATION_DISTANCE_KM']
+                catalogo().colunas()
+                resultados[linhas] = {
+                    'python': medir(lambda: python(pais, preferencias, escala_km), max(3, args.repeticoes // 5)),
+                    'numpy': medir(lambda: vetorizado(pais, preferencias), args.repeticoes),
+                    'numpy+sort': medir(lambda: vetorizado(pais, preferencias, ordenar_tudo=True), args.repeticoes),
+                    'endpoint': medir(lambda: cliente.get(
+                        f'/api/pais/{aleatorio.randint(1, 100)}/recomendacoes?orcamento=1500&metodologia=Montessori'
+                    ).close(), args.repeticoes),
+                    'carga do retrato': medir(lambda: carregar_colunas(0), max(3, args.repeticoes // 5)),
+                }
+                db.session.remove()
+
+    for linhas, por_variante in resultados.items():
+        print(f"\n{linhas} escolas\n{'variante':<20}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+        for nome, tempos in por_variante.items():
+            print(f"{nome:<20}{tempos['p50_ms']:>12}{tempos['p95_ms']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    if args.limite_ms is not None:
+        acima = [linhas for linhas, por_variante in resultados.items() if por_variante['endpoint']['p95_ms'] > args.limite_ms]
+        if acima:
+            print(f"\nendpoint acima de {args.limite_ms} ms: {', '.join(map(str, acima))} escolas")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
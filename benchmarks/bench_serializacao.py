@@ -0,0 +1,121 @@
+"""Serialização de escolas: comprehension, marshmallow e o serializador compilado.
+
+Uso:
+    python -m benchmarks.bench_serializacao --linhas 10000 100000
+
+Para cada tamanho mede a consulta + conversão em dicts + codificação JSON de
+todas as escolas de três formas: objetos ORM com o dict escrito à mão (como as
+rotas faziam), objetos ORM com o EscolaSchema do marshmallow e tuplas de
+select() com o serializador compilado, codificadas com json e com orjson.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.db import db
+from app.model.escola import Escola
+from app.schema.codificador import orjson
+from app.schema.escola_schema import EscolaSchema, serializador_escola
+from benchmarks.dados import popular_escolas
+
+
+def comprehension():
+    return [{
+        'id': e.id,
+        'nome': e.nome,
+        'telefone': e.telefone,
+        'rua': e.rua,
+        'numero': e.numero,
+        'bairro': e.bairro,
+        'cidade': e.cidade,
+        'estado': e.estado,
+        'cep': e.cep,
+        'mensalidade': e.mensalidade,
+        'quantidade_alunos': e.quantidade_alunos,
+        'metodologia': e.metodologia,
+        'email': e.email,
+        'imagem_url': e.imagem_url,
+        'avaliacao': e.avaliacao,
+        'avaliacoes_total': e.avaliacoes_total,
+        'latitude': e.latitude,
+        'longitude': e.longitude
+    } for e in Escola.query.all()]
+
+
+def marshmallow():
+    schema = EscolaSchema(only=serializador_escola.campos, many=True)
+    return schema.dump(Escola.query.all())
+
+
+def serializador():
+    return serializador_escola.linhas(db.session.execute(serializador_escola.select()))
+
+
+def json_padrao(itens):
+    return json.dumps(itens, separators=(',', ':'), sort_keys=True)
+
+
+def json_orjson(itens):
+    return orjson.dumps(itens, option=orjson.OPT_SORT_KEYS)
+
+
+VARIANTES = [
+    ('comprehension + json', comprehension, json_padrao),
+    ('marshmallow + json', marshmallow, json_padrao),
+    ('serializador + json', serializador, json_padrao),
+    ('serializador + orjson', serializador, json_orjson),
+]
+
+
+def medir(montar, codificar, repeticoes):
+    tempos_dicts, tempos_total = [], []
+    for _ in range(repeticoes):
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        itens = montar()
+        meio = time.perf_counter()
+        codificar(itens)
+        fim = time.perf_counter()
+        tempos_dicts.append((meio - inicio) * 1000)
+        tempos_total.append((fim - inicio) * 1000)
+    return {
+        'ms_dicts': round(statistics.median(tempos_dicts), 1),
+        'ms_total': round(statistics.median(tempos_total), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    variantes = [variante for variante in VARIANTES if orjson or variante[2] is not json_orjson]
+    resultados = {}
+    for linhas in args.linhas:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'bench.db')
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'})
+            popular_escolas(caminho, linhas)
+            with app.app_context():
+                resultados[linhas] = {
+                    nome: medir(montar, codificar, args.repeticoes) for nome, montar, codificar in variantes
+                }
+
+    for linhas, por_variante in resultados.items():
+        print(f"\n{linhas} escolas\n{'variante':<26}{'dicts (ms)':>12}{'total (ms)':>12}")
+        for nome, tempos in por_variante.items():
+            print(f"{nome:<26}{tempos['ms_dicts']:>12}{tempos['ms_total']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Compara dois resultados de benchmarks/suite.py e aponta regressões.
+
+Uso:
+    python -m benchmarks.comparar antes.json depois.json --tolerancia 0.15
+
+Para cada modo e cenário presente nos dois arquivos mostra a variação das
+latências (p50/p95/p99), da vazão e do pico de memória. Uma variação conta
+como regressão quando piora mais que --tolerancia (fração) e mais que o piso
+absoluto da métrica, para que cenários de poucos milissegundos não acusem
+ruído. Termina com código 1 se houver alguma regressão, para uso em CI.
+"""
+import argparse
+import json
+import sys
+
+# métrica -> (maior é melhor, piso absoluto da diferença)
+METRICAS = {
+    'p50_ms': (False, 0.5),
+    'p95_ms': (False, 1.0),
+    'p99_ms': (False, 2.0),
+    'req_por_s': (True, 1.0),
+    'rss_pico_mb': (False, 5.0),
+}
+CAMPOS_META = ('escala', 'escolas', 'pais', 'avaliacoes', 'latencia_viacep_s', 'requisicoes', 'concorrencia', 'servidor')
+
+
+def comparar(antes, depois, tolerancia):
+    linhas, regressoes = [], []
+    for modo in ('cliente', 'http'):
+        if modo not in antes or modo not in depois:
+            continue
+        for cenario, valores in depois[modo].items():
+            anteriores = antes[modo].get(cenario)
+            if anteriores is None:
+                continue
+            for metrica, (maior_melhor, piso) in METRICAS.items():
+                valor, anterior = valores.get(metrica), anteriores.get(metrica)
+                if valor is None or not anterior:
+                    continue
+                variacao = (valor - anterior) / anterior
+                piora = -variacao if maior_melhor else variacao
+                regressao = piora > tolerancia and abs(valor - anterior) > piso
+                linhas.append((modo, cenario, metrica, anterior, valor, variacao, regressao))
+                if regressao:
+                    regressoes.append((modo, cenario, metrica))
+            if valores.get('erros', 0) > anteriores.get('erros', 0):
+                linhas.append((modo, cenario, 'erros', anteriores.get('erros', 0), valores['erros'], None, True))
+                regressoes.append((modo, cenario, 'erros'))
+    return linhas, regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('antes')
+    parser.add_argument('depois')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='piora relativa aceita, ex.: 0.10 = 10%%')
+    parser.add_argument('--so-regressoes', action='store_true', help='mostra só as linhas com regressão')
+    args = parser.parse_args()
+
+    with open(args.antes) as arquivo:
+        antes = json.load(arquivo)
+    with open(args.depois) as arquivo:
+        depois = json.load(arquivo)
+
+    meta_antes, meta_depois = antes.get('meta', {}), depois.get('meta', {})
+    print(f"{meta_antes.get('commit')} ({meta_antes.get('data')}) -> {meta_depois.get('commit')} ({meta_depois.get('data')})")
+    diferentes = [campo for campo in CAMPOS_META if meta_antes.get(campo) != meta_depois.get(campo)]
+    if diferentes:
+        print(f"aviso: execuções com parâmetros diferentes ({', '.join(diferentes)}); a comparação pode não valer")
+
+    linhas, regressoes = comparar(antes, depois, args.tolerancia)
+    print(f"\n{'modo':<8}{'cenário':<28}{'métrica':<13}{'antes':>10}{'depois':>10}{'variação':>10}")
+    for modo, cenario, metrica, anterior, valor, variacao, regressao in linhas:
+        if args.so_regressoes and not regressao:
+            continue
+        texto = '' if variacao is None else f'{variacao:+.1%}'
+        print(f"{modo:<8}{cenario:<28}{metrica:<13}{anterior:>10}{valor:>10}{texto:>10}{'  <- regressão' if regressao else ''}")
+
+    print(f'\n{len(regressoes)} regressões acima de {args.tolerancia:.0%}')
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == '__main__':
+    main()
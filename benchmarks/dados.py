@@ -0,0 +1,186 @@
+"""Gerador de dados sintéticos para os benchmarks.
+
+Escolas, pais e avaliações com CEPs dentro da faixa real de cada cidade,
+metodologias com a distribuição aproximada do mercado e agregados de
+avaliação consistentes com as avaliações gravadas. Tudo é determinístico
+para a mesma semente.
+"""
+import random
+import sqlite3
+
+from app.model.escola import normalizar_texto
+from benchmarks.viacep_stub import BAIRROS, CIDADES, FAIXAS_CEP, RUAS
+
+METODOLOGIAS = [
+    'Construtivista', 'Tradicional', 'Montessori', 'Montessoriano', 'Waldorf',
+    'Sociointeracionista', 'Freiriana', 'Bilíngue', 'Pedagogia de Projetos', 'Reggio Emilia',
+]
+PESOS_METODOLOGIAS = [30, 30, 8, 2, 6, 10, 4, 6, 3, 1]
+# peso aproximado da população de cada cidade, na ordem de CIDADES
+PESOS_CIDADES = [12, 7, 2.5, 0.6, 2, 1.5, 2.9, 1.7, 2.7, 3]
+NOMES = [
+    'Ana', 'Maria', 'João', 'José', 'Francisco', 'Antônio', 'Juliana', 'Mariana', 'Lucas', 'Gabriel',
+    'Beatriz', 'Letícia', 'Rafael', 'Fernanda', 'Paulo', 'Camila', 'Pedro', 'Larissa', 'Thiago', 'Patrícia',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Melo', 'Barbosa', 'Cardoso', 'Rocha', 'Nascimento',
+]
+COMENTARIOS = [
+    None, None, 'Ótima escola, recomendo.', 'Professores atenciosos.', 'Estrutura poderia melhorar.',
+    'Comunicação com os pais é excelente.', 'Mensalidade alta para o que oferece.', 'Meu filho adora ir para a aula.',
+]
+# quantidade de escolas de cada escala; pais e avaliações são proporcionais
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+COLUNAS_ESCOLA = (
+    'nome', 'telefone', 'rua', 'numero', 'bairro', 'cidade', 'estado', 'cep', 'mensalidade',
+    'quantidade_alunos', 'metodologia', 'metodologia_normalizada', 'email', 'avaliacao',
+    'avaliacoes_total', 'avaliacoes_soma', 'imagem_url', 'latitude', 'longitude',
+)
+COLUNAS_PAIS = (
+    'nome_completo', 'telefone', 'rua', 'numero', 'bairro', 'cidade', 'estado', 'cep', 'idade_crianca',
+    'necessidades_especiais', 'email', 'latitude', 'longitude',
+)
+COLUNAS_AVALIACAO = ('nota', 'nome_avaliador', 'comentario', 'escola_id')
+
+
+def sortear_cidade(aleatorio):
+    return aleatorio.choices(CIDADES, PESOS_CIDADES)[0]
+
+
+def gerar_cep(aleatorio, cidade):
+    inicio, fim = FAIXAS_CEP[cidade]
+    return f'{aleatorio.randint(inicio * 1000, fim * 1000 + 999):08d}'
+
+
+def gerar_telefone(aleatorio):
+    return f'({aleatorio.randint(11, 99)}) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}'
+
+
+def gerar_nome(aleatorio):
+    return f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}'
+
+
+def gerar_escolas(quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    for i in range(quantidade):
+        cidade, uf, lat, lon = sortear_cidade(aleatorio)
+        metodologia = aleatorio.choices(METODOLOGIAS, PESOS_METODOLOGIAS)[0]
+        avaliacao = round(aleatorio.uniform(1, 5), 2) if aleatorio.random() < 0.9 else None
+        avaliacoes_total = aleatorio.randint(1, 40) if avaliacao is not None else 0
+        cep = gerar_cep(aleatorio, cidade)
+        yield {
+            'nome': f'Escola {aleatorio.choice(RUAS).split()[-1]} {i}',
+            'telefone': f'({aleatorio.randint(11, 99)}) 3{aleatorio.randint(100, 999)}-{aleatorio.randint(1000, 9999)}',
+            'rua': aleatorio.choice(RUAS),
+            'numero': str(aleatorio.randint(1, 3000)),
+            'bairro': aleatorio.choice(BAIRROS),
+            'cidade': cidade,
+            'estado': uf,
+            'cep': cep,
+            'mensalidade': round(aleatorio.lognormvariate(7.2, 0.5), 2),
+            'quantidade_alunos': aleatorio.randint(50, 3000),
+            'metodologia': metodologia,
+            'metodologia_normalizada': normalizar_texto(metodologia),
+            'email': f'contato{i}@escola.com.br',
+            'avaliacao': avaliacao,
+            'avaliacoes_total': avaliacoes_total,
+            'avaliacoes_soma': avaliacao * avaliacoes_total if avaliacao is not None else 0,
+            'imagem_url': None,
+            'latitude': lat + aleatorio.uniform(-0.25, 0.25),
+            'longitude': lon + aleatorio.uniform(-0.25, 0.25),
+        }
+
+
+def gerar_pais(quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    for i in range(quantidade):
+        cidade, uf, lat, lon = sortear_cidade(aleatorio)
+        yield {
+            'nome_completo': gerar_nome(aleatorio),
+            'telefone': gerar_telefone(aleatorio),
+            'rua': aleatorio.choice(RUAS),
+            'numero': str(aleatorio.randint(1, 3000)),
+            'bairro': aleatorio.choice(BAIRROS),
+            'cidade': cidade,
+            'estado': uf,
+            'cep': gerar_cep(aleatorio, cidade),
+            'idade_crianca': aleatorio.randint(1, 17),
+            'necessidades_especiais': aleatorio.random() < 0.08,
+            'email': f'responsavel{i}@email.com.br',
+            'latitude': lat + aleatorio.uniform(-0.25, 0.25),
+            'longitude': lon + aleatorio.uniform(-0.25, 0.25),
+        }
+
+
+def gerar_avaliacoes(quantidade_escolas, por_escola=3, semente=42):
+    # Quantidade por escola com cauda longa: muitas sem avaliação, poucas com dezenas.
+    aleatorio = random.Random(semente)
+    for escola_id in range(1, quantidade_escolas + 1):
+        media = aleatorio.uniform(2, 5)
+        for _ in range(int(aleatorio.expovariate(1 / por_escola))):
+            yield {
+                'nota': round(min(5.0, max(0.0, aleatorio.gauss(media, 0.8))), 1),
+                'nome_avaliador': gerar_nome(aleatorio),
+                'comentario': aleatorio.choice(COMENTARIOS),
+                'escola_id': escola_id,
+            }
+
+
+def _inserir(conexao, tabela, colunas, registros, lote):
+    # Insere direto pelo sqlite3 com executemany; bem mais rápido que o ORM para milhões de linhas.
+    sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' for _ in colunas)})"
+    linhas = []
+    for registro in registros:
+        linhas.append(tuple(registro[coluna] for coluna in colunas))
+        if len(linhas) >= lote:
+            conexao.executemany(sql, linhas)
+            conexao.commit()
+            linhas.clear()
+    if linhas:
+        conexao.executemany(sql, linhas)
+        conexao.commit()
+
+
+def popular_escolas(caminho_banco, quantidade, semente=42, lote=20000):
+    conexao = sqlite3.connect(caminho_banco)
+    try:
+        _inserir(conexao, 'escola', COLUNAS_ESCOLA, gerar_escolas(quantidade, semente), lote)
+    finally:
+        conexao.close()
+
+
+def popular_pais(caminho_banco, quantidade, semente=42, lote=20000):
+    conexao = sqlite3.connect(caminho_banco)
+    try:
+        _inserir(conexao, 'pais', COLUNAS_PAIS, gerar_pais(quantidade, semente), lote)
+    finally:
+        conexao.close()
+
+
+def popular_avaliacoes(caminho_banco, quantidade_escolas, por_escola=3, semente=42, lote=20000):
+    # Depois das avaliações, recalcula os agregados das escolas para que
+    # avaliacao, avaliacoes_total e avaliacoes_soma batam com a tabela.
+    conexao = sqlite3.connect(caminho_banco)
+    try:
+        _inserir(
+            conexao, 'avaliacao', COLUNAS_AVALIACAO, gerar_avaliacoes(quantidade_escolas, por_escola, semente), lote
+        )
+        conexao.execute('UPDATE escola SET avaliacoes_total = 0, avaliacoes_soma = 0, avaliacao = NULL')
+        conexao.execute("""
+            UPDATE escola SET avaliacoes_total = agregado.total, avaliacoes_soma = agregado.soma,
+                avaliacao = agregado.soma / agregado.total
+            FROM (SELECT escola_id, COUNT(*) AS total, SUM(nota) AS soma FROM avaliacao GROUP BY escola_id) AS agregado
+            WHERE escola.id = agregado.escola_id
+        """)
+        conexao.commit()
+    finally:
+        conexao.close()
+
+
+def popular(caminho_banco, escolas, pais=None, avaliacoes_por_escola=3, semente=42):
+    # Banco completo de uma escala: por padrão um responsável para cada duas escolas.
+    popular_escolas(caminho_banco, escolas, semente)
+    popular_pais(caminho_banco, escolas // 2 if pais is None else pais, semente)
+    popular_avaliacoes(caminho_banco, escolas, avaliacoes_por_escola, semente)
@@ -0,0 +1,104 @@
+"""Utilitários de medição compartilhados pelos benchmarks que sobem servidores."""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.request import urlopen
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLASK_RUN = [sys.executable, '-m', 'flask', '--app', 'run:app', 'run', '--with-threads', '--port']
+UVICORN = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--log-level', 'warning', '--no-access-log', '--port']
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def ler_status(pid):
+    # Threads, VmRSS e VmHWM (pico de memória residente) do processo
+    valores = {}
+    with open(f'/proc/{pid}/status') as arquivo:
+        for linha in arquivo:
+            chave, _, valor = linha.partition(':')
+            if chave in ('Threads', 'VmRSS', 'VmHWM'):
+                valores[chave] = int(valor.split()[0])
+    return valores
+
+
+def zerar_pico(pid):
+    # "5" em clear_refs traz o VmHWM de volta ao RSS atual, para medir o pico de
+    # cada cenário separadamente; sem permissão o pico passa a ser acumulado
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def pico_rss_mb(pid):
+    try:
+        return round(ler_status(pid).get('VmHWM', 0) / 1024, 1)
+    except OSError:
+        return None
+
+
+class Monitor(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.threads_max = 0
+        self.rss_max_kb = 0
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(0.05):
+            try:
+                status = ler_status(self.pid)
+            except OSError:
+                return
+            self.threads_max = max(self.threads_max, status.get('Threads', 0))
+            self.rss_max_kb = max(self.rss_max_kb, status.get('VmHWM', 0))
+
+
+def aguardar(base, processo, limite=60):
+    fim = time.perf_counter() + limite
+    while time.perf_counter() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError('o servidor terminou antes de responder')
+        try:
+            with urlopen(f'{base}/api/pais?limit=1') as resposta:
+                if resposta.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('o servidor não respondeu a tempo')
+
+
+@contextlib.contextmanager
+def servidor(comando, ambiente):
+    # Sobe a API em outro processo (configurada por variáveis FLASK_*) e devolve
+    # a URL base e o processo, já respondendo
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        comando + [str(porta)], cwd=RAIZ, env=dict(os.environ, **ambiente),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{porta}'
+    try:
+        aguardar(base, processo)
+        yield base, processo
+    finally:
+        processo.terminate()
+        processo.wait()
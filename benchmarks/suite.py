@@ -0,0 +1,495 @@
+"""Suíte de benchmarks de todos os endpoints, para comparar commits.
+
+Uso:
+    python -m benchmarks.suite --escala 1k --json antes.json
+    python -m benchmarks.suite --escala 100k --modo http --servidor asgi --banco /tmp/bench_100k.db
+    python -m benchmarks.comparar antes.json depois.json
+
+Gera um banco sintético na escala pedida (escolas, pais e avaliações, ver
+benchmarks/dados.py), sobe o ViaCEP simulado com --latencia e exercita cada
+endpoint dos blueprints em dois modos:
+
+    cliente   pelo test client do Flask, uma requisição por vez: o custo da
+              aplicação, sem rede nem servidor
+    http      por HTTP de verdade contra o servidor de --servidor (flask run
+              ou uvicorn asgi:app), com --concorrencia requisições em voo
+
+Cada modo começa de uma cópia do mesmo banco; leituras usam as linhas
+geradas e escritas usam linhas criadas pela própria suíte, então a ordem dos
+cenários é fixa. Para cada cenário reporta p50/p95/p99, vazão e o pico de
+memória residente do processo que atende. O JSON traz também o commit, as
+versões e a escala, e é o formato lido por benchmarks/comparar.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import aiohttp
+
+from app import create_app
+from app.db import db
+from app.services.paginacao import codificar_cursor
+from benchmarks.dados import (
+    ESCALAS, METODOLOGIAS, PESOS_METODOLOGIAS, gerar_cep, gerar_nome, gerar_telefone, popular, sortear_cidade,
+)
+from benchmarks.medicao import FLASK_RUN, RAIZ, UVICORN, percentil, pico_rss_mb, servidor, zerar_pico
+from benchmarks.viacep_stub import BAIRROS, CIDADES, iniciar_stub, url_geocodificacao
+
+SERVIDORES = {'flask': FLASK_RUN, 'asgi': UVICORN}
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+LINHAS_IMPORTACAO = 100
+AVALIACOES_POR_LOTE = 20
+ALTERACOES_POR_LOTE = 50
+
+
+class Cenario:
+    # gerar(aleatorio, estado) devolve (método, caminho, corpo, Content-Type), ou
+    # None quando não há mais linhas para o cenário; depois(estado, resposta)
+    # recebe o JSON de cada resposta bem-sucedida.
+
+    def __init__(self, nome, gerar, status=200, fracao=1.0, depois=None):
+        self.nome = nome
+        self.gerar = gerar
+        self.status = status
+        self.fracao = fracao
+        self.depois = depois
+
+
+def _get(caminho, **parametros):
+    return 'GET', f'{caminho}?{urlencode(parametros)}' if parametros else caminho, None, None
+
+
+def _json(metodo, caminho, dados):
+    return metodo, caminho, json.dumps(dados).encode(), JSON
+
+
+def nova_escola(aleatorio, estado):
+    estado['sequencia'] += 1
+    cidade = sortear_cidade(aleatorio)[0]
+    return {
+        'nome': f'Escola Nova {estado["sequencia"]}',
+        'telefone': gerar_telefone(aleatorio),
+        'cep': gerar_cep(aleatorio, cidade),
+        'numero': str(aleatorio.randint(1, 3000)),
+        'mensalidade': round(aleatorio.lognormvariate(7.2, 0.5), 2),
+        'quantidade_alunos': aleatorio.randint(50, 3000),
+        'metodologia': aleatorio.choices(METODOLOGIAS, PESOS_METODOLOGIAS)[0],
+        'email': f'nova{estado["sequencia"]}@escola.com.br',
+    }
+
+
+def novo_pai(aleatorio, estado):
+    estado['sequencia'] += 1
+    cidade = sortear_cidade(aleatorio)[0]
+    return {
+        'nome_completo': gerar_nome(aleatorio),
+        'telefone': gerar_telefone(aleatorio),
+        'cep': gerar_cep(aleatorio, cidade),
+        'numero': str(aleatorio.randint(1, 3000)),
+        'idade_crianca': aleatorio.randint(1, 17),
+        'necessidades_especiais': aleatorio.random() < 0.08,
+        'email': f'novo{estado["sequencia"]}@email.com.br',
+    }
+
+
+def nova_avaliacao(aleatorio):
+    return {'nota': round(aleatorio.uniform(0, 5), 1), 'nome_avaliador': gerar_nome(aleatorio), 'comentario': None}
+
+
+def _importacao(caminho, gerador):
+    def gerar(aleatorio, estado):
+        linhas = (json.dumps(gerador(aleatorio, estado)) for _ in range(LINHAS_IMPORTACAO))
+        return 'POST', caminho, '\n'.join(linhas).encode(), NDJSON
+    return gerar
+
+
+def _criada(tabela):
+    # ids novos continuam a sequência dos gerados, na ordem em que foram gravados
+    def gerar(aleatorio, estado):
+        criadas = estado[f'{tabela}_criadas']
+        return estado[tabela] + aleatorio.randint(1, criadas) if criadas else None
+    return gerar
+
+
+def _removida(tabela):
+    def gerar(aleatorio, estado):
+        if estado[f'{tabela}_removidas'] >= estado[f'{tabela}_criadas']:
+            return None
+        estado[f'{tabela}_removidas'] += 1
+        return estado[tabela] + estado[f'{tabela}_removidas']
+    return gerar
+
+
+def _contar(tabela):
+    def depois(estado, resposta):
+        estado[f'{tabela}_criadas'] += 1
+    return depois
+
+
+def _guardar_avaliacao(estado, resposta):
+    estado['avaliacoes_criadas'].append((resposta['escola_id'], resposta['id']))
+
+
+def _remover_avaliacao(aleatorio, estado):
+    if not estado['avaliacoes_criadas']:
+        return None
+    escola_id, avaliacao_id = estado['avaliacoes_criadas'].pop()
+    return 'DELETE', f'/api/escolas/{escola_id}/avaliacoes/{avaliacao_id}', None, None
+
+
+def _faixa_de_preco(aleatorio):
+    minimo = aleatorio.randint(800, 3000)
+    return {'min_preco': minimo, 'max_preco': minimo + 1}
+
+
+def _perto_de_uma_cidade(aleatorio):
+    _, _, lat, lon = aleatorio.choice(CIDADES)
+    return {
+        'latitude': round(lat + aleatorio.uniform(-0.2, 0.2), 4),
+        'longitude': round(lon + aleatorio.uniform(-0.2, 0.2), 4),
+    }
+
+
+def _atualizar(tabela, campos):
+    escolher = _criada(tabela)
+
+    def gerar(aleatorio, estado):
+        id_ = escolher(aleatorio, estado)
+        if id_ is None:
+            return None
+        return _json('PUT', f'/api/{tabela}/{id_}', campos(aleatorio))
+    return gerar
+
+
+def _apagar(tabela):
+    escolher = _removida(tabela)
+
+    def gerar(aleatorio, estado):
+        id_ = escolher(aleatorio, estado)
+        return None if id_ is None else ('DELETE', f'/api/{tabela}/{id_}', None, None)
+    return gerar
+
+
+# Ordem fixa: leituras sobre os dados gerados, escritas, remoções das linhas
+# criadas e por fim os endpoints de infraestrutura. As faixas dos filtros são
+# estreitas para que a resposta não cresça com a escala mais que o necessário.
+CENARIOS = [
+    Cenario('escolas.listar', lambda a, e: _get('/api/escolas', limit=100)),
+    Cenario('escolas.listar_cursor', lambda a, e: _get(
+        '/api/escolas', limit=100, fields='id,nome,mensalidade', after=codificar_cursor(a.randint(1, e['escolas']))
+    )),
+    Cenario('escolas.detalhe', lambda a, e: _get(f'/api/escolas/{a.randint(1, e["escolas"])}')),
+    Cenario('escolas.por_ids', lambda a, e: _get(
+        '/api/escolas', ids=','.join(str(a.randint(1, e['escolas'])) for _ in range(20))
+    )),
+    Cenario('escolas.filtro_metodologia', lambda a, e: _get(
+        '/api/escolas/filtro/metodologia', metodologia=a.choice(['Reggio Emilia', 'Montessoriano', 'Freiriana'])
+    ), fracao=0.2),
+    Cenario('escolas.filtro_preco', lambda a, e: _get(
+        '/api/escolas/filtro/preco', **_faixa_de_preco(a)
+    ), fracao=0.2),
+    Cenario('escolas.filtro_avaliacao', lambda a, e: _get(
+        '/api/escolas/filtro/avaliacao', min_avaliacao=a.choice([4.96, 4.97, 4.98, 4.99])
+    ), fracao=0.2),
+    Cenario('escolas.filtro_localizacao', lambda a, e: _get(
+        '/api/escolas/filtro/localizacao', **_perto_de_uma_cidade(a), k=20
+    )),
+    Cenario('escolas.busca', lambda a, e: _get(
+        '/api/escolas/busca', cidade=a.choice(CIDADES)[0], metodologia=a.choices(METODOLOGIAS, PESOS_METODOLOGIAS)[0],
+        limit=20, ordenar='-avaliacao',
+    )),
+    Cenario('escolas.busca_raio', lambda a, e: _get(
+        '/api/escolas/busca', **_perto_de_uma_cidade(a), raio_km=3, limit=20
+    )),
+    Cenario('escolas.facetas', lambda a, e: _get(
+        '/api/escolas/facetas', cidade=a.choice(CIDADES)[0], min_preco=a.choice([0, 800, 1500])
+    )),
+    Cenario('escolas.pesquisa', lambda a, e: _get(
+        '/api/escolas/pesquisa', q=a.choice(METODOLOGIAS + BAIRROS), limit=20
+    )),
+    Cenario('pais.listar', lambda a, e: _get('/api/pais', limit=100)),
+    Cenario('pais.detalhe', lambda a, e: _get(f'/api/pais/{a.randint(1, e["pais"])}')),
+    Cenario('pais.recomendacoes', lambda a, e: _get(
+        f'/api/pais/{a.randint(1, e["pais"])}/recomendacoes',
+        orcamento=a.choice([1000, 1500, 2500]), metodologia=a.choices(METODOLOGIAS, PESOS_METODOLOGIAS)[0],
+    )),
+    Cenario('avaliacoes.listar', lambda a, e: _get(f'/api/escolas/{a.randint(1, e["escolas"])}/avaliacoes')),
+    Cenario('escolas.criar', lambda a, e: _json('POST', '/api/escolas', nova_escola(a, e)), 201, depois=_contar('escolas')),
+    Cenario('escolas.atualizar', _atualizar('escolas', lambda a: {
+        'mensalidade': round(a.lognormvariate(7.2, 0.5), 2), 'quantidade_alunos': a.randint(50, 3000),
+    })),
+    Cenario('escolas.alterar', lambda a, e: _json(
+        'PATCH', f'/api/escolas/{a.randint(1, e["escolas"])}', {'mensalidade': round(a.lognormvariate(7.2, 0.5), 2)}
+    )),
+    Cenario('escolas.alterar_lote', lambda a, e: _json('PATCH', '/api/escolas', [
+        {'id': a.randint(1, e['escolas']), 'mensalidade': round(a.lognormvariate(7.2, 0.5), 2)}
+        for _ in range(ALTERACOES_POR_LOTE)
+    ]), fracao=0.2),
+    Cenario('pais.criar', lambda a, e: _json('POST', '/api/pais', novo_pai(a, e)), 201, depois=_contar('pais')),
+    Cenario('pais.atualizar', _atualizar('pais', lambda a: {'idade_crianca': a.randint(1, 17)})),
+    Cenario('pais.alterar', lambda a, e: _json(
+        'PATCH', f'/api/pais/{a.randint(1, e["pais"])}', {'idade_crianca': a.randint(1, 17)}
+    )),
+    Cenario('avaliacoes.criar', lambda a, e: _json(
+        'POST', f'/api/escolas/{a.randint(1, e["escolas"])}/avaliacoes', nova_avaliacao(a)
+    ), 201, depois=_guardar_avaliacao),
+    Cenario('avaliacoes.lote', lambda a, e: _json(
+        'POST', f'/api/escolas/{a.randint(1, e["escolas"])}/avaliacoes/lote',
+        [nova_avaliacao(a) for _ in range(AVALIACOES_POR_LOTE)],
+    ), 201, fracao=0.2),
+    Cenario('escolas.importacao', _importacao('/api/escolas/importacao', nova_escola), fracao=0.05),
+    Cenario('pais.importacao', _importacao('/api/pais/importacao', novo_pai), fracao=0.05),
+    Cenario('avaliacoes.remover', _remover_avaliacao, 204),
+    Cenario('escolas.remover', _apagar('escolas'), 204),
+    Cenario('pais.remover', _apagar('pais'), 204),
+    Cenario('metricas', lambda a, e: _get('/metrics'), fracao=0.1),
+    Cenario('apispec', lambda a, e: _get('/apispec_1.json'), fracao=0.1),
+]
+
+
+def estado_inicial(contagens):
+    estado = dict(contagens, sequencia=0, avaliacoes_criadas=[])
+    for tabela in ('escolas', 'pais'):
+        estado[f'{tabela}_criadas'] = estado[f'{tabela}_removidas'] = 0
+    return estado
+
+
+def gerar_pedidos(cenario, quantidade, aleatorio, estado):
+    pedidos = []
+    for _ in range(quantidade):
+        pedido = cenario.gerar(aleatorio, estado)
+        if pedido is None:
+            break
+        pedidos.append(pedido)
+    return pedidos
+
+
+def resumir(latencias, erros, segundos, rss_mb):
+    return {
+        'requisicoes': len(latencias) + erros,
+        'erros': erros,
+        'p50_ms': round(percentil(latencias, 0.50), 2) if latencias else None,
+        'p95_ms': round(percentil(latencias, 0.95), 2) if latencias else None,
+        'p99_ms': round(percentil(latencias, 0.99), 2) if latencias else None,
+        'req_por_s': round(len(latencias) / segundos, 1) if segundos else None,
+        'rss_pico_mb': rss_mb,
+    }
+
+
+def rodar_cliente(app, cenario, pedidos, estado):
+    cliente = app.test_client()
+    if pedidos[0][0] == 'GET':
+        # aquecimento: o primeiro acesso paga inicializações preguiçosas
+        cliente.get(pedidos[0][1]).close()
+    zerar_pico(os.getpid())
+    latencias, erros = [], 0
+    inicio = time.perf_counter()
+    for metodo, caminho, corpo, tipo in pedidos:
+        antes = time.perf_counter()
+        resposta = cliente.open(caminho, method=metodo, data=corpo, headers={'Content-Type': tipo} if tipo else None)
+        dados = resposta.get_data()
+        resposta.close()
+        if resposta.status_code != cenario.status:
+            erros += 1
+            continue
+        latencias.append((time.perf_counter() - antes) * 1000)
+        if cenario.depois:
+            cenario.depois(estado, json.loads(dados))
+    return resumir(latencias, erros, time.perf_counter() - inicio, pico_rss_mb(os.getpid()))
+
+
+async def _disparar(base, cenario, pedidos, estado, concorrencia):
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias, erros = [], 0
+
+    async def uma(sessao, metodo, caminho, corpo, tipo):
+        nonlocal erros
+        async with semaforo:
+            antes = time.perf_counter()
+            try:
+                async with sessao.request(
+                    metodo, base + caminho, data=corpo, headers={'Content-Type': tipo} if tipo else None
+                ) as resposta:
+                    dados = await resposta.read()
+                    ok = resposta.status == cenario.status
+            except aiohttp.ClientError:
+                ok = False
+            if not ok:
+                erros += 1
+                return
+            latencias.append((time.perf_counter() - antes) * 1000)
+            if cenario.depois:
+                cenario.depois(estado, json.loads(dados))
+
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=300)) as sessao:
+        if pedidos[0][0] == 'GET':
+            async with sessao.get(base + pedidos[0][1]) as resposta:
+                await resposta.read()
+        inicio = time.perf_counter()
+        await asyncio.gather(*(uma(sessao, *pedido) for pedido in pedidos))
+        return latencias, erros, time.perf_counter() - inicio
+
+
+def rodar_http(base, pid, cenario, pedidos, estado, concorrencia):
+    zerar_pico(pid)
+    latencias, erros, segundos = asyncio.run(_disparar(base, cenario, pedidos, estado, concorrencia))
+    return resumir(latencias, erros, segundos, pico_rss_mb(pid))
+
+
+def preparar_banco(caminho, escolas, avaliacoes_por_escola):
+    # schema pelo próprio app (create_all + migrações), dados direto pelo sqlite3
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'GEOCODER_URL': '', 'METRICS_ENABLED': False})
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    popular(caminho, escolas, avaliacoes_por_escola=avaliacoes_por_escola)
+
+
+def copiar_banco(origem, destino):
+    # pela API de backup, que leva junto o que ainda estiver no WAL
+    with sqlite3.connect(origem) as fonte, sqlite3.connect(destino) as copia:
+        fonte.backup(copia)
+    fonte.close()
+    copia.close()
+
+
+def contar(caminho):
+    with sqlite3.connect(caminho) as conexao:
+        contagens = {
+            'escolas': conexao.execute('SELECT MAX(id) FROM escola').fetchone()[0] or 0,
+            'pais': conexao.execute('SELECT MAX(id) FROM pais').fetchone()[0] or 0,
+            'avaliacoes': conexao.execute('SELECT COUNT(*) FROM avaliacao').fetchone()[0],
+        }
+    conexao.close()
+    return contagens
+
+
+def commit_atual():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        alterado = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-modificado' if alterado else '')
+
+
+def medir(modo, caminho_banco, contagens, url_viacep, args):
+    cenarios = [
+        cenario for cenario in CENARIOS
+        if not args.cenarios or any(cenario.nome.startswith(prefixo) for prefixo in args.cenarios)
+    ]
+    aleatorio = random.Random(args.semente)
+    estado = estado_inicial(contagens)
+    resultados = {}
+
+    def rodar(executar):
+        for cenario in cenarios:
+            quantidade = max(1, round(args.requisicoes * cenario.fracao))
+            pedidos = gerar_pedidos(cenario, quantidade, aleatorio, estado)
+            if not pedidos:
+                continue
+            resultados[cenario.nome] = executar(cenario, pedidos)
+            print(f"  {modo:<8} {cenario.nome:<28} p50 {resultados[cenario.nome]['p50_ms']} ms", flush=True)
+
+    if modo == 'cliente':
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}',
+            'VIACEP_URL': url_viacep, 'GEOCODER_URL': url_geocodificacao(url_viacep), 'GEOCODER_MIN_INTERVAL': 0,
+        })
+        app.logger.disabled = True
+        rodar(lambda cenario, pedidos: rodar_cliente(app, cenario, pedidos, estado))
+    else:
+        ambiente = {
+            'FLASK_SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}',
+            'FLASK_VIACEP_URL': url_viacep,
+            'FLASK_GEOCODER_URL': url_geocodificacao(url_viacep),
+            'FLASK_GEOCODER_MIN_INTERVAL': '0',
+        }
+        with servidor(SERVIDORES[args.servidor], ambiente) as (base, processo):
+            rodar(lambda cenario, pedidos: rodar_http(base, processo.pid, cenario, pedidos, estado, args.concorrencia))
+    return resultados
+
+
+def imprimir(modo, resultados):
+    if not resultados:
+        return
+    colunas = list(next(iter(resultados.values())))
+    print(f'\n{modo}')
+    print(f"{'cenário':<28}" + ''.join(f'{coluna:>13}' for coluna in colunas))
+    for nome, valores in resultados.items():
+        print(f'{nome:<28}' + ''.join(f'{str(valores[coluna]):>13}' for coluna in colunas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', choices=list(ESCALAS), default='1k', help='quantidade de escolas geradas')
+    parser.add_argument('--avaliacoes-por-escola', type=float, default=3)
+    parser.add_argument('--modo', choices=['cliente', 'http', 'ambos'], default='ambos')
+    parser.add_argument('--servidor', choices=list(SERVIDORES), default='flask', help='servidor do modo http')
+    parser.add_argument('--requisicoes', type=int, default=200, help='requisições por cenário (antes da fração)')
+    parser.add_argument('--concorrencia', type=int, default=8, help='requisições em voo no modo http')
+    parser.add_argument('--latencia', type=float, default=0.05, help='atraso do ViaCEP simulado, em segundos')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--cenarios', nargs='+', help='só os cenários com estes prefixos (ex.: escolas.filtro pais)')
+    parser.add_argument('--banco', help='guarda o banco gerado neste arquivo e o reaproveita nas próximas execuções')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    modos = ['cliente', 'http'] if args.modo == 'ambos' else [args.modo]
+    stub, url_viacep = iniciar_stub(latencia=args.latencia)
+    diretorio = tempfile.mkdtemp(prefix='suite_')
+    try:
+        base = args.banco or os.path.join(diretorio, 'base.db')
+        if not os.path.exists(base):
+            inicio = time.perf_counter()
+            preparar_banco(base, ESCALAS[args.escala], args.avaliacoes_por_escola)
+            print(f'banco {args.escala} gerado em {time.perf_counter() - inicio:.1f} s', flush=True)
+        contagens = contar(base)
+
+        resultado = {'meta': {
+            'commit': commit_atual(),
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'escala': args.escala,
+            **contagens,
+            'latencia_viacep_s': args.latencia,
+            'requisicoes': args.requisicoes,
+            'concorrencia': args.concorrencia,
+            'servidor': args.servidor,
+            'semente': args.semente,
+        }}
+        for modo in modos:
+            caminho = os.path.join(diretorio, f'{modo}.db')
+            copiar_banco(base, caminho)
+            resultado[modo] = medir(modo, caminho, contagens, url_viacep, args)
+    finally:
+        stub.shutdown()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    for modo in modos:
+        imprimir(modo, resultado[modo])
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Servidor local que imita o ViaCEP.
+
+Uso:
+    python -m benchmarks.viacep_stub --porta 8765 --latencia 0.2
+
+e então rode a API com FLASK_VIACEP_URL=http://127.0.0.1:8765/ws/{cep}/json/
+e FLASK_GEOCODER_URL=http://127.0.0.1:8765/search (geocodificação no formato do Nominatim;
+com FLASK_GEOCODER_MIN_INTERVAL=0, já que o simulado não tem limite de uso).
+
+CEPs que começam com 99 respondem {"erro": "true"}; --falhas faz uma fração
+das respostas sair como 503 para exercitar as retentativas do cliente.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CIDADES = [
+    ('São Paulo', 'SP', -23.5505, -46.6333), ('Rio de Janeiro', 'RJ', -22.9068, -43.1729),
+    ('Belo Horizonte', 'MG', -19.9167, -43.9345), ('Juiz de Fora', 'MG', -21.7642, -43.3496),
+    ('Curitiba', 'PR', -25.4284, -49.2733), ('Porto Alegre', 'RS', -30.0346, -51.2177),
+    ('Salvador', 'BA', -12.9777, -38.5016), ('Recife', 'PE', -8.0476, -34.8770),
+    ('Fortaleza', 'CE', -3.7319, -38.5267), ('Brasília', 'DF', -15.7939, -47.8828),
+]
+COORDENADAS = {cidade: (lat, lon) for cidade, _, lat, lon in CIDADES}
+# faixas reais dos CEPs de cada cidade (cinco primeiros dígitos)
+FAIXAS_CEP = {
+    'São Paulo': (1000, 5999), 'Rio de Janeiro': (20000, 23799), 'Belo Horizonte': (30000, 31999),
+    'Juiz de Fora': (36000, 36099), 'Curitiba': (80000, 82999), 'Porto Alegre': (90000, 91999),
+    'Salvador': (40000, 42599), 'Recife': (50000, 52999), 'Fortaleza': (60000, 61599), 'Brasília': (70000, 72799),
+}
+BAIRROS = ['Centro', 'Jardim América', 'Vila Nova', 'Santa Rita de Cássia', 'Boa Vista', 'São José']
+RUAS = ['Rua das Flores', 'Avenida Brasil', 'Rua Sete de Setembro', 'Rua XV de Novembro', 'Rua da Paz']
+
+
+def cidade_do_cep(cep):
+    prefixo = int(cep[:5])
+    for cidade, uf, _, _ in CIDADES:
+        inicio, fim = FAIXAS_CEP[cidade]
+        if inicio <= prefixo <= fim:
+            return cidade, uf
+    cidade, uf, _, _ = CIDADES[int(cep) % len(CIDADES)]
+    return cidade, uf
+
+
+def endereco_ficticio(cep):
+    semente = int(cep)
+    cidade, uf = cidade_do_cep(cep)
+    return {
+        'cep': f'{cep[:5]}-{cep[5:]}',
+        'logradouro': RUAS[semente % len(RUAS)],
+        'complemento': '',
+        'bairro': BAIRROS[semente % len(BAIRROS)],
+        'localidade': cidade,
+        'uf': uf,
+        'ibge': str(3100000 + semente % 99999),
+        'ddd': '11',
+    }
+
+
+def coordenadas_ficticias(params):
+    # Imita a busca do Nominatim: centro da cidade deslocado de forma determinística pela rua.
+    lat, lon = COORDENADAS.get(params.get('city', [''])[0], (-15.7939, -47.8828))
+    semente = zlib.crc32(params.get('street', [''])[0].encode())
+    return lat + (semente % 1000 - 500) / 10000, lon + (semente // 1000 % 1000 - 500) / 10000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        servidor = self.server
+        if self.path == '/_stats':
+            return self._responder(200, dict(servidor.requisicoes))
+        if self.path.startswith('/search'):
+            lat, lon = coordenadas_ficticias(parse_qs(urlsplit(self.path).query))
+            return self._responder(200, [{'lat': str(lat), 'lon': str(lon)}])
+
+        encontrado = re.fullmatch(r'/ws/(\d+)/json/?', self.path)
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        if not encontrado or len(encontrado.group(1)) != 8:
+            return self._responder(400, {'erro': 'true'})
+
+        cep = encontrado.group(1)
+        with servidor.lock:
+            servidor.requisicoes[cep] += 1
+        if servidor.falhas and random.random() < servidor.falhas:
+            return self._responder(503, {'erro': 'indisponivel'})
+        if cep.startswith('99'):
+            return self._responder(200, {'erro': 'true'})
+        return self._responder(200, endereco_ficticio(cep))
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Servidor(ThreadingHTTPServer):
+    # fila de conexões grande o bastante para os testes de carga com centenas de clientes
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def iniciar_stub(host='127.0.0.1', porta=0, latencia=0.0, falhas=0.0):
+    servidor = _Servidor((host, porta), _Handler)
+    servidor.latencia = latencia
+    servidor.falhas = falhas
+    servidor.lock = threading.Lock()
+    servidor.requisicoes = Counter()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://{host}:{servidor.server_address[1]}/ws/{{cep}}/json/'
+    return servidor, url
+
+
+def url_geocodificacao(url_viacep):
+    return url_viacep.split('/ws/')[0] + '/search'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos de atraso por resposta')
+    parser.add_argument('--falhas', type=float, default=0.0, help='fração de respostas 503')
+    args = parser.parse_args()
+
+    servidor, url = iniciar_stub(args.host, args.porta, args.latencia, args.falhas)
+    print(f'ViaCEP stub em {url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
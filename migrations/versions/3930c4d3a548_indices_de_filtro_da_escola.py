@@ -0,0 +1,64 @@
+"""indices de filtro da escola
+
+Revision ID: 3930c4d3a548
+Revises: c07d00dca7f3
+Create Date: 2026-10-17 11:05:27.640912
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3930c4d3a548'
+down_revision = 'c07d00dca7f3'
+branch_labels = None
+depends_on = None
+
+INDICES = {
+    'ix_escola_mensalidade': ['mensalidade'],
+    'ix_escola_avaliacao': ['avaliacao'],
+    'ix_escola_metodologia_mensalidade': ['metodologia_normalizada', 'mensalidade'],
+    'ix_escola_cidade_estado': ['cidade', 'estado'],
+}
+
+
+def _normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspetor = sa.inspect(bind)
+    colunas = {coluna['name'] for coluna in inspetor.get_columns('escola')}
+
+    if 'metodologia_normalizada' not in colunas:
+        with op.batch_alter_table('escola', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('metodologia_normalizada', sa.String(length=100), nullable=False, server_default=''))
+
+        # o SQLite não remove acentos em SQL, então o preenchimento é feito em Python
+        escola = sa.table('escola', sa.column('id'), sa.column('metodologia'), sa.column('metodologia_normalizada'))
+        valores = bind.execute(sa.select(escola.c.metodologia).distinct()).scalars().all()
+        for metodologia in valores:
+            bind.execute(
+                escola.update()
+                .where(escola.c.metodologia == metodologia)
+                .values(metodologia_normalizada=_normalizar(metodologia))
+            )
+
+    existentes = {indice['name'] for indice in inspetor.get_indexes('escola')}
+    for nome, colunas_indice in INDICES.items():
+        if nome not in existentes:
+            op.create_index(nome, 'escola', colunas_indice, unique=False)
+    op.execute('ANALYZE escola')
+
+
+def downgrade():
+    for nome in reversed(list(INDICES)):
+        op.drop_index(nome, table_name='escola')
+    # DROP COLUMN nativo (SQLite 3.35+) em vez do batch: recriar a tabela
+    # descartaria os gatilhos do R*Tree e do FTS que apontam para escola
+    op.execute('ALTER TABLE escola DROP COLUMN metodologia_normalizada')
@@ -0,0 +1,50 @@
+"""busca textual fts5
+
+Revision ID: 426948086659
+Revises: 3930c4d3a548
+Create Date: 2026-10-17 13:22:18.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '426948086659'
+down_revision = '3930c4d3a548'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tabelas = sa.inspect(op.get_bind()).get_table_names()
+    existia = 'escola_fts' in tabelas
+
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS escola_fts USING fts5(
+        nome, metodologia, bairro, cidade,
+        content='escola', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_fts_ai AFTER INSERT ON escola BEGIN
+        INSERT INTO escola_fts(rowid, nome, metodologia, bairro, cidade)
+        VALUES (NEW.id, NEW.nome, NEW.metodologia, NEW.bairro, NEW.cidade);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_fts_au AFTER UPDATE OF nome, metodologia, bairro, cidade ON escola BEGIN
+        INSERT INTO escola_fts(escola_fts, rowid, nome, metodologia, bairro, cidade)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.metodologia, OLD.bairro, OLD.cidade);
+        INSERT INTO escola_fts(rowid, nome, metodologia, bairro, cidade)
+        VALUES (NEW.id, NEW.nome, NEW.metodologia, NEW.bairro, NEW.cidade);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_fts_ad AFTER DELETE ON escola BEGIN
+        INSERT INTO escola_fts(escola_fts, rowid, nome, metodologia, bairro, cidade)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.metodologia, OLD.bairro, OLD.cidade);
+    END""")
+    if not existia:
+        # indexa as escolas que já estavam no banco
+        op.execute("INSERT INTO escola_fts(escola_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS escola_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS escola_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS escola_fts_ai")
+    op.execute("DROP TABLE IF EXISTS escola_fts")
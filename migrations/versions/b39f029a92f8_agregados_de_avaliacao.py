@@ -0,0 +1,44 @@
+"""agregados de avaliacao
+
+Revision ID: b39f029a92f8
+Revises: 426948086659
+Create Date: 2026-10-17 14:48:55.021367
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b39f029a92f8'
+down_revision = '426948086659'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    colunas = {coluna['name'] for coluna in inspetor.get_columns('escola')}
+
+    with op.batch_alter_table('escola', schema=None) as batch_op:
+        if 'avaliacoes_total' not in colunas:
+            batch_op.add_column(sa.Column('avaliacoes_total', sa.Integer(), nullable=False, server_default='0'))
+        if 'avaliacoes_soma' not in colunas:
+            batch_op.add_column(sa.Column('avaliacoes_soma', sa.Float(), nullable=False, server_default='0'))
+
+    if 'ix_avaliacao_escola_id' not in {indice['name'] for indice in inspetor.get_indexes('avaliacao')}:
+        op.create_index('ix_avaliacao_escola_id', 'avaliacao', ['escola_id'], unique=False)
+
+    # recalcula os agregados uma única vez; daí em diante eles são mantidos incrementalmente.
+    # Escolas sem avaliações mantêm o valor de avaliacao que já tinham.
+    op.execute("""UPDATE escola SET
+        avaliacoes_total = (SELECT count(*) FROM avaliacao WHERE avaliacao.escola_id = escola.id),
+        avaliacoes_soma = (SELECT coalesce(sum(nota), 0) FROM avaliacao WHERE avaliacao.escola_id = escola.id)""")
+    op.execute("UPDATE escola SET avaliacao = avaliacoes_soma / avaliacoes_total WHERE avaliacoes_total > 0")
+
+
+def downgrade():
+    op.drop_index('ix_avaliacao_escola_id', table_name='avaliacao')
+    # DROP COLUMN nativo (SQLite 3.35+): o batch recriaria a tabela sem os gatilhos do R*Tree
+    op.execute('ALTER TABLE escola DROP COLUMN avaliacoes_soma')
+    op.execute('ALTER TABLE escola DROP COLUMN avaliacoes_total')
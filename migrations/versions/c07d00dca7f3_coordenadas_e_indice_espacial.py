@@ -0,0 +1,58 @@
+"""coordenadas e indice espacial
+
+Revision ID: c07d00dca7f3
+Revises: da1abe381c2b
+Create Date: 2026-10-17 09:40:03.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c07d00dca7f3'
+down_revision = 'da1abe381c2b'
+branch_labels = None
+depends_on = None
+
+
+def _colunas(tabela):
+    return {coluna['name'] for coluna in sa.inspect(op.get_bind()).get_columns(tabela)}
+
+
+def upgrade():
+    for tabela in ('escola', 'pais'):
+        existentes = _colunas(tabela)
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            if 'latitude' not in existentes:
+                batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            if 'longitude' not in existentes:
+                batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS escola_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_geo_ai AFTER INSERT ON escola
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL BEGIN
+        INSERT INTO escola_geo VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_geo_au AFTER UPDATE OF latitude, longitude ON escola BEGIN
+        DELETE FROM escola_geo WHERE id = OLD.id;
+        INSERT INTO escola_geo SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS escola_geo_ad AFTER DELETE ON escola BEGIN
+        DELETE FROM escola_geo WHERE id = OLD.id;
+    END""")
+    op.execute("""INSERT OR REPLACE INTO escola_geo
+        SELECT id, latitude, latitude, longitude, longitude FROM escola
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS escola_geo_ad")
+    op.execute("DROP TRIGGER IF EXISTS escola_geo_au")
+    op.execute("DROP TRIGGER IF EXISTS escola_geo_ai")
+    op.execute("DROP TABLE IF EXISTS escola_geo")
+    for tabela in ('pais', 'escola'):
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,88 @@
+"""esquema inicial
+
+Revision ID: da1abe381c2b
+Revises: 
+Create Date: 2026-10-17 09:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'da1abe381c2b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Bancos criados antes das migrações (via db.create_all) já têm estas tabelas,
+# então cada uma só é criada se ainda não existir.
+def upgrade():
+    tabelas = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'escola' not in tabelas:
+        op.create_table('escola',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('telefone', sa.String(length=20), nullable=False),
+        sa.Column('rua', sa.String(length=200), nullable=False),
+        sa.Column('numero', sa.String(length=10), nullable=False),
+        sa.Column('bairro', sa.String(length=100), nullable=False),
+        sa.Column('cidade', sa.String(length=100), nullable=False),
+        sa.Column('estado', sa.String(length=2), nullable=False),
+        sa.Column('cep', sa.String(length=10), nullable=False),
+        sa.Column('mensalidade', sa.Float(), nullable=False),
+        sa.Column('quantidade_alunos', sa.Integer(), nullable=False),
+        sa.Column('metodologia', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('avaliacao', sa.Float(), nullable=True),
+        sa.Column('imagem_url', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'pais' not in tabelas:
+        op.create_table('pais',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome_completo', sa.String(length=100), nullable=False),
+        sa.Column('telefone', sa.String(length=20), nullable=False),
+        sa.Column('rua', sa.String(length=200), nullable=False),
+        sa.Column('numero', sa.String(length=10), nullable=False),
+        sa.Column('bairro', sa.String(length=100), nullable=False),
+        sa.Column('cidade', sa.String(length=100), nullable=False),
+        sa.Column('estado', sa.String(length=2), nullable=False),
+        sa.Column('cep', sa.String(length=10), nullable=False),
+        sa.Column('idade_crianca', sa.Integer(), nullable=False),
+        sa.Column('necessidades_especiais', sa.Boolean(), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'avaliacao' not in tabelas:
+        op.create_table('avaliacao',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nota', sa.Float(), nullable=False),
+        sa.Column('nome_avaliador', sa.String(length=100), nullable=False),
+        sa.Column('comentario', sa.String(length=200), nullable=True),
+        sa.Column('escola_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['escola_id'], ['escola.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'cep_cache' not in tabelas:
+        op.create_table('cep_cache',
+        sa.Column('cep', sa.String(length=8), nullable=False),
+        sa.Column('endereco', sa.Text(), nullable=False),
+        sa.Column('encontrado', sa.Boolean(), nullable=False),
+        sa.Column('expira_em', sa.Float(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False),
+        sa.Column('atualizado_em', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('cep')
+        )
+
+
+def downgrade():
+    op.drop_table('cep_cache')
+    op.drop_table('avaliacao')
+    op.drop_table('pais')
+    op.drop_table('escola')
@@ -0,0 +1,38 @@
+"""versoes das tabelas
+
+Revision ID: f5df7d8ea1c6
+Revises: b39f029a92f8
+Create Date: 2026-10-17 16:02:31.418207
+
+"""
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5df7d8ea1c6'
+down_revision = 'b39f029a92f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('versao_tabela'):
+        op.create_table(
+            'versao_tabela',
+            sa.Column('tabela', sa.String(length=50), nullable=False),
+            sa.Column('versao', sa.Integer(), nullable=False),
+            sa.Column('atualizado_em', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('tabela'),
+        )
+    # ponto de partida para as tabelas que já têm dados
+    op.execute(sa.text(
+        "INSERT OR IGNORE INTO versao_tabela (tabela, versao, atualizado_em) "
+        "VALUES ('escola', 1, :agora), ('pais', 1, :agora), ('avaliacao', 1, :agora)"
+    ).bindparams(agora=time.time()))
+
+
+def downgrade():
+    op.drop_table('versao_tabela')
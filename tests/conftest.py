@@ -0,0 +1,70 @@
+import pytest
+
+from app import create_app
+from app.services.viacep import ViaCepClient
+from benchmarks.viacep_stub import iniciar_stub
+
+
+@pytest.fixture
+def stub():
+    # iniciar(latencia=..., falhas=...) sobe um ViaCEP simulado; todos são
+    # desligados no fim do teste
+    servidores = []
+
+    def iniciar(**opcoes):
+        servidor, url = iniciar_stub(**opcoes)
+        servidores.append(servidor)
+        return servidor, url
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+@pytest.fixture
+def novo_cliente():
+    clientes = []
+
+    def criar(url, read_timeout=2.0, retries=0, backoff=0.0):
+        cliente = ViaCepClient()
+        cliente.configurar(
+            url, connect_timeout=1.0, read_timeout=read_timeout, retries=retries, backoff=backoff, pool_size=10
+        )
+        clientes.append(cliente)
+        return cliente
+
+    yield criar
+    for cliente in clientes:
+        cliente.session.close()
+
+
+@pytest.fixture
+def nova_app(tmp_path):
+    # banco temporário, sem índice de CEPs e sem geocodificação
+    def criar(**config):
+        return create_app(dict(
+            {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}", 'CEP_INDEX_FILE': ''}, **config
+        ))
+
+    return criar
+
+
+@pytest.fixture
+def escola_ficticia():
+    # campos obrigatórios de uma escola; a variação pelo índice espalha preços,
+    # metodologias e cidades para os filtros terem o que separar
+    metodologias = ['Montessori', 'Método Montessoriano', 'Waldorf', 'Construtivista', 'Tradicional']
+    cidades = [('São Paulo', 'SP'), ('Campinas', 'SP'), ('Belo Horizonte', 'MG')]
+
+    def criar(indice, **campos):
+        cidade, estado = cidades[indice % len(cidades)]
+        return dict({
+            'nome': f'Escola {indice}', 'telefone': '1133334444', 'rua': 'Rua das Flores', 'numero': str(indice),
+            'bairro': 'Centro', 'cidade': cidade, 'estado': estado, 'cep': '01001000',
+            'mensalidade': 500.0 + (indice * 37) % 1000, 'quantidade_alunos': 100 + indice,
+            'metodologia': metodologias[indice % len(metodologias)], 'email': f'escola{indice}@exemplo.com',
+            'latitude': -23.5 + indice / 100, 'longitude': -46.6 + indice / 100,
+        }, **campos)
+
+    return criar
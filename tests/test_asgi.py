@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+from app.asgi import AplicacaoAsgi
+from app.db import db
+from app.model.escola import Escola
+
+CEP_GRAVADO = '02002000'
+CEP_NOVO = '01001000'
+
+
+@pytest.fixture
+def asgi(nova_app, escola_ficticia, stub):
+    servidor, url = stub()
+    app = nova_app(VIACEP_URL=url, VIACEP_RETRIES=0)
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice, cep=CEP_GRAVADO)) for indice in range(2))
+        db.session.commit()
+    aplicacao = AplicacaoAsgi(app)
+    yield aplicacao, servidor
+    aplicacao.executor.shutdown(wait=True)
+
+
+async def chamar(aplicacao, metodo, caminho, corpo):
+    conteudo = json.dumps(corpo).encode()
+    mensagens = [{'type': 'http.request', 'body': conteudo, 'more_body': False}]
+    enviadas = []
+
+    async def receive():
+        return mensagens.pop(0) if mensagens else {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    scope = {
+        'type': 'http', 'method': metodo, 'path': caminho, 'query_string': b'', 'http_version': '1.1',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(conteudo)).encode())],
+    }
+    await aplicacao(scope, receive, send)
+    return enviadas[0]['status']
+
+
+def executar(aplicacao, *requisicoes):
+    # todas no mesmo event loop, onde vive a sessão aiohttp do resolvedor
+    async def todas():
+        try:
+            return [await chamar(aplicacao, *requisicao) for requisicao in requisicoes]
+        finally:
+            await aplicacao.cep.fechar()
+
+    return asyncio.run(todas())
+
+
+def test_cep_igual_ao_gravado_nao_consulta(asgi):
+    aplicacao, servidor = asgi
+    assert executar(
+        aplicacao,
+        ('PUT', '/api/escolas/1', {'cep': '02002-000', 'nome': 'Y'}),
+        ('PATCH', '/api/escolas/1', {'cep': CEP_GRAVADO}),
+        ('PATCH', '/api/escolas', [{'id': 2, 'cep': CEP_GRAVADO}, {'id': 77, 'cep': CEP_NOVO}]),
+        ('PATCH', '/api/escolas/99', {'cep': CEP_NOVO}),
+    ) == [200, 200, 200, 404]
+    assert sum(servidor.requisicoes.values()) == 0
+
+
+def test_cep_alterado_e_resolvido_uma_vez(asgi):
+    aplicacao, servidor = asgi
+    assert executar(
+        aplicacao,
+        ('PATCH', '/api/escolas/1', {'cep': CEP_NOVO}),
+        ('PATCH', '/api/escolas', [{'id': 2, 'cep': '04004000'}]),
+    ) == [200, 200]
+    assert (servidor.requisicoes[CEP_NOVO], servidor.requisicoes['04004000']) == (1, 1)
@@ -0,0 +1,103 @@
+import pytest
+
+from app.db import db
+from app.model.escola import Escola
+from app.services import atualizacao
+from benchmarks.viacep_stub import endereco_ficticio
+
+CEP = '01001000'
+CEP_INEXISTENTE = '99000000'
+
+
+@pytest.fixture
+def viacep(stub):
+    return stub()
+
+
+@pytest.fixture
+def cliente(nova_app, escola_ficticia, viacep):
+    _, url = viacep
+    app = nova_app(VIACEP_URL=url)
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice, cep='02002000')) for indice in range(3))
+        db.session.commit()
+    with app.test_client() as cliente:
+        yield cliente
+
+
+def escola(cliente, id_):
+    return cliente.get(f'/api/escolas/{id_}').get_json()
+
+
+def test_lote_devolve_o_status_de_cada_item(cliente, escola_ficticia):
+    resposta = cliente.patch('/api/escolas', json=[
+        {'id': 1, 'mensalidade': 800.0},
+        {'mensalidade': 900.0},
+        {'id': 99, 'mensalidade': 900.0},
+        {'id': 2, 'mensalidade': 'caro'},
+        {'id': 3, 'cep': CEP_INEXISTENTE},
+        'não é objeto',
+        {'id': 3, 'nome': 'Escola Renomeada'},
+    ])
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert [(item['indice'], item['id'], item['status']) for item in corpo['resultados']] == [
+        (0, 1, 200), (1, None, 400), (2, 99, 404), (3, 2, 400), (4, 3, 400), (5, None, 400), (6, 3, 200),
+    ]
+    assert all('error' in item for item in corpo['resultados'] if item['status'] != 200)
+    assert (corpo['atualizados'], corpo['com_erro']) == (2, 5)
+
+    # os itens aceitos são gravados apesar dos rejeitados
+    assert escola(cliente, 1)['mensalidade'] == 800.0
+    assert escola(cliente, 2)['mensalidade'] == escola_ficticia(1)['mensalidade']
+    assert escola(cliente, 3)['nome'] == 'Escola Renomeada'
+    assert escola(cliente, 3)['cep'] == '02002000'
+
+
+def test_cep_alterado_atualiza_o_endereco(cliente, viacep):
+    servidor, _ = viacep
+    resposta = cliente.patch('/api/escolas', json=[{'id': 1, 'cep': CEP}, {'id': 2, 'cep': CEP}, {'id': 3, 'nome': 'X'}])
+    assert [item['status'] for item in resposta.get_json()['resultados']] == [200, 200, 200]
+    # um CEP repetido no lote é consultado uma vez
+    assert servidor.requisicoes[CEP] == 1
+    for id_ in (1, 2):
+        assert escola(cliente, id_)['rua'] == endereco_ficticio(CEP)['logradouro']
+
+
+@pytest.mark.parametrize('corpo', [[], {'id': 1}, None])
+def test_corpo_que_nao_e_lista(cliente, corpo):
+    assert cliente.patch('/api/escolas', json=corpo).status_code == 400
+
+
+def test_cep_igual_ou_registro_inexistente_nao_consulta(cliente, viacep):
+    servidor, _ = viacep
+    assert cliente.patch('/api/escolas/1', json={'cep': '02002-000', 'nome': 'Y'}).status_code == 200
+    assert cliente.put('/api/escolas/999', json={'cep': CEP}).status_code == 404
+    assert cliente.patch('/api/escolas/999', json={'cep': CEP}).status_code == 404
+    resposta = cliente.patch('/api/escolas', json=[{'id': 77, 'cep': CEP}, {'id': 2, 'cep': '02002000'}])
+    assert [item['status'] for item in resposta.get_json()['resultados']] == [404, 200]
+    assert sum(servidor.requisicoes.values()) == 0
+
+
+def test_cep_alterado_e_consultado_uma_vez(cliente, viacep):
+    servidor, _ = viacep
+    assert cliente.patch('/api/escolas/1', json={'cep': CEP}).status_code == 200
+    assert cliente.put('/api/escolas/2', json={'cep': '04004000'}).status_code == 200
+    assert (servidor.requisicoes[CEP], servidor.requisicoes['04004000']) == (1, 1)
+    assert escola(cliente, 1)['rua'] == endereco_ficticio(CEP)['logradouro']
+    assert escola(cliente, 2)['rua'] == endereco_ficticio('04004000')['logradouro']
+
+
+def test_lote_compara_com_os_valores_gravados_depois_da_espera(cliente, monkeypatch):
+    resolver_ceps = atualizacao.resolver_ceps
+
+    def resolver_com_escrita_concorrente(ceps, paralelismo):
+        # outra requisição renomeia a escola enquanto o lote espera o ViaCEP
+        with db.engine.begin() as conexao:
+            conexao.execute(Escola.__table__.update().where(Escola.id == 1).values(nome='Renomeada'))
+        return resolver_ceps(ceps, paralelismo)
+
+    monkeypatch.setattr(atualizacao, 'resolver_ceps', resolver_com_escrita_concorrente)
+    resposta = cliente.patch('/api/escolas', json=[{'id': 1, 'cep': CEP, 'nome': 'Escola 0'}])
+    assert 'nome' in resposta.get_json()['resultados'][0]['alterados']
+    assert escola(cliente, 1)['nome'] == 'Escola 0'
@@ -0,0 +1,74 @@
+import pytest
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import func, select, text
+
+from app.db import db
+from app.model.escola import Avaliacao, Escola
+
+
+@pytest.fixture
+def cliente(nova_app, escola_ficticia):
+    app = nova_app()
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice)) for indice in range(3))
+        db.session.commit()
+    with app.test_client() as cliente:
+        yield cliente
+
+
+def avaliacao(nota, nome='Ana'):
+    return {'nota': nota, 'nome_avaliador': nome}
+
+
+def agregados(cliente, escola_id):
+    # o agregado guardado e o recalculado a partir das avaliações
+    with cliente.application.app_context():
+        escola = db.session.get(Escola, escola_id)
+        total, media = db.session.execute(
+            select(func.count(Avaliacao.id), func.avg(Avaliacao.nota)).where(Avaliacao.escola_id == escola_id)
+        ).one()
+        return (escola.avaliacoes_total, escola.avaliacao), (total, media)
+
+
+def test_agregados_acompanham_insercoes_e_remocoes(cliente):
+    criada = cliente.post('/api/escolas/1/avaliacoes', json=avaliacao(5)).get_json()
+    assert cliente.post('/api/escolas/1/avaliacoes/lote', json=[avaliacao(4), avaliacao(1.5)]).status_code == 201
+    guardado, recalculado = agregados(cliente, 1)
+    assert guardado == recalculado == (3, pytest.approx(3.5))
+
+    assert cliente.delete(f"/api/escolas/1/avaliacoes/{criada['id']}").status_code == 204
+    guardado, recalculado = agregados(cliente, 1)
+    assert guardado == recalculado == (2, pytest.approx(2.75))
+    # as outras escolas não são tocadas
+    assert agregados(cliente, 2)[0] == (0, None)
+
+
+def test_remover_a_ultima_avaliacao_zera_a_media(cliente):
+    criada = cliente.post('/api/escolas/2/avaliacoes', json=avaliacao(3)).get_json()
+    cliente.delete(f"/api/escolas/2/avaliacoes/{criada['id']}")
+    assert agregados(cliente, 2) == ((0, None), (0, None))
+
+
+def test_lote_com_item_invalido_nao_grava_nada(cliente):
+    resposta = cliente.post('/api/escolas/3/avaliacoes/lote', json=[avaliacao(4), avaliacao(6), {'nota': 2}])
+    assert resposta.status_code == 400
+    assert [item['indice'] for item in resposta.get_json()['itens']] == [1, 2]
+    assert agregados(cliente, 3) == ((0, None), (0, None))
+
+
+def test_avaliacao_de_outra_escola_nao_e_removida(cliente):
+    criada = cliente.post('/api/escolas/1/avaliacoes', json=avaliacao(4)).get_json()
+    assert cliente.delete(f"/api/escolas/2/avaliacoes/{criada['id']}").status_code == 404
+    assert agregados(cliente, 1)[0] == (1, 4.0)
+
+
+def test_downgrade_dos_agregados_mantem_os_triggers(nova_app):
+    consulta = text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'escola' ORDER BY name")
+    with nova_app().app_context():
+        triggers = db.session.execute(consulta).scalars().all()
+        assert triggers
+        db.session.remove()
+        downgrade(revision='426948086659')
+        assert db.session.execute(consulta).scalars().all() == triggers
+        db.session.remove()
+        upgrade()
@@ -0,0 +1,90 @@
+import numpy as np
+
+from app.db import db
+from app.model.escola import Escola
+from app.services import colunar
+from app.services.avaliacoes import adicionar_avaliacoes
+
+AVALIACAO = {'nota': 4.0, 'nome_avaliador': 'Ana', 'comentario': None}
+
+
+def decodificar(colunas):
+    # os códigos do dicionário dependem da ordem de chegada: compara-se o texto
+    return {
+        nome: [getattr(colunas, dicionario).valores[codigo] for codigo in getattr(colunas, nome)]
+        if nome in colunas.CODIFICADAS else getattr(colunas, nome)
+        for nome, dicionario in ((nome, colunas.CODIFICADAS.get(nome)) for nome in colunas.ARRAYS)
+    }
+
+
+def recarga_proibida(versao):
+    raise AssertionError('o retrato foi recarregado inteiro em vez de atualizado')
+
+
+def escrever(escola_ficticia):
+    # inserção, atualização (inclusive de coluna codificada e de coordenada),
+    # remoção e a atualização em massa dos agregados de avaliação
+    db.session.add(Escola(**escola_ficticia(30, metodologia='Pedagogia Freinet', cidade='Recife', estado='PE')))
+    alterada = db.session.get(Escola, 3)
+    alterada.mensalidade = 9999.0
+    alterada.metodologia = 'Waldorf'
+    alterada.latitude = None
+    db.session.delete(db.session.get(Escola, 7))
+    db.session.commit()
+    adicionar_avaliacoes(5, [AVALIACAO, dict(AVALIACAO, nota=2.0)])
+    db.session.commit()
+
+
+def test_atualizacao_incremental_igual_a_recarga(nova_app, escola_ficticia, monkeypatch):
+    # cada bloco é uma "requisição": as versões ficam memorizadas em g
+    app = nova_app()
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice)) for indice in range(20))
+        db.session.commit()
+        anterior = colunar.catalogo().colunas()
+    with app.app_context():
+        escrever(escola_ficticia)
+    with app.app_context():
+        monkeypatch.setattr(colunar, 'carregar_colunas', recarga_proibida)
+        incremental = colunar.catalogo().colunas()
+        monkeypatch.undo()
+
+        assert incremental.versao > anterior.versao
+        completo = decodificar(colunar.carregar_colunas(incremental.versao))
+        for nome, valores in decodificar(incremental).items():
+            np.testing.assert_array_equal(valores, completo[nome], err_msg=nome)
+        assert 7 not in incremental.ids and len(incremental) == 20
+
+
+def test_filtros_colunares_iguais_ao_sql_apos_escritas(nova_app, escola_ficticia):
+    sem_cache = {'RESULT_CACHE_SIZE': 0}
+    app = nova_app(COLUMNAR_ENGINE_ENABLED=True, **sem_cache)
+    app_sql = nova_app(COLUMNAR_ENGINE_ENABLED=False, **sem_cache)
+    consultas = [
+        '/api/escolas/filtro/preco?min_preco=600&max_preco=10000',
+        '/api/escolas/filtro/avaliacao?min_avaliacao=2.5',
+        '/api/escolas/filtro/metodologia?metodologia=montessori',
+        '/api/escolas/filtro/metodologia?metodologia=waldorf',
+    ]
+
+    def respostas(app):
+        with app.test_client() as cliente:
+            return [cliente.get(consulta).get_json() for consulta in consultas]
+
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice)) for indice in range(20))
+        db.session.commit()
+        adicionar_avaliacoes(2, [AVALIACAO])
+        db.session.commit()
+    assert respostas(app) == respostas(app_sql)
+
+    with app.app_context():
+        escrever(escola_ficticia)
+    with app.test_client() as cliente:
+        assert cliente.patch('/api/escolas/4', json={'mensalidade': 50.0}).status_code == 200
+        assert cliente.delete('/api/escolas/9').status_code in (200, 204)
+        assert cliente.post('/api/escolas/11/avaliacoes', json={'nota': 5, 'nome_avaliador': 'Bia'}).status_code == 201
+
+    colunares, sql = respostas(app), respostas(app_sql)
+    assert colunares == sql
+    assert all(colunares)
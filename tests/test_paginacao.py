@@ -0,0 +1,89 @@
+import pytest
+
+from app.db import db
+from app.model.escola import Escola
+
+
+@pytest.fixture
+def cliente(nova_app, escola_ficticia):
+    app = nova_app()
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice)) for indice in range(25))
+        db.session.commit()
+    with app.test_client() as cliente:
+        yield cliente
+
+
+def percorrer(cliente, url):
+    ids, paginas = [], 0
+    while url:
+        resposta = cliente.get(url)
+        assert resposta.status_code == 200
+        ids += [escola['id'] for escola in resposta.get_json()]
+        paginas += 1
+        cursor = resposta.headers.get('X-Next-Cursor')
+        url = f'/api/escolas?limit=10&after={cursor}' if cursor else None
+    return ids, paginas
+
+
+def test_cursor_percorre_todas_as_escolas(cliente):
+    ids, paginas = percorrer(cliente, '/api/escolas?limit=10')
+    assert ids == list(range(1, 26))
+    assert paginas == 3
+
+
+def test_cursor_no_link_preserva_os_parametros(cliente):
+    resposta = cliente.get('/api/escolas?limit=10&fields=id,nome')
+    assert set(resposta.get_json()[0]) == {'id', 'nome'}
+    link = resposta.headers['Link']
+    assert f"after={resposta.headers['X-Next-Cursor']}" in link and 'fields=id%2Cnome' in link
+    assert link.endswith('rel="next"')
+
+
+def test_escritas_entre_paginas_nao_repetem_nem_pulam(cliente, escola_ficticia):
+    primeira = cliente.get('/api/escolas?limit=10')
+    cursor = primeira.headers['X-Next-Cursor']
+    # com offset, remover uma escola já lida faria a próxima página pular uma
+    with cliente.application.app_context():
+        db.session.delete(db.session.get(Escola, 2))
+        db.session.add(Escola(**escola_ficticia(25)))
+        db.session.commit()
+    resto, _ = percorrer(cliente, f'/api/escolas?limit=10&after={cursor}')
+    assert resto == list(range(11, 27))
+
+
+def test_ultima_pagina_sem_cursor(cliente):
+    resposta = cliente.get('/api/escolas?limit=25')
+    assert len(resposta.get_json()) == 25
+    assert 'X-Next-Cursor' not in resposta.headers and 'Link' not in resposta.headers
+
+
+@pytest.mark.parametrize('consulta', ['limit=0', 'limit=-5', 'limit=abc', 'limit=10&after=xyz', 'fields=senha'])
+def test_parametros_invalidos(cliente, consulta):
+    resposta = cliente.get(f'/api/escolas?{consulta}')
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+
+def test_busca_por_localizacao_com_projecao(cliente):
+    # a ordem por distância desempata pelo id mesmo sem id na projeção
+    url = '/api/escolas/busca?latitude=-23.5&longitude=-46.6&raio_km=5&fields=nome&limit=3'
+    primeira = cliente.get(url)
+    assert primeira.status_code == 200
+    corpo = primeira.get_json()
+    assert [set(escola) for escola in corpo['escolas']] == [{'nome', 'distancia_km'}] * 3
+    segunda = cliente.get(f"{url}&after={corpo['proximo_cursor']}").get_json()
+    nomes = [escola['nome'] for escola in corpo['escolas'] + segunda['escolas']]
+    assert nomes == ['Escola 0', 'Escola 1', 'Escola 2', 'Escola 3']
+
+
+@pytest.mark.parametrize('k', ['abc', '0', '-2', '1.5', ''])
+def test_localizacao_com_k_invalido(cliente, k):
+    resposta = cliente.get(f'/api/escolas/filtro/localizacao?latitude=-23.5&longitude=-46.6&k={k}')
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+
+def test_localizacao_com_k(cliente):
+    resposta = cliente.get('/api/escolas/filtro/localizacao?latitude=-23.5&longitude=-46.6&k=2')
+    assert [escola['nome'] for escola in resposta.get_json()] == ['Escola 0', 'Escola 1']
@@ -0,0 +1,71 @@
+import pytest
+
+from app.db import db
+from app.model.escola import Escola
+from app.model.pais import Pais
+
+FILTRO = '/api/escolas/filtro/preco?min_preco=0&max_preco=1000'
+
+
+@pytest.fixture
+def cliente(nova_app, escola_ficticia):
+    app = nova_app()
+    with app.app_context():
+        db.session.add_all(Escola(**escola_ficticia(indice)) for indice in range(10))
+        db.session.commit()
+    with app.test_client() as cliente:
+        yield cliente
+
+
+def test_etag_igual_responde_304(cliente):
+    resposta = cliente.get(FILTRO)
+    assert resposta.status_code == 200 and resposta.headers['X-Cache'] == 'MISS'
+    etag, escolas = resposta.headers['ETag'], resposta.get_json()
+    assert cliente.get(FILTRO, headers={'If-None-Match': etag}).status_code == 304
+    # o corpo só é guardado no cache depois de lido por inteiro
+    repetida = cliente.get(FILTRO)
+    assert repetida.headers['X-Cache'] == 'HIT' and repetida.get_json() == escolas
+
+
+def test_escrita_invalida_etag_e_cache(cliente):
+    resposta = cliente.get(FILTRO)
+    etag, escolas = resposta.headers['ETag'], resposta.get_json()
+    assert 1 in [escola['id'] for escola in escolas]
+
+    assert cliente.patch('/api/escolas/1', json={'mensalidade': 5000.0}).status_code == 200
+
+    depois = cliente.get(FILTRO, headers={'If-None-Match': etag})
+    assert depois.status_code == 200
+    assert depois.headers['ETag'] != etag
+    assert depois.headers['X-Cache'] == 'MISS'
+    assert [escola['id'] for escola in depois.get_json()] == [escola['id'] for escola in escolas if escola['id'] != 1]
+
+
+def test_avaliacao_invalida_etag_da_escola(cliente):
+    etag = cliente.get('/api/escolas/2').headers['ETag']
+    resposta = cliente.post('/api/escolas/2/avaliacoes', json={'nota': 3, 'nome_avaliador': 'Ana'})
+    assert resposta.status_code == 201
+    depois = cliente.get('/api/escolas/2', headers={'If-None-Match': etag})
+    assert depois.status_code == 200
+    assert depois.get_json()['avaliacao'] == 3
+
+
+def test_escrita_em_outra_tabela_mantem_etag(cliente):
+    etag = cliente.get(FILTRO).headers['ETag']
+    with cliente.application.app_context():
+        db.session.add(Pais(
+            nome_completo='Maria Souza', telefone='1133334444', rua='Rua A', numero='1', bairro='Centro',
+            cidade='São Paulo', estado='SP', cep='01001000', idade_crianca=5, necessidades_especiais=False,
+            email='maria@exemplo.com',
+        ))
+        db.session.commit()
+    assert cliente.get(FILTRO, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_escrita_desfeita_mantem_etag(cliente):
+    etag = cliente.get(FILTRO).headers['ETag']
+    with cliente.application.app_context():
+        db.session.get(Escola, 1).mensalidade = 5000.0
+        db.session.flush()
+        db.session.rollback()
+    assert cliente.get(FILTRO, headers={'If-None-Match': etag}).status_code == 304
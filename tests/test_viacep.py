@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from app.db import db
+from app.model.cep import CepCache
+from app.services.cep import buscar_endereco_por_cep, cep_encontrado, resolvedor_cep
+from benchmarks.viacep_stub import endereco_ficticio
+
+CEP = '01001000'
+CEP_INEXISTENTE = '99000000'
+
+
+def test_busca_endereco(stub, novo_cliente):
+    servidor, url = stub()
+    assert novo_cliente(url).buscar(CEP) == endereco_ficticio(CEP)
+    assert servidor.requisicoes[CEP] == 1
+
+
+def test_timeout_limita_a_espera(stub, novo_cliente):
+    _, url = stub(latencia=1.0)
+    cliente = novo_cliente(url, read_timeout=0.2)
+    inicio = time.perf_counter()
+    assert cliente.buscar(CEP) is None
+    assert time.perf_counter() - inicio < 0.8
+
+
+def test_timeout_vale_para_cada_retentativa(stub, novo_cliente):
+    # três tentativas de no máximo 0,2 s, bem antes de uma única resposta do servidor
+    _, url = stub(latencia=2.0)
+    cliente = novo_cliente(url, read_timeout=0.2, retries=2)
+    inicio = time.perf_counter()
+    assert cliente.buscar(CEP) is None
+    assert 0.6 <= time.perf_counter() - inicio < 1.5
+
+
+def test_503_retenta_com_backoff(stub, novo_cliente):
+    servidor, url = stub(falhas=1.0)
+    cliente = novo_cliente(url, retries=2, backoff=0.2)
+    inicio = time.perf_counter()
+    assert cliente.buscar(CEP) is None
+    # urllib3 espera 0 antes da primeira retentativa e backoff * 2 antes da segunda
+    assert time.perf_counter() - inicio >= 0.4
+    assert servidor.requisicoes[CEP] == 3
+
+
+def test_503_intermitente_se_recupera(stub, novo_cliente):
+    random.seed(7)
+    servidor, url = stub(falhas=0.5)
+    cliente = novo_cliente(url, retries=10)
+    ceps = [f'{numero:08d}' for numero in range(1001000, 1001020)]
+    assert [cliente.buscar(cep) for cep in ceps] == [endereco_ficticio(cep) for cep in ceps]
+    assert sum(servidor.requisicoes.values()) > len(ceps)
+
+
+def test_cep_inexistente_nao_retenta(stub, novo_cliente):
+    servidor, url = stub()
+    resultado = novo_cliente(url, retries=2).buscar(CEP_INEXISTENTE)
+    assert resultado == {'erro': 'true'}
+    assert not cep_encontrado(resultado)
+    assert servidor.requisicoes[CEP_INEXISTENTE] == 1
+
+
+def test_cep_inexistente_fica_no_cache(stub, nova_app):
+    servidor, url = stub()
+    with nova_app(VIACEP_URL=url).app_context():
+        assert not cep_encontrado(buscar_endereco_por_cep(CEP_INEXISTENTE))
+        assert not cep_encontrado(buscar_endereco_por_cep(CEP_INEXISTENTE))
+    assert servidor.requisicoes[CEP_INEXISTENTE] == 1
+
+
+def test_consultas_simultaneas_ao_mesmo_cep(stub, novo_cliente):
+    servidor, url = stub(latencia=0.3)
+    cliente = novo_cliente(url)
+    quantidade = 20
+    largada = threading.Barrier(quantidade)
+
+    def buscar(_):
+        largada.wait()
+        return cliente.buscar(CEP)
+
+    with ThreadPoolExecutor(quantidade) as executor:
+        resultados = list(executor.map(buscar, range(quantidade)))
+
+    assert resultados == [endereco_ficticio(CEP)] * quantidade
+    # cada chamador recebe o seu próprio dict
+    assert len({id(resultado) for resultado in resultados}) == quantidade
+    assert servidor.requisicoes[CEP] == 1
+    # a coalescência vale só enquanto a consulta está em andamento
+    cliente.buscar(CEP)
+    assert servidor.requisicoes[CEP] == 2
+
+
+def test_leitura_do_cep_cache_nao_escreve(stub, nova_app):
+    _, url = stub()
+    with nova_app(VIACEP_URL=url, CEP_CACHE_HITS_LOTE=3).app_context():
+        buscar_endereco_por_cep(CEP)
+
+        def hits():
+            return db.session.execute(select(CepCache.hits).where(CepCache.cep == CEP)).scalar_one()
+
+        for _ in range(2):
+            resolvedor_cep.memoria.clear()
+            assert resolvedor_cep.ler_do_banco(CEP) == endereco_ficticio(CEP)
+        assert hits() == 0
+        # o terceiro hit completa o lote e os três são gravados de uma vez
+        resolvedor_cep.memoria.clear()
+        resolvedor_cep.ler_do_banco(CEP)
+        db.session.rollback()
+        assert hits() == 3